@@ -0,0 +1,171 @@
+"""
+ベンチマーク用の合成ボーリング XML を生成する
+
+LoadData が扱う2種類のスキーマ（工学的地質区分名現場土質名 / 岩石土区分）と
+2種類の SPT 区間（0_10 [cm] / 0_100 [mm]）に対応し、土層数・SPT 数・ファイル数を指定できる
+
+使用例: python benchmarks/generate.py out_dir --files 100 --layers 20 --spt 30
+"""
+import argparse
+import csv
+from pathlib import Path
+from xml.sax.saxutils import escape
+import numpy as np
+
+SOIL_PROPERTIES_PATH = Path(__file__).resolve().parents[1] / "xml2liqmanifest" / "soil_properties.csv"
+
+SCHEMA_VARIANTS = ["工学的地質区分名現場土質名", "岩石土区分"]
+INTERVAL_VARIANTS = ["0_10", "0_100"]
+
+# CP932-specific characters that LoadData normalizes, sprinkled into notes
+NOTE_WORDS = ["灰色", "含水中位", "貝殻片混入", "φ2～5㎜の礫", "髙位置", "㈱調査", "No.", "－"]
+
+
+def load_soil_names():
+
+    with open(SOIL_PROPERTIES_PATH, encoding="utf-8") as f:
+        return [row["soil_class_name"] for row in csv.DictReader(f) if row["D50"] and row["Fc"]]
+
+
+def _dms(value):
+
+    degree = int(value)
+    minute = int((value - degree) * 60)
+    second = (value - degree - minute / 60) * 3600
+    return degree, minute, round(second, 2)
+
+
+def _element(tag, text):
+
+    return f"<{tag}>{escape(str(text))}</{tag}>"
+
+
+def generate_borehole_xml(rng, soil_names, schema="工学的地質区分名現場土質名", interval="0_10", n_layers=10, n_spt=20):
+    """
+    ボーリング1本分の XML 文字列を生成する
+
+    Parameters
+    ----------
+    rng : numpy.random.Generator
+        乱数生成器
+    soil_names : list
+        土質名の候補
+    schema : str
+        "工学的地質区分名現場土質名" または "岩石土区分"
+    interval : str
+        SPT の区間。"0_10"（10cm ごと、cm 単位）または "0_100"（100mm ごと、mm 単位）
+    n_layers : int
+        土層数
+    n_spt : int
+        SPT の試験数（1m 間隔）
+
+    Returns
+    -------
+    str
+        XML 文字列
+    """
+    total_depth = n_spt + 1.45
+    lat, lon = rng.uniform(31.0, 43.0), rng.uniform(130.0, 145.0)
+    ground_water_level = round(rng.uniform(0.5, 5.0), 2)
+
+    boundaries = np.sort(rng.uniform(0.3, total_depth, n_layers - 1)) if n_layers > 1 else np.array([])
+    lower_depths = np.round(np.append(boundaries, total_depth), 2)
+    upper_depths = np.concatenate([[0.0], lower_depths[:-1]])
+
+    lines = ['<?xml version="1.0" encoding="Shift_JIS"?>', '<ボーリング情報 DTD_version="3.00">', "<標題情報>"]
+
+    lat_d, lat_m, lat_s = _dms(lat)
+    lon_d, lon_m, lon_s = _dms(lon)
+    lines.append("<経度緯度情報>" + _element("経度_度", lon_d) + _element("経度_分", lon_m) + _element("経度_秒", lon_s)
+                 + _element("緯度_度", lat_d) + _element("緯度_分", lat_m) + _element("緯度_秒", lat_s) + "</経度緯度情報>")
+    start_date = f"{rng.integers(1970, 2024)}-{rng.integers(1, 13):02d}-{rng.integers(1, 29):02d}"
+    lines.append("<調査期間>" + _element("調査期間_開始年月日", start_date) + "</調査期間>")
+    lines.append(_element("孔口標高", round(rng.uniform(-2.0, 50.0), 2)))
+    lines.append(_element("総削孔長", total_depth))
+    lines.append("</標題情報>")
+    lines.append("<コア情報>")
+
+    if schema == "工学的地質区分名現場土質名":
+        tags = ("工学的地質区分名現場土質名_下端深度", "工学的地質区分名現場土質名_工学的地質区分名現場土質名",
+                "工学的地質区分名現場土質名_工学的地質区分名現場土質名記号")
+    else:
+        tags = ("岩石土区分_下端深度", "岩石土区分_岩石土名", "岩石土区分_岩石土記号")
+
+    for lower_depth in lower_depths:
+        name = soil_names[rng.integers(len(soil_names))]
+        lines.append(f"<{schema}>" + _element(tags[0], f"{lower_depth:.2f}") + _element(tags[1], name)
+                     + _element(tags[2], name[:2]) + f"</{schema}>")
+
+    for upper_depth, lower_depth in zip(upper_depths, lower_depths):
+        note = "、".join(rng.choice(NOTE_WORDS, size=3, replace=False))
+        lines.append("<観察記事>" + _element("観察記事_上端深度", f"{upper_depth:.2f}")
+                     + _element("観察記事_下端深度", f"{lower_depth:.2f}") + _element("観察記事_記事", note) + "</観察記事>")
+
+    lines.append("<孔内水位>" + _element("孔内水位_孔内水位", ground_water_level) + "</孔内水位>")
+
+    is_cm = interval == "0_10"
+    step = 10 if is_cm else 100
+    for i in range(n_spt):
+        hits = rng.integers(0, 18, size=3)
+        penetration = [step] * 3
+        # hard layers: 50 blows before the full 30 cm
+        if hits.sum() >= 50:
+            hits = np.array([hits[0], hits[1], 50 - hits[0] - hits[1]])
+            penetration[2] = step // 2
+        parts = [_element("標準貫入試験_開始深度", f"{i + 1.15:.2f}")]
+        for j in range(3):
+            name = f"{j * step}_{(j + 1) * step}"
+            parts.append(_element(f"標準貫入試験_{name}打撃回数", hits[j]))
+            parts.append(_element(f"標準貫入試験_{name}貫入量", penetration[j]))
+        parts.append(_element("標準貫入試験_合計打撃回数", hits.sum()))
+        parts.append(_element("標準貫入試験_合計貫入量", sum(penetration)))
+        lines.append("<標準貫入試験>" + "".join(parts) + "</標準貫入試験>")
+
+    lines += ["</コア情報>", "</ボーリング情報>"]
+
+    return "\n".join(lines)
+
+
+def generate_dataset(out_dir, n_files=10, n_layers=10, n_spt=20, schema=None, interval=None, seed=0):
+    """
+    合成ボーリング XML を out_dir に書き出す。schema / interval を省略した場合は交互に使う
+
+    Returns
+    -------
+    list
+        書き出したファイルのパス
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    rng = np.random.default_rng(seed)
+    soil_names = load_soil_names()
+
+    paths = []
+    for i in range(n_files):
+        content = generate_borehole_xml(
+            rng, soil_names,
+            schema=schema or SCHEMA_VARIANTS[i % 2],
+            interval=interval or INTERVAL_VARIANTS[(i // 2) % 2],
+            n_layers=n_layers, n_spt=n_spt,
+        )
+        path = out_dir / f"{i:06d}.XML"
+        path.write_bytes(content.encode("cp932"))
+        paths.append(path)
+
+    return paths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("out_dir")
+    parser.add_argument("--files", type=int, default=10)
+    parser.add_argument("--layers", type=int, default=10)
+    parser.add_argument("--spt", type=int, default=20)
+    parser.add_argument("--schema", choices=SCHEMA_VARIANTS)
+    parser.add_argument("--interval", choices=INTERVAL_VARIANTS)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    paths = generate_dataset(args.out_dir, args.files, args.layers, args.spt, args.schema, args.interval, args.seed)
+    print(f"{len(paths)} files written to {args.out_dir}")
@@ -0,0 +1,80 @@
+"""
+xml2liqmanifest の起動時間の計測
+
+各対象を新しい Python プロセスで import（または実行）し、経過時間の中央値を出力する。
+予算（ミリ秒）を超えた対象、または読み込んではいけない重い依存（pandas, numpy, lxml など）を読み込んだ対象があれば
+終了コード 1 を返す。予算はインタプリタ自体の起動時間を除いた値
+
+使用例:
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --repeat 10 --scale 2    # 遅いマシンでは予算を2倍にする
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# (name, code run in a fresh interpreter, budget [ms], modules that must not be imported)
+TARGETS = [
+    ("import xml2liqmanifest", "import xml2liqmanifest", 20, ["pandas", "numpy", "lxml", "scipy", "pyarrow"]),
+    ("cli --help", "from xml2liqmanifest.cli import build_parser; build_parser().format_help()", 40,
+     ["pandas", "numpy", "lxml", "scipy", "pyarrow"]),
+    ("load stage", "from xml2liqmanifest.load import LoadData; import lxml.etree", 150, ["pandas", "numpy"]),
+    ("calc stage", "from xml2liqmanifest.batch import calculate_borehole", 1500, ["scipy", "numba"]),
+]
+
+# prints the elapsed time of the code and the top-level modules it loaded, as JSON
+PROBE = """
+import json, sys, time
+before = set(sys.modules)
+start = time.perf_counter()
+exec(compile({code!r}, "<target>", "exec"))
+elapsed = time.perf_counter() - start
+print(json.dumps({{"ms": elapsed * 1e3, "modules": sorted({{m.split(".")[0] for m in set(sys.modules) - before}})}}))
+"""
+
+
+def measure(code, repeat):
+    """
+    code を repeat 回、それぞれ新しいプロセスで実行する
+
+    Returns
+    -------
+    (float, list)
+        経過時間の中央値 [ms] と、読み込まれたトップレベルのモジュール
+    """
+    timings = []
+    modules = set()
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", PROBE.format(code=code)], cwd=ROOT, check=True,
+                                capture_output=True, text=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        timings.append(result["ms"])
+        modules.update(result["modules"])
+
+    return statistics.median(timings), sorted(modules)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--scale", type=float, default=1.0, help="予算にかける倍率")
+    args = parser.parse_args()
+
+    failed = []
+    print(f"{'target':24s} {'ms':>8s} {'budget':>8s}  heavy modules")
+    for name, code, budget, forbidden in TARGETS:
+        ms, modules = measure(code, args.repeat)
+        heavy = [module for module in forbidden if module in modules]
+        over = ms > budget * args.scale
+        print(f"{name:24s} {ms:8.1f} {budget * args.scale:8.1f}  {', '.join(heavy) or '-'}{'  OVER BUDGET' if over else ''}")
+        if over or heavy:
+            failed.append(name)
+
+    if failed:
+        print(f"Import-time regression in: {', '.join(failed)}")
+        sys.exit(1)
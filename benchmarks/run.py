@@ -0,0 +1,196 @@
+"""
+xml2liqmanifest のベンチマーク
+
+合成ボーリング XML を生成し、LoadData / MergeSoilLayerIntoSPT / CalculateFL / LiquefactionManifest 全体を
+それぞれ計測して、スループット（boreholes/s, MB/s）とピークメモリを出力する。
+--baseline を指定すると保存済みの結果と比較し、許容範囲を超えて遅くなった段階があれば終了コード 1 を返す
+
+使用例:
+    python benchmarks/run.py                                  # 計測のみ
+    python benchmarks/run.py --baseline benchmarks/baseline.json
+    python benchmarks/run.py --save-baseline benchmarks/baseline.json
+"""
+import argparse
+import copy
+import itertools
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from xml2liqmanifest import LiquefactionManifest
+from xml2liqmanifest.load import LoadData, CheckMethodParam
+from xml2liqmanifest.merge import MergeSoilLayerIntoSPT
+from xml2liqmanifest.calc import CalculateFL
+from generate import generate_dataset
+
+# stages faster than this are too noisy to compare with the baseline [s]
+MIN_COMPARABLE_SECONDS = 0.05
+
+METHOD = "JRA"
+METHOD_PARAMS = {"year": 2017, "EQ_level": 2, "EQ_type": 2, "is_given_Khgl": False, "regional_class": "A1", "ground_type": 2}
+
+
+def _build_calc_inputs(borehole_data):
+
+    # merged once up front, so that the CalculateFL stage is measured on its own
+    method_params = CheckMethodParam(METHOD, copy.deepcopy(METHOD_PARAMS)).get_params()
+
+    inputs = []
+    for data in borehole_data:
+        merged = MergeSoilLayerIntoSPT({"borehole_data": data, "method": METHOD, "method_params": method_params}).get_merged_data()
+        inputs.append((merged["df_SPT"], merged))
+
+    return inputs
+
+
+def _run_stage(func, items, repeat):
+
+    # best of `repeat` timed runs, then one extra run under tracemalloc for the peak
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            func(item)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    for item in items:
+        func(item)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return min(timings), peak
+
+
+def run_benchmarks(n_files, n_layers, n_spt, repeat=3, seed=0):
+    """
+    各段階を計測する
+
+    Returns
+    -------
+    dict
+        {"config": 計測条件, "stages": {段階名: 計測結果}}
+    """
+    results = {
+        "config": {"files": n_files, "layers": n_layers, "spt": n_spt, "seed": seed},
+        "stages": {},
+    }
+
+    with tempfile.TemporaryDirectory() as temp_dir, warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+
+        paths = generate_dataset(Path(temp_dir) / "xml", n_files, n_layers, n_spt, seed=seed)
+        total_mb = sum(path.stat().st_size for path in paths) / 1e6
+        borehole_data = [LoadData(path).data for path in paths]
+
+        pipeline_runs = itertools.count()
+
+        def pipeline(path):
+            # a fresh cache directory for every call, so that each repeat computes FL instead of reading the cache
+            cache_dir = Path(temp_dir) / "cache" / str(next(pipeline_runs))
+            liq = LiquefactionManifest(path, temp_dir=cache_dir, res_dir=Path(temp_dir) / "res", force_read_file=True)
+            liq.set_method(method=METHOD, params=copy.deepcopy(METHOD_PARAMS))
+            liq.calculate_FL()
+
+        stages = [
+            ("LoadData", LoadData, paths, total_mb),
+            ("MergeSoilLayerIntoSPT", lambda data: MergeSoilLayerIntoSPT({"borehole_data": data}).get_merged_data(),
+             borehole_data, None),
+            ("CalculateFL", lambda inputs: CalculateFL(inputs[0].copy(), inputs[1]).get_FL(),
+             _build_calc_inputs(borehole_data), None),
+            ("LiquefactionManifest", pipeline, paths, total_mb),
+        ]
+
+        for name, func, items, mb in stages:
+            try:
+                # the pipeline prints progress for every file
+                with open(Path(temp_dir) / "stdout.txt", "w") as stdout:
+                    sys.stdout, original_stdout = stdout, sys.stdout
+                    try:
+                        seconds, peak = _run_stage(func, items, repeat)
+                    finally:
+                        sys.stdout = original_stdout
+            except Exception as e:
+                results["stages"][name] = {"error": f"{type(e).__name__}: {str(e)}"}
+                continue
+
+            results["stages"][name] = {
+                "seconds": seconds,
+                "boreholes_per_s": len(items) / seconds,
+                "MB_per_s": mb / seconds if mb is not None else None,
+                "peak_MB": peak / 1e6,
+            }
+
+    return results
+
+
+def compare_with_baseline(results, baseline, tolerance):
+    """
+    ベースラインと比較し、boreholes/s が (1 - tolerance) 倍を下回った段階を返す。
+    計測時間が MIN_COMPARABLE_SECONDS 未満の段階は比較しない
+    """
+    if results["config"] != baseline["config"]:
+        warnings.warn(f"計測条件がベースラインと異なります: {results['config']} != {baseline['config']}")
+
+    regressions = []
+    for name, stage in results["stages"].items():
+        reference = baseline["stages"].get(name, {})
+        if "boreholes_per_s" not in stage or "boreholes_per_s" not in reference:
+            continue
+        if reference["seconds"] < MIN_COMPARABLE_SECONDS:
+            continue
+        ratio = stage["boreholes_per_s"] / reference["boreholes_per_s"]
+        stage["ratio_to_baseline"] = ratio
+        if ratio < 1 - tolerance:
+            regressions.append(name)
+
+    return regressions
+
+
+def print_results(results):
+
+    print(f"config: {results['config']}")
+    print(f"{'stage':24s} {'seconds':>9s} {'boreholes/s':>12s} {'MB/s':>8s} {'peak MB':>8s} {'vs base':>8s}")
+    for name, stage in results["stages"].items():
+        if "error" in stage:
+            print(f"{name:24s} error: {stage['error']}")
+            continue
+        mb_per_s = f"{stage['MB_per_s']:8.2f}" if stage["MB_per_s"] is not None else f"{'-':>8s}"
+        ratio = f"{stage['ratio_to_baseline']:8.2f}" if "ratio_to_baseline" in stage else f"{'-':>8s}"
+        print(f"{name:24s} {stage['seconds']:9.3f} {stage['boreholes_per_s']:12.1f} {mb_per_s} {stage['peak_MB']:8.2f} {ratio}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--layers", type=int, default=15)
+    parser.add_argument("--spt", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", type=Path, help="比較するベースラインの JSON")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="許容する速度低下の割合")
+    parser.add_argument("--save-baseline", type=Path, help="結果をベースラインとして保存する JSON")
+    parser.add_argument("--output", type=Path, help="結果を保存する JSON")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.files, args.layers, args.spt, args.repeat, args.seed)
+
+    regressions = []
+    if args.baseline is not None:
+        regressions = compare_with_baseline(results, json.loads(args.baseline.read_text()), args.tolerance)
+
+    print_results(results)
+
+    for path in [args.output, args.save_baseline]:
+        if path is not None:
+            path.write_text(json.dumps(results, indent=2, ensure_ascii=False))
+
+    if regressions:
+        print(f"Regression detected in: {', '.join(regressions)}")
+        sys.exit(1)
@@ -1 +1,29 @@
-from .core import LiquefactionManifest
\ No newline at end of file
+import importlib
+
+# public classes and the submodules defining them; a submodule is imported on first access,
+# so that `import xml2liqmanifest` and the command line do not load pandas, numpy and lxml up front
+_LAZY_ATTRIBUTES = {
+    "LiquefactionManifest": ".core",
+    "LiquefactionManifestBatch": ".batch",
+    "BoreholeDataset": ".store",
+    "BoreholeCollection": ".spatial",
+    "CompactBoreholes": ".compact",
+}
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name):
+
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[name], __name__), name)
+    globals()[name] = value
+
+    return value
+
+
+def __dir__():
+
+    return sorted({*globals(), *__all__})
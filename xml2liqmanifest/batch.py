@@ -0,0 +1,486 @@
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import contextlib
+import copy
+import os
+import traceback
+import warnings
+import pandas as pd
+from .load import LoadData, CheckMethodParam
+from .calc import CalculateFL
+from .merge import MergeSoilLayerIntoSPT
+from .montecarlo import MonteCarloFL
+from .export import ResultWriter
+from .prefetch import PrefetchReader, collect_sources
+from .profiling import Profiler, summarize_events
+from .validate import BoreholeValidator, BoreholeValidationError
+
+
+def calculate_borehole(borehole_data, method, method_params, engine="vectorized", **extra):
+    """
+    読み込み済みのボーリング1本に対して MergeSoilLayerIntoSPT → CalculateFL を実行する
+
+    Parameters
+    ----------
+    borehole_data : dict
+        LoadData.data と同じ形式のボーリングデータ
+    method : str
+        液状化判定手法
+    method_params : dict
+        CheckMethodParam で検証済みのパラメータ
+    engine : str, optional
+        CalculateFL の計算エンジン
+    **extra
+        LiquefactionManifest.data に相当する辞書に追加する値（file_path など）
+
+    Returns
+    -------
+    DataFrame
+        FL の計算結果
+    """
+    data = {
+        **extra,
+        "borehole_data": borehole_data,
+        "method": method,
+        "method_params": copy.deepcopy(method_params),
+    }
+    data = MergeSoilLayerIntoSPT(data).get_merged_data()
+
+    return CalculateFL(data["df_SPT"], data, engine=engine).get_FL()
+
+
+def _load_borehole(file_path, content, validator, issues):
+
+    # the validation pass runs before merge, so that bad boreholes are repaired or rejected before any calculation
+    borehole_data = LoadData(file_path, content=content).data
+    if validator is None:
+        return borehole_data
+
+    borehole_data, found = validator.validate(borehole_data)
+    issues.extend({"file_path": str(file_path), **issue} for issue in found)
+    if borehole_data is None:
+        raise BoreholeValidationError(found)
+
+    return borehole_data
+
+
+def _process_file(file_path, method, method_params, engine, profile=False, validator=None, content=None):
+    """
+    1本のボーリングに対して LoadData → MergeSoilLayerIntoSPT → CalculateFL を実行する
+
+    Parameters
+    ----------
+    file_path : Path
+        ボーリングデータのファイルパス
+    method : str
+        液状化判定手法
+    method_params : dict
+        CheckMethodParam で検証済みのパラメータ
+    engine : str
+        CalculateFL の計算エンジン
+    profile : bool, optional
+        True の場合は段階ごとの計測イベントを記録する
+    validator : BoreholeValidator, optional
+        計算前の検証。除外されたファイルは失敗として記録される
+    content : bytes, optional
+        先読み済みのファイルの内容。None の場合は file_path から読み込む
+
+    Returns
+    -------
+    dict
+        file_path, result (DataFrame or None), error (str or None), warnings (list), profile (list),
+        issues (list) を格納した辞書
+    """
+    issues = []
+
+    def calculate():
+        df_result = calculate_borehole(_load_borehole(file_path, content, validator, issues), method, method_params,
+                                       engine, file_path=file_path)
+        df_result.insert(0, "file_path", str(file_path))
+        return df_result
+
+    return _run_file(file_path, profile, calculate, issues)
+
+
+def _simulate_file(file_path, method, method_params, simulation, profile=False, validator=None, content=None):
+    """
+    1本のボーリングに対して LoadData → MergeSoilLayerIntoSPT → MonteCarloFL を実行する
+
+    Parameters
+    ----------
+    file_path : Path
+        ボーリングデータのファイルパス
+    method : str
+        液状化判定手法
+    method_params : dict
+        CheckMethodParam で検証済みのパラメータ
+    simulation : dict
+        MonteCarloFL の n_samples, uncertainty, seed, batch_size
+    profile : bool, optional
+        True の場合は段階ごとの計測イベントを記録する
+    validator : BoreholeValidator, optional
+        計算前の検証。除外されたファイルは失敗として記録される
+    content : bytes, optional
+        先読み済みのファイルの内容。None の場合は file_path から読み込む
+
+    Returns
+    -------
+    dict
+        _process_file と同じ形式。result は {"summary": PL の要約の辞書, "probability": 深度ごとの確率の DataFrame}
+    """
+    issues = []
+
+    def calculate():
+        data = {
+            "file_path": file_path,
+            "borehole_data": _load_borehole(file_path, content, validator, issues),
+            "method": method,
+            "method_params": copy.deepcopy(method_params),
+        }
+        data = MergeSoilLayerIntoSPT(data).get_merged_data()
+        # the file path keys the random stream, so results do not depend on which process runs the file
+        monte_carlo = MonteCarloFL(data["df_SPT"], data, key=str(file_path), **simulation)
+
+        df_probability = monte_carlo.get_FL_probability()
+        df_probability.insert(0, "file_path", str(file_path))
+        return {"summary": {"file_path": str(file_path), **monte_carlo.get_PL_summary()}, "probability": df_probability}
+
+    return _run_file(file_path, profile, calculate, issues)
+
+
+def _run_file(file_path, profile, calculate, issues=None):
+
+    # shared by the workers: warnings and profile events are recorded, and an exception becomes the error
+    profiler = Profiler(file_path=str(file_path)) if profile else contextlib.nullcontext()
+
+    with warnings.catch_warnings(record=True) as caught, profiler:
+        warnings.simplefilter("always")
+
+        try:
+            result = calculate()
+            error = None
+        except Exception as e:
+            result = None
+            error = f"{type(e).__name__}: {str(e)}"
+
+    return {
+        "file_path": str(file_path),
+        "result": result,
+        "error": error,
+        "warnings": [str(w.message) for w in caught],
+        "profile": profiler.events if profile else [],
+        "issues": issues or [],
+    }
+
+
+class LiquefactionManifestBatch:
+
+    def __init__(self, path, method, params, max_workers=None, engine="vectorized", file_types=(".xml",), profile=False,
+                 prefetch=False, io_workers=8, read_ahead=32, max_prefetch_bytes=256 << 20, validation=None):
+        """
+        ディレクトリ・glob パターン・zip アーカイブ内のボーリングデータを一括で計算する
+
+        prefetch=True の場合、または zip アーカイブを含む場合は、ファイルの内容を PrefetchReader で
+        io_workers 本のスレッドから先読みし、読み込みの待ち時間を解析・計算と重ねる。
+        先読みの量は read_ahead 件・max_prefetch_bytes バイトまでに制限される
+
+        validation を指定すると、読み込んだボーリングデータをマージ・計算の前に BoreholeValidator で検証する。
+        "repair" / "skip" / "ignore"（BoreholeValidator の on_issue）または BoreholeValidator を指定する。
+        見つかった問題は self.issues に記録され、除外したファイルは失敗として記録される
+        """
+        self.params = {
+            "path": path,
+            "method": method,
+            "max_workers": os.cpu_count() if max_workers is None else max_workers,
+            "engine": engine,
+            "file_types": [file_type.lower() for file_type in file_types],
+            "profile": profile,
+            "prefetch": prefetch,
+            "io_workers": io_workers,
+            "read_ahead": read_ahead,
+            "max_prefetch_bytes": max_prefetch_bytes,
+            "validation": validation,
+        }
+        self.validator = BoreholeValidator(validation) if isinstance(validation, str) else validation
+
+        # check params once in the parent process so that invalid input aborts before any work
+        self.params["method_params"] = CheckMethodParam(method, copy.deepcopy(params)).get_params()
+
+        self.sources = collect_sources(self.params["path"], self.params["file_types"])
+        self.file_paths = [Path(source.name) for source in self.sources]
+        self.failures = []
+        self.warnings = []
+        self.profile_events = []
+        self.issues = []
+
+        return None
+
+    def iter_results(self, skip=()):
+        """
+        ボーリングごとの計算結果を完了順に返すジェネレータ
+
+        失敗したファイルは self.failures に、警告は self.warnings に記録され、処理は継続される。
+        profile=True の場合は段階ごとの計測イベントが self.profile_events に記録される
+
+        Parameters
+        ----------
+        skip : iterable, optional
+            処理しないファイル（file_path 列の値）
+
+        Yields
+        ------
+        DataFrame
+            file_path 列を付加した1本分の計算結果
+        """
+        args = (self.params["method"], self.params["method_params"], self.params["engine"], self.params["profile"],
+                self.validator)
+
+        yield from self._iter_outcomes(_process_file, args, skip)
+
+    def _iter_outcomes(self, worker, args, skip=()):
+
+        # worker(file_path, *args, content=None) runs one file in a worker process and returns its outcome
+        self.failures = []
+        self.warnings = []
+        self.profile_events = []
+        self.issues = []
+
+        skip = set(map(str, skip))
+        sources = [source for source in self.sources if source.name not in skip]
+        file_paths = [Path(source.name) for source in sources]
+
+        # zip members can only be read through the reader
+        if self.params["prefetch"] or any(source.member is not None for source in sources):
+            yield from self._iter_prefetched_results(worker, args, sources)
+        elif self.params["max_workers"] <= 1:
+            outcomes = (worker(file_path, *args) for file_path in file_paths)
+            yield from self._collect_outcomes(outcomes)
+        else:
+            with ProcessPoolExecutor(max_workers=self.params["max_workers"]) as executor:
+                yield from self._collect_outcomes(self._submit_files(executor, file_paths, worker, args))
+
+    def _iter_prefetched_results(self, worker, args, sources):
+
+        reader = PrefetchReader(sources, max_workers=self.params["io_workers"],
+                                read_ahead=self.params["read_ahead"], max_bytes=self.params["max_prefetch_bytes"])
+
+        if self.params["max_workers"] <= 1:
+            outcomes = (self._failed_outcome(source.name, error) if error is not None
+                        else worker(source.name, *args, content=content)
+                        for source, content, error in reader)
+            yield from self._collect_outcomes(outcomes)
+            return
+
+        with ProcessPoolExecutor(max_workers=self.params["max_workers"]) as executor:
+            yield from self._collect_outcomes(self._submit_prefetched(executor, reader, worker, args))
+
+    def _submit_files(self, executor, file_paths, worker, args):
+
+        # submitted lazily, so that at most max_in_flight results wait in the parent process at any time
+        max_in_flight = 2 * self.params["max_workers"]
+        futures = {}
+
+        for file_path in file_paths:
+            futures[executor.submit(worker, file_path, *args)] = file_path
+            yield from self._wait_outcomes(futures, max_in_flight)
+
+        yield from self._wait_outcomes(futures, 1)
+
+    def _submit_prefetched(self, executor, reader, worker, args):
+
+        # bytes waiting in the process pool are not counted by the reader, so the number of submitted files is bounded too
+        max_in_flight = 2 * self.params["max_workers"]
+        futures = {}
+
+        for source, content, error in reader:
+            if error is not None:
+                yield self._failed_outcome(source.name, error)
+                continue
+
+            futures[executor.submit(worker, source.name, *args, content=content)] = source.name
+            yield from self._wait_outcomes(futures, max_in_flight)
+
+        yield from self._wait_outcomes(futures, 1)
+
+    def _wait_outcomes(self, futures, max_in_flight):
+
+        # yields finished outcomes until fewer than max_in_flight futures remain; each future is dropped as it is
+        # yielded, so that its result is freed once the caller is done with it
+        while len(futures) >= max_in_flight:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield self._get_outcome(future, futures.pop(future))
+
+    def _get_outcome(self, future, file_path):
+
+        try:
+            return future.result()
+        except Exception as e:
+            # the worker itself died (e.g. pickling error or killed process)
+            return self._failed_outcome(file_path, e, traceback.format_exc())
+
+    def _failed_outcome(self, file_path, error, details=None):
+
+        return {
+            "file_path": str(file_path),
+            "result": None,
+            "error": f"{type(error).__name__}: {str(error)}" + (f"\n{details}" if details else ""),
+            "warnings": [],
+            "profile": [],
+            "issues": [],
+        }
+
+    def _collect_outcomes(self, outcomes):
+
+        for outcome in outcomes:
+
+            self.warnings.extend({"file_path": outcome["file_path"], "message": message} for message in outcome["warnings"])
+            self.profile_events.extend(outcome["profile"])
+            self.issues.extend(outcome["issues"])
+
+            if outcome["error"] is not None:
+                self.failures.append({"file_path": outcome["file_path"], "error": outcome["error"]})
+                continue
+
+            yield outcome["result"]
+
+    def run(self):
+        """
+        全ファイルを処理し、結果を1つの表に結合する
+
+        Returns
+        -------
+        DataFrame
+            全ボーリングの計算結果
+        """
+        results = list(self.iter_results())
+
+        if not results:
+            return pd.DataFrame()
+
+        return pd.concat(results, ignore_index=True)
+
+    def simulate(self, n_samples=1000, uncertainty=None, seed=0, batch_size=1000):
+        """
+        全ファイルについて、入力のばらつきを考慮した FL・PL の確率分布をモンテカルロ法で計算する
+
+        ファイルはプロセスプールで並列に処理する。乱数列は seed とファイルパスから作るため、
+        max_workers や処理順によらず同じ結果になる
+
+        Parameters
+        ----------
+        n_samples : int, optional
+            ボーリングごとのサンプル数, by default 1000
+        uncertainty : dict, optional
+            montecarlo.DEFAULT_UNCERTAINTY のうち変更する値
+        seed : int, optional
+            乱数の種, by default 0
+        batch_size : int, optional
+            一度に計算するサンプル数, by default 1000
+
+        Returns
+        -------
+        tuple
+            (ボーリングごとの PL の要約の DataFrame, 深度ごとの FL < 1 となる確率の DataFrame)
+        """
+        simulation = {"n_samples": n_samples, "uncertainty": uncertainty, "seed": seed, "batch_size": batch_size}
+        args = (self.params["method"], self.params["method_params"], simulation, self.params["profile"], self.validator)
+
+        results = list(self._iter_outcomes(_simulate_file, args))
+
+        if not results:
+            return pd.DataFrame(), pd.DataFrame()
+
+        df_summary = pd.DataFrame([result["summary"] for result in results])
+        df_probability = pd.concat([result["probability"] for result in results], ignore_index=True)
+
+        # files finish in any order; sorted so that the tables do not depend on it
+        return (df_summary.sort_values("file_path", ignore_index=True),
+                df_probability.sort_values("file_path", kind="stable", ignore_index=True))
+
+    def export(self, path, format=None, compression=None, chunk_rows=100_000, resume=False):
+        """
+        全ファイルを処理し、完了したボーリングから順にファイルへ書き出す
+
+        結果は chunk_rows 行ごとに追記されるため、全体を結合した表をメモリに持たない。
+        resume=True の場合は、前回中断した出力に記録済みのファイルを処理せずに続きから書き出す
+        （失敗したファイルは記録されないため、再開時に再度処理される）
+
+        Parameters
+        ----------
+        path : str or Path
+            出力先（.csv, .jsonl, .parquet、CSV・JSON Lines は .gz も可）
+        format : str, optional
+            "csv", "jsonl", "parquet"。None の場合は拡張子から決める
+        compression : str, optional
+            圧縮方式（ResultWriter を参照）
+        chunk_rows : int, optional
+            1回に書き出す行数, by default 100_000
+        resume : bool, optional
+            前回の出力の続きから書き出す, by default False
+
+        Returns
+        -------
+        Path
+            出力先
+        """
+        with ResultWriter(path, format, compression, chunk_rows, resume) as writer:
+            for df_result in self.iter_results(skip=writer.completed):
+                writer.write(df_result["file_path"].iloc[0], df_result)
+
+        return writer.path
+
+    def get_failures(self):
+
+        return pd.DataFrame(self.failures, columns=["file_path", "error"])
+
+    def get_warnings(self):
+
+        return pd.DataFrame(self.warnings, columns=["file_path", "message"])
+
+    def get_issues(self):
+        """
+        validation を指定した場合に見つかった問題
+
+        Returns
+        -------
+        DataFrame
+            file_path, code, index, message, action
+        """
+        df_issues = pd.DataFrame(self.issues, columns=["file_path", "code", "index", "message", "action"])
+
+        return df_issues.astype({"index": "Int64"})
+
+    def get_validation_summary(self):
+        """
+        見つかった問題をエラーコード・対応ごとに集計する
+
+        Returns
+        -------
+        DataFrame
+            code, action ごとの問題の件数（issues）とファイル数（files）
+        """
+        df_issues = self.get_issues()
+
+        return (df_issues.groupby(["code", "action"], sort=True)
+                .agg(issues=("file_path", "size"), files=("file_path", "nunique"))
+                .reset_index())
+
+    def get_profile(self, summary=True):
+        """
+        profile=True で実行した場合の段階ごとの計測結果
+
+        Parameters
+        ----------
+        summary : bool, optional
+            True の場合は全ファイルを段階ごとに集計した表、False の場合はファイル・段階ごとのイベントを返す
+
+        Returns
+        -------
+        DataFrame
+            計測結果
+        """
+        if summary:
+            return summarize_events(self.profile_events)
+
+        return pd.DataFrame(self.profile_events)
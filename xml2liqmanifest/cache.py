@@ -0,0 +1,132 @@
+from pathlib import Path
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+
+
+def hash_file(file_path, chunk_size=1 << 20):
+    """
+    ファイル内容の SHA-256 ハッシュを計算する
+
+    Parameters
+    ----------
+    file_path : str or Path
+        対象ファイルのパス
+    chunk_size : int, optional
+        読み込み単位のバイト数, by default 1 MiB
+
+    Returns
+    -------
+    str
+        16進数のハッシュ値
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ResultCache:
+
+    def __init__(self, cache_dir, max_bytes=1 << 30):
+
+        self.params = {
+            "cache_dir": Path(cache_dir),
+            "max_bytes": max_bytes,
+        }
+
+        self.params["cache_dir"].mkdir(parents=True, exist_ok=True)
+
+    def make_key(self, kind, content_hash, **parts):
+        """
+        キャッシュのキーを作成する
+
+        Parameters
+        ----------
+        kind : str
+            エントリの種類（"borehole", "FL" など）
+        content_hash : str
+            入力ファイルの内容ハッシュ
+        **parts
+            キーに含める値（ローダーのバージョン、手法、パラメータなど）。JSON に変換できること
+
+        Returns
+        -------
+        str
+            キー
+        """
+        payload = json.dumps({"kind": kind, "content_hash": content_hash, **parts}, sort_keys=True, default=str)
+        return f"{kind}-{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+    def _path(self, key):
+
+        return self.params["cache_dir"] / f"{key}.pkl"
+
+    def get(self, key, default=None):
+
+        path = self._path(key)
+
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return default
+
+        # update the modification time so that eviction is least-recently-used
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+
+        return value
+
+    def set(self, key, value):
+
+        # write to a temporary file first so that concurrent readers never see a partial entry
+        fd, temp_path = tempfile.mkstemp(dir=self.params["cache_dir"], suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, self._path(key))
+        except BaseException:
+            Path(temp_path).unlink(missing_ok=True)
+            raise
+
+        self._evict()
+
+        return None
+
+    def __contains__(self, key):
+
+        return self._path(key).exists()
+
+    def clear(self):
+
+        for path in self.params["cache_dir"].glob("*.pkl"):
+            path.unlink(missing_ok=True)
+
+    def _evict(self):
+
+        if self.params["max_bytes"] is None:
+            return None
+
+        entries = []
+        for path in self.params["cache_dir"].glob("*.pkl"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total_bytes = sum(size for _, size, _ in entries)
+
+        for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+            if total_bytes <= self.params["max_bytes"]:
+                break
+            path.unlink(missing_ok=True)
+            total_bytes -= size
+
+        return None
@@ -1,82 +1,764 @@
-import math
-
-class CalculateFL:
-    
-    def __init__(self, df_SPT, params):
-        
-        self.df_SPT = df_SPT
-        self.params = params
-        
-        if self.params["method"] == "JRA":
-            
-            self._JRA()
-        
-        elif self.params["method"] == "AIJ":
-            
-            self._AIJ()
-            
-        elif self.params["method"] == "Idriss and Boulanger":
-            
-            self._Idriss_and_Boulanger()
-            
-        return None
-    
-    def get_FL(self):
-        
-        return self.df_SPT
-    
-    def _JRA(self):
-        
-        if self.params["year"] in [2012, 2017]:
-            
-            self._JRA_2012_2017()
-            
-        elif self.params["year"] in [2002]:
-            
-            self._JRA_2002()
-    
-    def _JRA_2012_2017(self):
-        
-        for i in range(len(self.df_SPT)):
-            
-            # calculate overburden stress
-            self.df_SPT.loc[i, "sigma_v"] = self._calculate_sigma_v(self.df_SPT.loc[i, "depth"])
-            self.df_SPT.loc[i, "sigma_p_v"] = self._calculate_sigma_p_v(self.df_SPT.loc[i, "depth"])
-        
-            # calculate seismic load
-            self.df_SPT.loc[i, "rd"] = 1 - 0.015 * self.df_SPT.loc[i, "depth"]
-            self.df_SPT.loc[i, "L"] = self.df_SPT.loc[i, "rd"] * self.params["method_params"]["Khgl"] * self.df_SPT.loc[i, "sigma_v"] / self.df_SPT.loc[i, "sigma_p_v"]
-            
-            # calculate liquefaction resistance
-            self.df_SPT.loc[i, "N1"] = 170 * self.df_SPT.loc[i, "N"] / (self.df_SPT.loc[i, "sigma_p_v"] + 70)
-            
-            if self.df_SPT.loc[i, "D50"] >= 2:
-                self.df_SPT.loc[i, "CFc"] = 1.0
-                self.df_SPT.loc[i, "Na"] = (1 - 0.36 * math.log10(self.df_SPT.loc[i, "D50"] / 2)) * self.df_SPT.loc[i, "N1"]
-            else:
-                self.df_SPT.loc[i, "CFc"] = self._calculate_CFc(self.df_SPT.loc[i, "Fc"])
-                self.df_SPT.loc[i, "Na"] = self.df_SPT.loc[i, "CFc"] * (self.df_SPT.loc[i, "N1"] + 2.47) - 2.47
-            
-            if self.df_SPT.loc[i, "N1"] < 14:
-                self.df_SPT.loc[i, "RL"] = 0.0882 * ((0.85 * self.df_SPT.loc[i, "Na"] + 2.1) / 1.7) ** 0.5
-            else:
-                self.df_SPT.loc[i, "RL"] = 0.0882 * (self.df_SPT.loc[i, "Na"] / 1.7) ** 0.5 + 1.6 * 10 ** -6 * (self.df_SPT.loc[i, "N1"] - 14) ** 4.5
-            
-            self.df_SPT.loc[i, "Cw"] = self._calculate_Cw()
-            self.df_SPT.loc[i, "R"] = self.df_SPT.loc[i, "RL"] * self.df_SPT.loc[i, "Cw"]
-            
-            # calculate FL
-            self.df_SPT.loc[i, "FL"] = self.df_SPT.loc[i, "R"] / self.df_SPT.loc[i, "L"]
-    
-    def _calculate_sigma_v(self, depth):
-        
-        pass
-    
-    def _AIJ(self):
-        
-        raise NotImplementedError("AIJ method is not implemented yet.")
-    
-    def _Idriss_and_Boulanger(self):
-        
-        raise NotImplementedError("Idriss and Boulanger method is not implemented yet.")
-    
\ No newline at end of file
+import math
+import warnings
+import numpy as np
+import pandas as pd
+from .stress import StressProfile
+from .profiling import stage
+from .jit import get_kernels, JRA_resistance, JRA_Cw_R
+
+# columns added to df_SPT by the JRA 2012/2017 calculation, in an order where every column follows its dependencies
+JRA_COLUMNS = ["sigma_v", "sigma_p_v", "rd", "L", "N1", "CFc", "Na", "RL", "Cw", "R", "FL"]
+
+# df_SPT columns read by the JRA 2012/2017 calculation
+JRA_INPUT_COLUMNS = ["depth", "N", "D50", "Fc"]
+
+# what each JRA 2012/2017 column is computed from: input columns, other columns, or
+# "stress_profile" (unit weights and ground water level), "Khgl" and "EQ_type" (is_type_II)
+JRA_DEPENDENCIES = {
+    "sigma_v": ["depth", "stress_profile"],
+    "sigma_p_v": ["depth", "stress_profile"],
+    "rd": ["depth"],
+    "L": ["rd", "sigma_v", "sigma_p_v", "Khgl"],
+    "N1": ["N", "sigma_p_v"],
+    "CFc": ["D50", "Fc"],
+    "Na": ["D50", "N1", "CFc"],
+    "RL": ["Na", "N1"],
+    "Cw": ["RL", "EQ_type"],
+    "R": ["RL", "Cw"],
+    "FL": ["R", "L"],
+}
+
+# columns that do not depend on the seismic load, and those that do
+JRA_RESISTANCE_COLUMNS = ["sigma_v", "sigma_p_v", "rd", "N1", "CFc", "Na", "RL"]
+JRA_LOAD_COLUMNS = ["L", "Cw", "R", "FL"]
+
+# columns added by the AIJ (2001) calculation and the df_SPT columns it reads;
+# L is the cyclic shear stress ratio, R the liquefaction resistance ratio, as in JRA
+AIJ_COLUMNS = ["sigma_v", "sigma_p_v", "rd", "L", "CN", "N1", "dNf", "Na", "R", "FL"]
+AIJ_INPUT_COLUMNS = ["depth", "N", "Fc"]
+
+# columns added by the Idriss and Boulanger (2008 / 2014) calculation and the df_SPT columns it reads;
+# L is CSR at the site magnitude and stress, R is CRR for M = 7.5 and 1 atm corrected by MSF and K_sigma
+IB_COLUMNS = ["sigma_v", "sigma_p_v", "rd", "L", "N60", "dN1_60", "CN", "N1_60", "N1_60cs", "CRR", "MSF", "K_sigma", "R", "FL"]
+IB_INPUT_COLUMNS = ["depth", "N", "Fc"]
+# upper limit of (N1)60cs for the Idriss and Boulanger CRR curve
+IB_MAX_N1_60CS = 37.5
+
+METHOD_COLUMNS = {"JRA": JRA_COLUMNS, "AIJ": AIJ_COLUMNS, "Idriss and Boulanger": IB_COLUMNS}
+METHOD_INPUT_COLUMNS = {"JRA": JRA_INPUT_COLUMNS, "AIJ": AIJ_INPUT_COLUMNS, "Idriss and Boulanger": IB_INPUT_COLUMNS}
+
+# intermediates computed by the same kernel from the same inputs in several methods; MultiMethodFL computes them once
+SHARED_COLUMNS = {
+    "sigma_v": ["JRA", "AIJ", "Idriss and Boulanger"],
+    "sigma_p_v": ["JRA", "AIJ", "Idriss and Boulanger"],
+    "rd": ["JRA", "AIJ"],
+}
+
+# acceleration of gravity [gal] and atmospheric pressure [kN/m2]
+GRAVITY = 980.665
+ATMOSPHERIC_PRESSURE = 101.325
+
+
+def dependent_columns(changed, dependencies=JRA_DEPENDENCIES, order=JRA_COLUMNS):
+    """
+    変更された入力から影響を受ける列を、計算順に返す
+
+    Parameters
+    ----------
+    changed : iterable
+        変更された入力（"Fc", "stress_profile", "Khgl" など）
+    dependencies : dict, optional
+        {列: 依存する入力・列のリスト}, by default JRA_DEPENDENCIES
+    order : list, optional
+        計算順, by default JRA_COLUMNS
+
+    Returns
+    -------
+    list
+        再計算が必要な列
+    """
+    dirty = set(changed)
+
+    # `order` is topological, so one pass reaches every transitive dependent
+    for column in order:
+        if dirty.intersection(dependencies[column]):
+            dirty.add(column)
+
+    return [column for column in order if column in dirty]
+
+class CalculateFL:
+
+    # compiled kernels used by the "numba" engine (see jit.py); None runs the NumPy expressions
+    kernels = None
+
+    def __init__(self, df_SPT, params, engine="vectorized", stress_profile=None):
+
+        self.df_SPT = df_SPT
+        self.params = params
+        self.engine = engine
+        self.stress_profile = stress_profile
+
+        if self.engine not in ["vectorized", "loop", "numba"]:
+            raise ValueError("Invalid engine.")
+
+        # the numba engine is the vectorized engine with fused loops for the piecewise JRA terms
+        if self.engine == "numba":
+            self.kernels = get_kernels()
+            if self.kernels is None:
+                warnings.warn("Numba がインストールされていないため、vectorized エンジンで計算します。")
+                self.engine = "vectorized"
+
+        with stage("calculate_FL", records=len(self.df_SPT)):
+
+            if self.params["method"] == "JRA":
+
+                self._JRA()
+
+            elif self.params["method"] == "AIJ":
+
+                self._AIJ()
+
+            elif self.params["method"] == "Idriss and Boulanger":
+
+                self._Idriss_and_Boulanger()
+
+        return None
+
+    def get_FL(self):
+
+        return self.df_SPT
+
+    def _JRA(self):
+
+        if self.params["method_params"]["year"] in [2012, 2017]:
+
+            if self.engine == "loop":
+                self._JRA_2012_2017()
+            else:
+                self._JRA_2012_2017_vectorized()
+
+        elif self.params["method_params"]["year"] in [2002]:
+
+            self._JRA_2002()
+
+    # reference implementation: row by row, kept for equivalence checks
+    def _JRA_2012_2017(self):
+
+        for i in range(len(self.df_SPT)):
+
+            # calculate overburden stress
+            self.df_SPT.loc[i, "sigma_v"] = self._calculate_sigma_v(self.df_SPT.loc[i, "depth"])
+            self.df_SPT.loc[i, "sigma_p_v"] = self._calculate_sigma_p_v(self.df_SPT.loc[i, "depth"])
+
+            # calculate seismic load
+            self.df_SPT.loc[i, "rd"] = 1 - 0.015 * self.df_SPT.loc[i, "depth"]
+            self.df_SPT.loc[i, "L"] = self.df_SPT.loc[i, "rd"] * self.params["method_params"]["Khgl"] * self.df_SPT.loc[i, "sigma_v"] / self.df_SPT.loc[i, "sigma_p_v"]
+
+            # calculate liquefaction resistance
+            self.df_SPT.loc[i, "N1"] = 170 * self.df_SPT.loc[i, "N"] / (self.df_SPT.loc[i, "sigma_p_v"] + 70)
+
+            if self.df_SPT.loc[i, "D50"] >= 2:
+                self.df_SPT.loc[i, "CFc"] = 1.0
+                self.df_SPT.loc[i, "Na"] = (1 - 0.36 * math.log10(self.df_SPT.loc[i, "D50"] / 2)) * self.df_SPT.loc[i, "N1"]
+            else:
+                self.df_SPT.loc[i, "CFc"] = self._calculate_CFc(self.df_SPT.loc[i, "Fc"])
+                self.df_SPT.loc[i, "Na"] = self.df_SPT.loc[i, "CFc"] * (self.df_SPT.loc[i, "N1"] + 2.47) - 2.47
+
+            if self.df_SPT.loc[i, "N1"] < 14:
+                self.df_SPT.loc[i, "RL"] = 0.0882 * ((0.85 * self.df_SPT.loc[i, "Na"] + 2.1) / 1.7) ** 0.5
+            else:
+                self.df_SPT.loc[i, "RL"] = 0.0882 * (self.df_SPT.loc[i, "Na"] / 1.7) ** 0.5 + 1.6 * 10 ** -6 * (self.df_SPT.loc[i, "N1"] - 14) ** 4.5
+
+            self.df_SPT.loc[i, "Cw"] = self._calculate_Cw(self.df_SPT.loc[i, "RL"])
+            self.df_SPT.loc[i, "R"] = self.df_SPT.loc[i, "RL"] * self.df_SPT.loc[i, "Cw"]
+
+            # calculate FL
+            self.df_SPT.loc[i, "FL"] = self.df_SPT.loc[i, "R"] / self.df_SPT.loc[i, "L"]
+
+    # column-wise implementation: same columns as _JRA_2012_2017, computed for all rows at once
+    def _JRA_2012_2017_vectorized(self):
+
+        columns = self._JRA_2012_2017_resistance()
+        columns.update(self._JRA_2012_2017_load(columns, self.params["method_params"]["Khgl"]))
+
+        for column in JRA_COLUMNS:
+            self.df_SPT[column] = columns[column]
+
+    # terms that do not depend on the seismic load: computed once per borehole
+    def _JRA_2012_2017_resistance(self):
+
+        values = {column: self.df_SPT[column].to_numpy(dtype=float) for column in JRA_INPUT_COLUMNS}
+
+        return self._JRA_2012_2017_columns(values, JRA_RESISTANCE_COLUMNS)
+
+    # terms that depend on the seismic load; Khgl and is_type_II may be (n_scenario, 1) arrays
+    def _JRA_2012_2017_load(self, columns, Khgl, is_type_II=None):
+
+        return self._JRA_2012_2017_columns(dict(columns), JRA_LOAD_COLUMNS, Khgl, is_type_II)
+
+    # computes `columns` (in JRA_COLUMNS order) from the arrays in `values`, which holds the inputs and every
+    # column they depend on; the arrays may be any subset of rows, all of the same length
+    def _JRA_2012_2017_columns(self, values, columns, Khgl=None, is_type_II=None):
+
+        result = {}
+
+        def get(column):
+            return result[column] if column in result else values[column]
+
+        for column in columns:
+
+            # already computed together with an earlier column by a fused kernel
+            if column in result:
+                continue
+
+            # fused kernels of the numba engine; scenario arrays of is_type_II (SweepFL) use the NumPy expressions
+            if self.kernels is not None and column == "CFc" and {"Na", "RL"}.issubset(columns):
+                result["CFc"], result["Na"], result["RL"] = JRA_resistance(get("D50"), get("Fc"), get("N1"), self.kernels)
+            elif self.kernels is not None and column == "Cw" and "R" in columns and np.ndim(is_type_II) == 0:
+                result["Cw"], result["R"] = JRA_Cw_R(get("RL"), self._is_type_II(is_type_II), self.kernels)
+
+            # calculate overburden stress
+            elif column == "sigma_v":
+                result[column] = self._calculate_sigma_v(get("depth"))
+            elif column == "sigma_p_v":
+                result[column] = self._calculate_sigma_p_v(get("depth"))
+            elif column == "rd":
+                result[column] = self._calculate_rd(get("depth"))
+
+            # calculate seismic load
+            elif column == "L":
+                result[column] = get("rd") * Khgl * get("sigma_v") / get("sigma_p_v")
+
+            # calculate liquefaction resistance
+            elif column == "N1":
+                result[column] = 170 * get("N") / (get("sigma_p_v") + 70)
+            elif column == "CFc":
+                result[column] = np.where(get("D50") >= 2, 1.0, self._calculate_CFc(get("Fc")))
+            elif column == "Na":
+                D50, N1 = get("D50"), get("N1")
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    Na_gravel = (1 - 0.36 * np.log10(D50 / 2)) * N1
+                result[column] = np.where(D50 >= 2, Na_gravel, get("CFc") * (N1 + 2.47) - 2.47)
+            elif column == "RL":
+                Na, N1 = get("Na"), get("N1")
+                is_loose = N1 < 14
+                with np.errstate(invalid="ignore"):
+                    RL_loose = 0.0882 * ((0.85 * Na + 2.1) / 1.7) ** 0.5
+                    RL_dense = 0.0882 * (Na / 1.7) ** 0.5 + 1.6 * 10 ** -6 * np.where(is_loose, 0.0, N1 - 14) ** 4.5
+                result[column] = np.where(is_loose, RL_loose, RL_dense)
+            elif column == "Cw":
+                result[column] = self._calculate_Cw(get("RL"), is_type_II)
+            elif column == "R":
+                result[column] = get("RL") * get("Cw")
+
+            # calculate FL
+            elif column == "FL":
+                result[column] = get("R") / get("L")
+
+        return result
+
+    # AIJ 2001: same inputs as _JRA_2012_2017_columns; amax [gal] and M come from method_params
+    def _AIJ_columns(self, values, columns):
+
+        method_params = self.params["method_params"]
+        result = {}
+
+        def get(column):
+            return result[column] if column in result else values[column]
+
+        for column in columns:
+
+            # calculate overburden stress
+            if column == "sigma_v":
+                result[column] = self._calculate_sigma_v(get("depth"))
+            elif column == "sigma_p_v":
+                result[column] = self._calculate_sigma_p_v(get("depth"))
+            elif column == "rd":
+                result[column] = self._calculate_rd(get("depth"))
+
+            # calculate seismic load: rn = 0.1 (M - 1) converts to an equivalent cyclic stress ratio
+            elif column == "L":
+                rn = 0.1 * (method_params["M"] - 1)
+                result[column] = rn * method_params["amax"] / GRAVITY * get("sigma_v") / get("sigma_p_v") * get("rd")
+
+            # calculate liquefaction resistance
+            elif column == "CN":
+                result[column] = self._calculate_CN(get("sigma_p_v"), 98, 0.5)
+            elif column == "N1":
+                result[column] = get("CN") * get("N")
+            elif column == "dNf":
+                result[column] = self._calculate_dNf(get("Fc"))
+            elif column == "Na":
+                result[column] = get("N1") + get("dNf")
+            elif column == "R":
+                # resistance curve for shear strain amplitude 5 %: a = 0.45, Cr = 0.57, Cs = 80, n = 14
+                root_Na = np.sqrt(np.maximum(get("Na"), 0))
+                result[column] = 0.45 * 0.57 * (16 * root_Na / 100 + (16 * root_Na / 80) ** 14)
+
+            # calculate FL
+            elif column == "FL":
+                result[column] = get("R") / get("L")
+
+        return result
+
+    # Idriss and Boulanger 2008 / 2014: same inputs as _JRA_2012_2017_columns;
+    # amax [gal], M, energy_ratio [%] and year come from method_params
+    def _Idriss_and_Boulanger_columns(self, values, columns):
+
+        method_params = self.params["method_params"]
+        result = {}
+
+        def get(column):
+            return result[column] if column in result else values[column]
+
+        for column in columns:
+
+            # calculate overburden stress
+            if column == "sigma_v":
+                result[column] = self._calculate_sigma_v(get("depth"))
+            elif column == "sigma_p_v":
+                result[column] = self._calculate_sigma_p_v(get("depth"))
+            elif column == "rd":
+                result[column] = self._calculate_rd_IB(get("depth"), method_params["M"])
+
+            # calculate seismic load
+            elif column == "L":
+                result[column] = 0.65 * method_params["amax"] / GRAVITY * get("sigma_v") / get("sigma_p_v") * get("rd")
+
+            # calculate liquefaction resistance
+            elif column == "N60":
+                result[column] = get("N") * method_params["energy_ratio"] / 60
+            elif column == "dN1_60":
+                result[column] = self._calculate_dN1_60(get("Fc"))
+            elif column == "CN":
+                result[column] = self._calculate_CN_IB(get("N60"), get("dN1_60"), get("sigma_p_v"))
+            elif column == "N1_60":
+                result[column] = get("CN") * get("N60")
+            elif column == "N1_60cs":
+                result[column] = get("N1_60") + get("dN1_60")
+            elif column == "CRR":
+                # the curve applies up to (N1)60cs = 37.5 (CRR about 2.0); beyond it the quartic term explodes
+                N1_60cs = np.minimum(get("N1_60cs"), IB_MAX_N1_60CS)
+                result[column] = np.exp(N1_60cs / 14.1 + (N1_60cs / 126) ** 2 - (N1_60cs / 23.6) ** 3
+                                        + (N1_60cs / 25.4) ** 4 - 2.8)
+            elif column == "MSF":
+                result[column] = self._calculate_MSF(get("N1_60cs"), method_params["M"], method_params["year"])
+            elif column == "K_sigma":
+                result[column] = self._calculate_K_sigma(get("sigma_p_v"), get("N1_60cs"))
+            elif column == "R":
+                result[column] = get("CRR") * get("MSF") * get("K_sigma")
+
+            # calculate FL
+            elif column == "FL":
+                result[column] = get("R") / get("L")
+
+        return result
+
+    # dispatches to the column kernel of `method`, whose params must be in self.params
+    def _method_columns(self, method, values, columns):
+
+        if method == "JRA":
+            return self._JRA_2012_2017_columns(values, columns, self.params["method_params"]["Khgl"])
+        elif method == "AIJ":
+            return self._AIJ_columns(values, columns)
+        elif method == "Idriss and Boulanger":
+            return self._Idriss_and_Boulanger_columns(values, columns)
+
+        raise ValueError("Invalid method.")
+
+    def _get_stress_profile(self):
+
+        # built once per borehole and shared by every depth; callers may pass a prebuilt one
+        if self.stress_profile is None:
+            self.stress_profile = StressProfile.from_borehole_data(self.params["borehole_data"])
+
+        return self.stress_profile
+
+    def _calculate_sigma_v(self, depth):
+
+        return self._get_stress_profile().sigma_v(depth)
+
+    def _calculate_sigma_p_v(self, depth):
+
+        return self._get_stress_profile().sigma_p_v(depth)
+
+    def _calculate_rd(self, depth):
+
+        # JRA 2012, AIJ 2001: stress reduction factor, linear in depth [m]
+        return 1 - 0.015 * np.asarray(depth, dtype=float)
+
+    def _calculate_rd_IB(self, depth, M):
+
+        # Idriss and Boulanger: stress reduction factor for depth [m] and magnitude; the fit holds down to 34 m
+        depth = np.asarray(depth, dtype=float)
+        alpha = -1.012 - 1.126 * np.sin(depth / 11.73 + 5.133)
+        beta = 0.106 + 0.118 * np.sin(depth / 11.28 + 5.142)
+
+        return np.where(depth <= 34, np.exp(alpha + beta * M), 0.12 * np.exp(0.22 * M))
+
+    def _calculate_CN(self, sigma_p_v, reference, exponent, max_CN=None):
+
+        # overburden correction of N: (reference / sigma'v) ** exponent, optionally capped
+        with np.errstate(divide="ignore"):
+            CN = (reference / np.asarray(sigma_p_v, dtype=float)) ** exponent
+
+        return CN if max_CN is None else np.minimum(CN, max_CN)
+
+    def _calculate_CN_IB(self, N60, dN1_60, sigma_p_v, iterations=50, tolerance=1e-6):
+
+        # Idriss and Boulanger: the exponent depends on (N1)60cs, which depends on CN; solved by fixed-point iteration
+        N60 = np.asarray(N60, dtype=float)
+        dN1_60 = np.asarray(dN1_60, dtype=float)
+        CN = np.ones_like(N60)
+
+        for _ in range(iterations):
+            N1_60cs = np.clip(CN * N60 + dN1_60, 0, 46)
+            new_CN = self._calculate_CN(sigma_p_v, ATMOSPHERIC_PRESSURE, 0.784 - 0.0768 * np.sqrt(N1_60cs), 1.7)
+            converged = np.all(~(np.abs(new_CN - CN) > tolerance))
+            CN = new_CN
+            if converged:
+                break
+
+        return CN
+
+    def _calculate_dNf(self, Fc):
+
+        # AIJ 2001: increment of N for fines content, piecewise on Fc [%]
+        Fc = np.asarray(Fc, dtype=float)
+
+        return np.where(Fc <= 5, 0.0, np.where(Fc <= 10, 1.2 * (Fc - 5), 6 + 0.2 * (Fc - 10)))
+
+    def _calculate_dN1_60(self, Fc):
+
+        # Idriss and Boulanger: increment of (N1)60 for fines content [%]
+        Fc = np.asarray(Fc, dtype=float)
+
+        return np.exp(1.63 + 9.7 / (Fc + 0.01) - (15.7 / (Fc + 0.01)) ** 2)
+
+    def _calculate_MSF(self, N1_60cs, M, year):
+
+        # Idriss and Boulanger: magnitude scaling factor; from 2014 on its maximum grows with (N1)60cs
+        if year == 2008:
+            return np.full_like(np.asarray(N1_60cs, dtype=float), min(6.9 * math.exp(-M / 4) - 0.058, 1.8))
+
+        MSF_max = np.minimum(1.09 + (np.asarray(N1_60cs, dtype=float) / 31.5) ** 2, 2.2)
+
+        return 1 + (MSF_max - 1) * (8.64 * math.exp(-M / 4) - 1.325)
+
+    def _calculate_K_sigma(self, sigma_p_v, N1_60cs):
+
+        # Idriss and Boulanger: overburden correction factor of CRR
+        C_sigma = np.minimum(1 / (18.9 - 2.55 * np.sqrt(np.clip(N1_60cs, 0, 37))), 0.3)
+        with np.errstate(divide="ignore"):
+            K_sigma = 1 - C_sigma * np.log(np.asarray(sigma_p_v, dtype=float) / ATMOSPHERIC_PRESSURE)
+
+        return np.minimum(K_sigma, 1.1)
+
+    def _calculate_CFc(self, Fc):
+
+        # JRA 2012: fines content correction, piecewise on Fc [%]
+        Fc = np.asarray(Fc, dtype=float)
+        CFc = np.where(Fc < 10, 1.0, np.where(Fc < 60, (Fc + 40) / 50, Fc / 20 - 1))
+
+        return CFc if CFc.ndim else float(CFc)
+
+    def _calculate_Cw(self, RL, is_type_II=None):
+
+        # JRA 2012: Cw = 1 for level 1 and level 2 type I, piecewise on RL for level 2 type II
+        RL = np.asarray(RL, dtype=float)
+        is_type_II = self._is_type_II(is_type_II)
+
+        Cw = np.where(is_type_II, np.where(RL <= 0.1, 1.0, np.where(RL <= 0.4, 3.3 * RL + 0.67, 2.0)), 1.0)
+
+        return Cw if Cw.ndim else float(Cw)
+
+    def _is_type_II(self, is_type_II=None):
+
+        if is_type_II is None:
+            return self.params["method_params"]["EQ_level"] == 2 and self.params["method_params"]["EQ_type"] == 2
+
+        return is_type_II
+
+    def _JRA_2002(self):
+
+        raise NotImplementedError("JRA 2002 method is not implemented yet.")
+
+    # AIJ and Idriss and Boulanger have no row-by-row reference, so every engine uses the column kernels
+    def _AIJ(self):
+
+        if self.params["method_params"]["year"] not in [2001]:
+            raise NotImplementedError(f"AIJ {self.params['method_params']['year']} method is not implemented yet.")
+
+        self._assign_columns("AIJ")
+
+    def _Idriss_and_Boulanger(self):
+
+        self._assign_columns("Idriss and Boulanger")
+
+    def _assign_columns(self, method):
+
+        values = {column: self.df_SPT[column].to_numpy(dtype=float) for column in METHOD_INPUT_COLUMNS[method]}
+        columns = self._method_columns(method, values, METHOD_COLUMNS[method])
+
+        for column in METHOD_COLUMNS[method]:
+            self.df_SPT[column] = columns[column]
+
+
+
+class SweepFL(CalculateFL):
+
+    def __init__(self, df_SPT, params, scenarios, stress_profile=None):
+        """
+        複数の地震動パラメータ（シナリオ）に対する FL を一度に計算する
+
+        応力・N1・Na・RL などシナリオによらない項は1回だけ計算し、
+        L・Cw・FL だけをシナリオ数 × 深度数の配列として計算する
+
+        Parameters
+        ----------
+        df_SPT : DataFrame
+            土層情報をマージ済みの SPT データ
+        params : dict
+            LiquefactionManifest.data に相当する辞書（method, borehole_data を含む）
+        scenarios : list
+            CheckMethodParam で検証済みのパラメータの辞書のリスト
+        stress_profile : StressProfile, optional
+            作成済みの応力分布
+        """
+        self.df_SPT = df_SPT
+        self.params = params
+        self.engine = "vectorized"
+        self.stress_profile = stress_profile
+        self.scenarios = list(scenarios)
+
+        if self.params["method"] != "JRA":
+            raise NotImplementedError(f"Scenario sweep is not implemented for {self.params['method']}.")
+        if any(scenario["year"] not in [2012, 2017] for scenario in self.scenarios):
+            raise NotImplementedError("Scenario sweep is only implemented for JRA 2012 / 2017.")
+
+        with stage("sweep_FL", records=len(self.scenarios) * len(self.df_SPT)):
+            self._JRA_2012_2017_sweep()
+
+        return None
+
+    def _JRA_2012_2017_sweep(self):
+
+        self.resistance = self._JRA_2012_2017_resistance()
+
+        Khgl = np.array([scenario["Khgl"] for scenario in self.scenarios], dtype=float)[:, np.newaxis]
+        is_type_II = np.array([scenario["EQ_level"] == 2 and scenario.get("EQ_type") == 2
+                               for scenario in self.scenarios])[:, np.newaxis]
+
+        self.load = self._JRA_2012_2017_load(self.resistance, Khgl, is_type_II)
+
+    def get_FL(self):
+        """
+        Returns
+        -------
+        ndarray
+            (シナリオ数, 深度数) の FL
+        """
+        return self.load["FL"]
+
+    def get_scenarios(self):
+
+        return pd.DataFrame(self.scenarios)
+
+
+class MultiMethodFL(CalculateFL):
+
+    def __init__(self, df_SPT, params, methods, stress_profile=None):
+        """
+        同じボーリングに対して複数の判定手法の FL を計算する
+
+        手法間で共通の中間量（SHARED_COLUMNS：上載圧、応力低減係数）は1回だけ計算し、
+        各手法ではそれ以外の項だけを計算する
+
+        Parameters
+        ----------
+        df_SPT : DataFrame
+            土層情報をマージ済みの SPT データ
+        params : dict
+            LiquefactionManifest.data に相当する辞書（borehole_data を含む）
+        methods : dict
+            {手法: CheckMethodParam で検証済みのパラメータ}
+        stress_profile : StressProfile, optional
+            作成済みの応力分布
+        """
+        self.df_SPT = df_SPT
+        self.base_params = params
+        self.params = params
+        self.engine = "vectorized"
+        self.stress_profile = stress_profile
+        self.methods = dict(methods)
+
+        for method, method_params in self.methods.items():
+            if method not in METHOD_COLUMNS:
+                raise ValueError("Invalid method.")
+            if method == "JRA" and method_params["year"] not in [2012, 2017]:
+                raise NotImplementedError("Only JRA 2012 / 2017 can be compared with other methods.")
+            if method == "AIJ" and method_params["year"] not in [2001]:
+                raise NotImplementedError(f"AIJ {method_params['year']} method is not implemented yet.")
+
+        with stage("multi_method_FL", records=len(self.methods) * len(self.df_SPT)):
+            self._calculate_methods()
+
+        return None
+
+    def _calculate_methods(self):
+
+        input_columns = sorted(set().union(*(METHOD_INPUT_COLUMNS[method] for method in self.methods)))
+        inputs = {column: self.df_SPT[column].to_numpy(dtype=float) for column in input_columns}
+
+        # shared columns are computed from depth and the stress profile alone
+        kernels = {"sigma_v": self._calculate_sigma_v, "sigma_p_v": self._calculate_sigma_p_v, "rd": self._calculate_rd}
+        self.shared = {column: kernels[column](inputs["depth"]) for column, methods in SHARED_COLUMNS.items()
+                       if len(set(methods) & set(self.methods)) > 1}
+
+        self.results = {}
+        for method, method_params in self.methods.items():
+            # the kernels read the parameters of the method being calculated
+            self.params = {**self.base_params, "method": method, "method_params": method_params}
+            values = {**inputs, **{column: self.shared[column] for column in self.shared if method in SHARED_COLUMNS[column]}}
+            columns = [column for column in METHOD_COLUMNS[method] if column not in values]
+            self.results[method] = {**values, **self._method_columns(method, values, columns)}
+
+        self.params = self.base_params
+
+    def get_FL(self, method=None):
+        """
+        Parameters
+        ----------
+        method : str, optional
+            手法。None の場合は全手法
+
+        Returns
+        -------
+        DataFrame or dict
+            df_SPT に手法の計算結果の列を付加した表。method が None の場合は {手法: 表}
+        """
+        if method is None:
+            return {method: self.get_FL(method) for method in self.methods}
+
+        df_FL = self.df_SPT.copy()
+        for column in METHOD_COLUMNS[method]:
+            df_FL[column] = self.results[method][column]
+
+        return df_FL
+
+
+class IncrementalFL(CalculateFL):
+
+    def __init__(self, df_SPT, params, stress_profile=None):
+        """
+        JRA 2012 / 2017 の FL を計算し、入力の変更に対して影響を受ける行・列だけを再計算する
+
+        各列の依存関係は JRA_DEPENDENCIES に従う。例えば Khgl の変更では L と FL だけ、
+        ある土層の Fc の変更ではその土層に含まれる行の CFc 以降だけを再計算する
+
+        Parameters
+        ----------
+        df_SPT : DataFrame
+            土層情報をマージ済みの SPT データ
+        params : dict
+            LiquefactionManifest.data に相当する辞書（method, method_params, borehole_data を含む）
+        stress_profile : StressProfile, optional
+            作成済みの応力分布
+        """
+        self.df_SPT = df_SPT
+        # own copy: later parameter changes arrive through update()
+        self.params = {**params}
+        self.engine = "vectorized"
+        self.stress_profile = stress_profile
+
+        if self.params["method"] != "JRA" or self.params["method_params"]["year"] not in [2012, 2017]:
+            raise NotImplementedError("Incremental calculation is only implemented for JRA 2012 / 2017.")
+
+        with stage("calculate_FL", records=len(self.df_SPT)):
+            self.values = {column: self.df_SPT[column].to_numpy(dtype=float).copy() for column in JRA_INPUT_COLUMNS}
+            self.values.update(self._JRA_2012_2017_columns(self.values, JRA_COLUMNS, *self._load_params()))
+
+        self.last_update = {"columns": JRA_COLUMNS, "rows": len(self.df_SPT)}
+
+        return None
+
+    def _load_params(self):
+
+        method_params = self.params["method_params"]
+
+        return method_params["Khgl"], method_params["EQ_level"] == 2 and method_params["EQ_type"] == 2
+
+    def update(self, rows=None, stress_profile=None, method_params=None, **inputs):
+        """
+        入力を変更し、影響を受ける列を対象の行だけ再計算する
+
+        Parameters
+        ----------
+        rows : array_like, optional
+            変更の影響を受ける行（ブール配列または行番号）, by default 全行
+        stress_profile : StressProfile, optional
+            単位体積重量または地下水位を変更した後の応力分布
+        method_params : dict, optional
+            Khgl, EQ_level, EQ_type を変更した後のパラメータ（CheckMethodParam で検証済み）
+        **inputs
+            変更後の入力列（N, D50, Fc）。rows と同じ長さの配列またはスカラー
+
+        Returns
+        -------
+        dict
+            再計算した列 (columns) と行数 (rows)
+        """
+        rows = np.arange(len(self.df_SPT)) if rows is None else np.asarray(rows)
+        if rows.dtype == bool:
+            rows = np.flatnonzero(rows)
+
+        invalid = set(inputs) - set(JRA_INPUT_COLUMNS) | ({"depth"} & set(inputs))
+        if invalid:
+            raise ValueError(f"Invalid inputs: {sorted(invalid)}")
+
+        changed = set(inputs)
+        for column, value in inputs.items():
+            self.values[column][rows] = value
+
+        if stress_profile is not None:
+            self.stress_profile = stress_profile
+            changed.add("stress_profile")
+
+        if method_params is not None:
+            old_Khgl, old_is_type_II = self._load_params()
+            self.params = {**self.params, "method_params": method_params}
+            new_Khgl, new_is_type_II = self._load_params()
+            if new_Khgl != old_Khgl:
+                changed.add("Khgl")
+            if new_is_type_II != old_is_type_II:
+                changed.add("EQ_type")
+
+        columns = dependent_columns(changed)
+        if columns and len(rows):
+            subset = {column: values[rows] for column, values in self.values.items()}
+            for column, values in self._JRA_2012_2017_columns(subset, columns, *self._load_params()).items():
+                self.values[column][rows] = values
+
+        self.last_update = {"columns": columns, "rows": len(rows) if columns else 0}
+
+        return self.last_update
+
+    def get_FL(self, df_SPT=None):
+        """
+        Parameters
+        ----------
+        df_SPT : DataFrame, optional
+            結果の列を付加する表（編集後の SPT データなど）, by default 作成時の df_SPT
+
+        Returns
+        -------
+        DataFrame
+            df_SPT に現在の入力と計算結果の列を付加した表
+        """
+        df_FL = (self.df_SPT if df_SPT is None else df_SPT).copy()
+        for column in JRA_INPUT_COLUMNS[1:]:
+            df_FL[column] = self.values[column].astype(df_FL[column].dtype)
+        for column in JRA_COLUMNS:
+            df_FL[column] = self.values[column]
+
+        return df_FL
@@ -0,0 +1,352 @@
+from datetime import datetime, timezone
+from pathlib import Path
+import hashlib
+import json
+import re
+import sqlite3
+import warnings
+import zipfile
+import pandas as pd
+from .load import LoadData, LOADER_VERSION
+from .prefetch import PrefetchReader, collect_sources
+
+# bump when the table layout changes; a catalog of another version is rebuilt
+CATALOG_VERSION = 1
+
+# (column, SQLite type) of the boreholes table, keyed by file_path as collect_sources names it
+CATALOG_COLUMNS = [
+    ("file_path", "TEXT PRIMARY KEY"), ("borehole_id", "TEXT"), ("archive", "TEXT"), ("member", "TEXT"),
+    ("size", "INTEGER"), ("mtime_ns", "INTEGER"), ("content_hash", "TEXT"), ("loader_version", "INTEGER"),
+    ("status", "TEXT"), ("error", "TEXT"), ("n_warnings", "INTEGER"), ("warnings", "TEXT"),
+    ("lat", "REAL"), ("lon", "REAL"), ("start_date", "TEXT"), ("survey_date", "TEXT"),
+    ("tip_elevation", "REAL"), ("total_depth", "REAL"), ("depth", "REAL"), ("ground_water_level", "REAL"),
+    ("max_SPT_depth", "REAL"), ("n_soil_layers", "INTEGER"), ("n_SPT", "INTEGER"),
+    ("dtd_version", "TEXT"), ("soil_layer_tag", "TEXT"), ("indexed_at", "TEXT"),
+]
+
+CATALOG_INDEXES = {
+    "idx_boreholes_location": ["lat", "lon"],
+    "idx_boreholes_survey_date": ["survey_date"],
+    "idx_boreholes_depth": ["depth"],
+}
+
+# year, month and day of 調査期間_開始年月日 in the usual separators (1971-07-03, 1971/7/3, 1971.07.03)
+DATE_PATTERN = re.compile(r"(\d{4})\D(\d{1,2})\D(\d{1,2})")
+
+
+def _normalize_date(text):
+
+    # ISO text, so that dates compare (and are indexed) as strings
+    match = DATE_PATTERN.search(str(text)) if text else None
+    if match is None:
+        return None
+
+    try:
+        return datetime(*map(int, match.groups())).strftime("%Y-%m-%d")
+    except ValueError:
+        return None
+
+
+def _max_depth(items):
+
+    depths = [item["depth"] for item in items or [] if item.get("depth") is not None]
+
+    return max(depths) if depths else None
+
+
+def _index_source(source, content):
+
+    # one catalog row from the file content; a file that LoadData cannot read is recorded as an error
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+
+        try:
+            loader = LoadData(source.name, content=content)
+            data, schema, error = loader.data, loader.schema, None
+        except Exception as e:
+            data, schema, error = {}, {}, f"{type(e).__name__}: {str(e)}"
+
+    max_SPT_depth = _max_depth(data.get("SPT"))
+    total_depth = data.get("total_depth")
+    deepest = [depth for depth in [max_SPT_depth, _max_depth(data.get("soil_layers"))] if depth is not None]
+
+    return {
+        "status": "ok" if error is None else "error",
+        "error": error,
+        "n_warnings": len(caught),
+        "warnings": json.dumps([str(w.message) for w in caught], ensure_ascii=False),
+        "lat": data.get("lat"),
+        "lon": data.get("lon"),
+        "start_date": data.get("start_date"),
+        "survey_date": _normalize_date(data.get("start_date")),
+        "tip_elevation": data.get("tip_elevation"),
+        "total_depth": total_depth,
+        # depth of the borehole: the recorded total depth, otherwise the deepest layer or SPT
+        "depth": total_depth if total_depth is not None else (max(deepest) if deepest else None),
+        "ground_water_level": data.get("ground_water_level"),
+        "max_SPT_depth": max_SPT_depth,
+        "n_soil_layers": len(data.get("soil_layers") or []),
+        "n_SPT": len(data.get("SPT") or []),
+        "dtd_version": schema.get("dtd_version"),
+        "soil_layer_tag": schema.get("soil_layer_tag"),
+    }
+
+
+class BoreholeCatalog:
+
+    def __init__(self, path):
+        """
+        ボーリングファイルのメタデータ・内容ハッシュ・読み込み結果を SQLite に保存するカタログ
+
+        位置・調査開始日・深度に索引を持つため、範囲による絞り込みを1回のクエリで行える
+
+        Parameters
+        ----------
+        path : str or Path
+            カタログのデータベースファイル（存在しない場合は作成する）
+
+        使用例:
+            with BoreholeCatalog("catalog.sqlite") as catalog:
+                catalog.update("data/")
+                df = catalog.select(bbox=(35.0, 139.0, 36.0, 140.0), depth_range=(20, None),
+                                    date_range=("2000-01-01", None))
+        """
+        self.params = {
+            "path": Path(path),
+        }
+
+        self.params["path"].parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(self.params["path"])
+        self._create_tables()
+
+        return None
+
+    def _create_tables(self):
+
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+
+        with self.connection:
+            if version != CATALOG_VERSION:
+                self.connection.execute("DROP TABLE IF EXISTS boreholes")
+
+            columns = ", ".join(f"{name} {dtype}" for name, dtype in CATALOG_COLUMNS)
+            self.connection.execute(f"CREATE TABLE IF NOT EXISTS boreholes ({columns})")
+            for name, index_columns in CATALOG_INDEXES.items():
+                self.connection.execute(f"CREATE INDEX IF NOT EXISTS {name} ON boreholes ({', '.join(index_columns)})")
+            self.connection.execute(f"PRAGMA user_version = {CATALOG_VERSION}")
+
+    def update(self, path, file_types=(".xml",), prune=True, io_workers=8, commit_every=1000):
+        """
+        ファイルを走査し、新しいファイルと変更されたファイルだけを読み込んでカタログに登録する
+
+        サイズと更新時刻（zip アーカイブのメンバーはアーカイブの更新時刻）が登録時と同じファイルは読み込まない。
+        異なる場合は内容ハッシュを比較し、内容か LOADER_VERSION が変わったファイルだけを解析し直す
+
+        Parameters
+        ----------
+        path : str or Path or list
+            ディレクトリ、glob パターン、ファイル、zip アーカイブ、またはそれらのリスト
+        file_types : tuple, optional
+            対象とする拡張子, by default (".xml",)
+        prune : bool, optional
+            True の場合、存在しなくなったファイルをカタログから削除する
+        io_workers : int, optional
+            先読みのスレッド数, by default 8
+        commit_every : int, optional
+            この件数ごとにコミットする。中断しても登録済みのファイルは次回読み込まない
+
+        Returns
+        -------
+        dict
+            added, updated, unchanged, removed, failed の件数
+        """
+        counts = {"added": 0, "updated": 0, "unchanged": 0, "removed": 0, "failed": 0}
+
+        known = {row[0]: row[1:] for row in self.connection.execute(
+            "SELECT file_path, size, mtime_ns, content_hash, loader_version FROM boreholes")}
+
+        stale, mtimes = [], {}
+        for source in collect_sources(path, file_types):
+            if source.path not in mtimes:
+                mtimes[source.path] = source.path.stat().st_mtime_ns
+            row = known.get(source.name)
+            if row is not None and row[:2] == (source.size, mtimes[source.path]) and row[3] == LOADER_VERSION:
+                counts["unchanged"] += 1
+            else:
+                stale.append(source)
+
+        reader = PrefetchReader(stale, max_workers=io_workers)
+        for i, (source, content, error) in enumerate(reader, 1):
+            row = known.get(source.name)
+            stat = {"size": source.size, "mtime_ns": mtimes[source.path]}
+
+            if error is not None:
+                entry = {"status": "error", "error": f"{type(error).__name__}: {str(error)}", "content_hash": None}
+            else:
+                content_hash = hashlib.sha256(content).hexdigest()
+                if row is not None and row[2:] == (content_hash, LOADER_VERSION):
+                    # touched but not changed: only the stat is refreshed
+                    self.connection.execute("UPDATE boreholes SET size = ?, mtime_ns = ? WHERE file_path = ?",
+                                            (stat["size"], stat["mtime_ns"], source.name))
+                    counts["unchanged"] += 1
+                    continue
+                entry = {"content_hash": content_hash, **_index_source(source, content)}
+
+            self._upsert({
+                "file_path": source.name,
+                "borehole_id": Path(source.name).stem,
+                "archive": str(source.path) if source.member is not None else None,
+                "member": source.member,
+                **stat,
+                "loader_version": LOADER_VERSION,
+                **entry,
+                "indexed_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            })
+            counts["updated" if row is not None else "added"] += 1
+            counts["failed"] += entry["status"] == "error"
+
+            if i % commit_every == 0:
+                self.connection.commit()
+
+        self.connection.commit()
+
+        if prune:
+            counts["removed"] = self.prune()
+
+        return counts
+
+    def _upsert(self, record):
+
+        names = [name for name, _ in CATALOG_COLUMNS]
+        self.connection.execute(f"INSERT OR REPLACE INTO boreholes ({', '.join(names)}) "
+                                f"VALUES ({', '.join('?' * len(names))})", [record.get(name) for name in names])
+
+    def prune(self):
+        """
+        存在しなくなったファイル・アーカイブのメンバーをカタログから削除する
+
+        Returns
+        -------
+        int
+            削除した件数
+        """
+        members = {}
+        removed = []
+
+        for file_path, archive, member in self.connection.execute("SELECT file_path, archive, member FROM boreholes"):
+            if archive is None:
+                if not Path(file_path).is_file():
+                    removed.append(file_path)
+                continue
+
+            if archive not in members:
+                try:
+                    with zipfile.ZipFile(archive) as f:
+                        members[archive] = set(f.namelist())
+                except (OSError, zipfile.BadZipFile):
+                    members[archive] = set()
+            if member not in members[archive]:
+                removed.append(file_path)
+
+        with self.connection:
+            self.connection.executemany("DELETE FROM boreholes WHERE file_path = ?", [(p,) for p in removed])
+
+        return len(removed)
+
+    def select(self, bbox=None, depth_range=None, date_range=None, status="ok", columns=None):
+        """
+        条件に合うボーリングを1回のクエリで取得する
+
+        Parameters
+        ----------
+        bbox : tuple, optional
+            (lat_min, lon_min, lat_max, lon_max)
+        depth_range : tuple, optional
+            (min, max) [m]。ボーリングの深度（総掘進長、ない場合は最深の土層・SPT の深度）の範囲。None の端は制限しない
+        date_range : tuple, optional
+            (開始, 終了)。調査開始日の範囲（"YYYY-MM-DD" の文字列または日付）。None の端は制限しない
+        status : str, optional
+            "ok"（読み込めたファイル）、"error"、None（すべて）, by default "ok"
+        columns : list, optional
+            取得する列。None の場合はすべての列
+
+        Returns
+        -------
+        DataFrame
+            条件に合うボーリング（file_path 順）
+        """
+        conditions, values = [], []
+
+        def between(column, bounds, convert=lambda value: value):
+            low, high = bounds
+            if low is not None:
+                conditions.append(f"{column} >= ?")
+                values.append(convert(low))
+            if high is not None:
+                conditions.append(f"{column} <= ?")
+                values.append(convert(high))
+
+        if bbox is not None:
+            lat_min, lon_min, lat_max, lon_max = bbox
+            between("lat", (lat_min, lat_max))
+            between("lon", (lon_min, lon_max))
+        if depth_range is not None:
+            between("depth", depth_range)
+        if date_range is not None:
+            between("survey_date", date_range, lambda value: pd.Timestamp(value).strftime("%Y-%m-%d"))
+        if status is not None:
+            conditions.append("status = ?")
+            values.append(status)
+
+        names = [name for name, _ in CATALOG_COLUMNS]
+        if columns is not None:
+            invalid = [column for column in columns if column not in names]
+            if invalid:
+                raise ValueError(f"Invalid columns {invalid}.")
+            names = list(columns)
+
+        sql = f"SELECT {', '.join(names)} FROM boreholes"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+
+        return self.query(sql + " ORDER BY file_path", values)
+
+    def query(self, sql, params=()):
+        """
+        任意の SQL でカタログを検索する
+
+        Parameters
+        ----------
+        sql : str
+            SELECT 文（表は boreholes）
+        params : sequence, optional
+            プレースホルダーの値
+
+        Returns
+        -------
+        DataFrame
+            結果
+        """
+        return pd.read_sql_query(sql, self.connection, params=list(params))
+
+    def __len__(self):
+
+        return self.connection.execute("SELECT COUNT(*) FROM boreholes").fetchone()[0]
+
+    def close(self):
+
+        self.connection.close()
+
+        return None
+
+    def __enter__(self):
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+
+        if exc_type is None:
+            self.connection.commit()
+        self.close()
+
+        return False
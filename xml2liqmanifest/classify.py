@@ -0,0 +1,212 @@
+from collections import namedtuple
+from pathlib import Path
+import functools
+import hashlib
+import re
+import numpy as np
+import pandas as pd
+
+SOIL_PROPERTIES_PATH = Path(__file__).parent / "soil_properties.csv"
+
+# properties resolved for each soil name; PI is NaN when the table has no such column
+SOIL_PROPERTY_COLUMNS = ["gamma_wet", "gamma_sat", "Fc", "D50", "PI"]
+
+# category lists of JPPitLogPatternCreator.createPattern (patterns.js)
+FIRST_CATEGORY_NAMES = ["礫", "礫質土", "砂", "砂質土", "シルト",
+                        "粘性土", "有機質土", "火山灰質粘性土", "高有機質土（腐植土）"]
+SECOND_CATEGORY_NAMES = ["砂質", "シルト質", "粘土質", "有機質", "火山灰質",
+                         "玉石混り", "砂利、礫混り", "砂混り", "シルト混り", "粘土混り",
+                         "有機質土混り", "火山灰混り", "貝殻混り"]
+THIRD_CATEGORY_NAMES = ["硬岩", "中硬岩", "軟岩、風化岩", "玉石", "浮石（軽石）", "シラス",
+                        "スコリア", "火山灰", "ローム", "黒ボク", "マサ", "表土", "埋土", "廃棄物"]
+
+# row of the soil property table used when a name itself is not in the table
+CATEGORY_PROPERTY_NAMES = {
+    "礫": "砂礫", "礫質土": "砂礫", "砂": "砂", "砂質土": "砂", "シルト": "シルト", "粘性土": "粘土",
+    "有機質土": "有機質土", "火山灰質粘性土": "粘土", "高有機質土（腐植土）": "腐植土", "表土": "表土", "埋土": "埋土",
+}
+
+# both spellings appear in borehole logs; the category lists use 混り
+SPELLING_VARIANTS = {"混じり": "混り"}
+
+# zero-width lookahead finds every occurrence, including overlapping ones; at each position the alternatives are tried
+# in list order, so the smallest index found over all positions is the first name of the list contained in the text,
+# the same as SECOND_CATEGORY_NAMES.findIndex(name => soilType.includes(name))
+SECOND_CATEGORY_PATTERN = re.compile("(?=(" + "|".join(map(re.escape, SECOND_CATEGORY_NAMES)) + "))")
+SPELLING_PATTERN = re.compile("|".join(map(re.escape, SPELLING_VARIANTS)))
+
+SECOND_CATEGORY_INDEX = {name: i for i, name in enumerate(SECOND_CATEGORY_NAMES)}
+FIRST_CATEGORY_INDEX = {name: i for i, name in enumerate(FIRST_CATEGORY_NAMES)}
+THIRD_CATEGORY_INDEX = {name: i for i, name in enumerate(THIRD_CATEGORY_NAMES)}
+
+# first / second / third are the indices of matchCategoryName_ (-1 when not matched);
+# category is the matched first or third category name, property_name the table row the properties come from
+SoilClass = namedtuple("SoilClass", ["name", "first", "second", "third", "category", "property_name", "properties"])
+
+
+@functools.lru_cache(maxsize=None)
+def load_soil_properties(path=SOIL_PROPERTIES_PATH):
+    """
+    土質名ごとの物性値の表を読み込む（プロセスごとに1回だけ読み込む）
+
+    Returns
+    -------
+    DataFrame
+        soil_class_name を index とし、SOIL_PROPERTY_COLUMNS の列を持つ表
+    """
+    df_properties = pd.read_csv(path).drop_duplicates("soil_class_name").set_index("soil_class_name")
+
+    return df_properties.reindex(columns=SOIL_PROPERTY_COLUMNS).astype(float)
+
+
+@functools.lru_cache(maxsize=None)
+def hash_soil_properties(path=SOIL_PROPERTIES_PATH):
+    """
+    load_soil_properties() で解決した物性値の表のハッシュ（FL のキャッシュキーに使う）
+
+    Returns
+    -------
+    str
+        土質名・列名・物性値の SHA-256
+    """
+    df_properties = load_soil_properties(path)
+
+    digest = hashlib.sha256()
+    digest.update("\t".join(df_properties.index).encode("utf-8"))
+    digest.update("\t".join(df_properties.columns).encode("utf-8"))
+    digest.update(np.ascontiguousarray(df_properties.to_numpy(dtype=np.float64)).tobytes())
+
+    return digest.hexdigest()
+
+
+def match_category(name):
+    """
+    土質名を patterns.js の matchCategoryName_ と同じ規則で分類する
+
+    「混じり」は「混り」とみなす
+
+    Parameters
+    ----------
+    name : str
+        土質名
+
+    Returns
+    -------
+    tuple
+        (第1分類, 第2分類, 第3分類) の番号。該当しない分類は -1
+    """
+    if not isinstance(name, str):
+        return -1, -1, -1
+
+    name = SPELLING_PATTERN.sub(lambda m: SPELLING_VARIANTS[m.group()], name)
+
+    # perfect match (also covers the exceptional case 火山灰質粘性土 of the JS version)
+    if name in FIRST_CATEGORY_INDEX:
+        return FIRST_CATEGORY_INDEX[name], -1, -1
+
+    # partial match: the first name of the second category list that the text contains
+    matches = SECOND_CATEGORY_PATTERN.findall(name)
+    if matches:
+        second = min(SECOND_CATEGORY_INDEX[match] for match in matches)
+        first = FIRST_CATEGORY_INDEX.get(name.replace(SECOND_CATEGORY_NAMES[second], "", 1), -1)
+        if first != -1:
+            return first, second, -1
+
+    return -1, -1, THIRD_CATEGORY_INDEX.get(name, -1)
+
+
+class SoilClassifier:
+
+    def __init__(self, soil_properties=None):
+        """
+        土質名を分類し、物性値を解決する。結果は土質名ごとに1回だけ計算して保持する
+
+        物性値は、土質名そのものが物性値の表にあればその行、なければ分類（第1分類または第3分類）に
+        対応する CATEGORY_PROPERTY_NAMES の行から取る
+
+        Parameters
+        ----------
+        soil_properties : DataFrame, optional
+            load_soil_properties() と同じ形式の物性値の表, by default soil_properties.csv
+        """
+        soil_properties = load_soil_properties() if soil_properties is None else soil_properties
+        values = soil_properties.reindex(columns=SOIL_PROPERTY_COLUMNS).to_numpy(dtype=float)
+
+        self.properties = dict(zip(soil_properties.index, map(tuple, values)))
+        self.classes = {}
+
+        return None
+
+    def classify(self, name):
+        """
+        Parameters
+        ----------
+        name : str
+            土質名
+
+        Returns
+        -------
+        SoilClass
+            分類と物性値。物性値が解決できない場合 properties は None
+        """
+        soil_class = self.classes.get(name)
+
+        if soil_class is None:
+            soil_class = self.classes[name] = self._resolve(name)
+
+        return soil_class
+
+    def _resolve(self, name):
+
+        first, second, third = match_category(name)
+
+        if first != -1:
+            category = FIRST_CATEGORY_NAMES[first]
+        elif third != -1:
+            category = THIRD_CATEGORY_NAMES[third]
+        else:
+            category = None
+
+        if name in self.properties:
+            property_name = name
+        else:
+            property_name = CATEGORY_PROPERTY_NAMES.get(category)
+            if property_name not in self.properties:
+                property_name = None
+
+        return SoilClass(name, first, second, third, category, property_name, self.properties.get(property_name))
+
+    def encode(self, names):
+        """
+        土質名の列を、重複のない分類のリストとその番号の配列に変換する
+
+        Parameters
+        ----------
+        names : iterable
+            土質名
+
+        Returns
+        -------
+        tuple
+            (番号の配列, SoilClass のリスト)
+        """
+        codes = {}
+        classes = []
+        encoded = []
+
+        for name in names:
+            code = codes.get(name)
+            if code is None:
+                code = codes[name] = len(classes)
+                classes.append(self.classify(name))
+            encoded.append(code)
+
+        return np.array(encoded, dtype=np.int32), classes
+
+
+@functools.lru_cache(maxsize=None)
+def get_default_classifier():
+    """
+    soil_properties.csv を使う分類器。プロセス内で共有されるため、一括処理でも土質名ごとの解決は1回で済む
+    """
+    return SoilClassifier()
@@ -0,0 +1,182 @@
+"""
+xml2liqmanifest のコマンドライン
+
+使用例:
+    python -m xml2liqmanifest load ref/01_002611.XML -o borehole.json
+    python -m xml2liqmanifest calc ref/01_002611.XML --method JRA --params params.json
+    python -m xml2liqmanifest export ref/01_002611.XML --method JRA --params params.json -o res/01_002611_FL.csv
+    python -m xml2liqmanifest batch "ref/**/*.XML" --method JRA --params params.json -o res/result.csv.gz --resume
+
+--params には JSON の文字列、または JSON ファイルのパスを指定する
+"""
+# only the standard library is imported here; every command imports the stages it runs
+import argparse
+import json
+import sys
+from pathlib import Path
+
+
+def _read_params(value):
+
+    path = Path(value)
+    text = path.read_text(encoding="utf-8") if path.suffix.lower() == ".json" and path.is_file() else value
+
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid --params: {str(e)}") from e
+
+
+def _write_text(text, output):
+
+    if output is None:
+        sys.stdout.write(text)
+    else:
+        Path(output).parent.mkdir(parents=True, exist_ok=True)
+        Path(output).write_text(text, encoding="utf-8")
+
+
+def _calculate(args):
+
+    from .load import LoadData, CheckMethodParam
+    from .batch import calculate_borehole
+
+    method_params = CheckMethodParam(args.method, _read_params(args.params)).get_params()
+    data = LoadData(args.file, xml_parser=args.parser).data
+
+    return calculate_borehole(data, args.method, method_params, args.engine, file_path=Path(args.file))
+
+
+def run_load(args):
+
+    from .load import LoadData
+
+    loader = LoadData(args.file, xml_parser=args.parser)
+    text = json.dumps({"file_path": str(args.file), "schema": loader.schema, **loader.data}, ensure_ascii=False, indent=1)
+    _write_text(text + "\n", args.output)
+
+    return 0
+
+
+def run_calc(args):
+
+    from .indices import calculate_indices, get_liquefiable_rows
+
+    df_FL = _calculate(args).assign(file_path=str(args.file))
+    indices = calculate_indices(df_FL, group_column="file_path").iloc[0]
+
+    summary = {
+        "file_path": str(args.file),
+        "method": args.method,
+        "rows": len(df_FL),
+        "liquefied_rows": int((get_liquefiable_rows(df_FL) & (df_FL["FL"].to_numpy(dtype=float) < 1)).sum()),
+        **{name: float(indices[name]) for name in ["PL", "H_liq", "FL_min"]},
+    }
+    _write_text(json.dumps(summary, ensure_ascii=False) + "\n", args.output)
+
+    return 0
+
+
+def run_export(args):
+
+    from .export import ResultWriter
+
+    df_FL = _calculate(args)
+    with ResultWriter(args.output, args.format, args.compression, keep_progress=False) as writer:
+        writer.write(Path(args.file).stem, df_FL)
+
+    print(writer.path, file=sys.stderr)
+
+    return 0
+
+
+def run_batch(args):
+
+    from .batch import LiquefactionManifestBatch
+
+    batch = LiquefactionManifestBatch(args.path, args.method, _read_params(args.params), max_workers=args.max_workers,
+                                      engine=args.engine, file_types=tuple(args.file_types), prefetch=args.prefetch,
+                                      io_workers=args.io_workers, validation=args.validation)
+    path = batch.export(args.output, args.format, args.compression, chunk_rows=args.chunk_rows, resume=args.resume)
+
+    failures = batch.get_failures()
+    if args.failures is not None and len(failures):
+        failures.to_csv(args.failures, index=False)
+    print(f"{path}: {len(batch.file_paths)} files, {len(failures)} failed", file=sys.stderr)
+    if args.validation is not None:
+        print(batch.get_validation_summary().to_string(index=False), file=sys.stderr)
+
+    return 0
+
+
+def build_parser():
+
+    parser = argparse.ArgumentParser(prog="xml2liqmanifest", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    method = argparse.ArgumentParser(add_help=False)
+    method.add_argument("--method", required=True, choices=["JRA", "AIJ", "Idriss and Boulanger"])
+    method.add_argument("--params", required=True, help="手法のパラメータ（JSON の文字列または .json ファイル）")
+    method.add_argument("--engine", default="vectorized", choices=["vectorized", "loop", "numba"])
+
+    output_format = argparse.ArgumentParser(add_help=False)
+    output_format.add_argument("--format", choices=["csv", "jsonl", "parquet"], help="省略時は拡張子から決める")
+    output_format.add_argument("--compression", help="gzip（CSV・JSON Lines）または Parquet の圧縮方式")
+
+    load = commands.add_parser("load", help="XML を読み込み、ボーリングデータを JSON で出力する")
+    load.add_argument("file", type=Path)
+    load.add_argument("--parser", default="iterparse", choices=["iterparse", "tree"])
+    load.add_argument("-o", "--output", type=Path, help="出力先（省略時は標準出力）")
+    load.set_defaults(func=run_load)
+
+    calc = commands.add_parser("calc", parents=[method], help="FL を計算し、PL・H_liq・FL_min を JSON で出力する")
+    calc.add_argument("file", type=Path)
+    calc.add_argument("--parser", default="iterparse", choices=["iterparse", "tree"])
+    calc.add_argument("-o", "--output", type=Path, help="出力先（省略時は標準出力）")
+    calc.set_defaults(func=run_calc)
+
+    export = commands.add_parser("export", parents=[method, output_format], help="FL の計算結果をファイルに書き出す")
+    export.add_argument("file", type=Path)
+    export.add_argument("--parser", default="iterparse", choices=["iterparse", "tree"])
+    export.add_argument("-o", "--output", type=Path, required=True, help="出力先（.csv, .jsonl, .parquet, .gz）")
+    export.set_defaults(func=run_export)
+
+    batch = commands.add_parser("batch", parents=[method, output_format],
+                                help="ディレクトリ・glob パターン・zip アーカイブを一括で計算して書き出す")
+    batch.add_argument("path", nargs="+")
+    batch.add_argument("-o", "--output", type=Path, required=True, help="出力先（.csv, .jsonl, .parquet, .gz）")
+    batch.add_argument("--max-workers", type=int, help="プロセス数（省略時は CPU 数、1 で逐次処理）")
+    batch.add_argument("--file-types", nargs="+", default=[".xml"])
+    batch.add_argument("--prefetch", action="store_true", help="ファイルを先読みする")
+    batch.add_argument("--io-workers", type=int, default=8, help="先読みのスレッド数")
+    batch.add_argument("--chunk-rows", type=int, default=100_000)
+    batch.add_argument("--resume", action="store_true", help="中断した出力の続きから書き出す")
+    batch.add_argument("--failures", type=Path, help="失敗したファイルの一覧を書き出す CSV")
+    batch.add_argument("--validation", choices=["repair", "skip", "ignore"], help="計算前の検証で見つかった問題への対応")
+    batch.set_defaults(func=run_batch)
+
+    return parser
+
+
+def main(argv=None):
+    """
+    コマンドラインのエントリポイント
+
+    Parameters
+    ----------
+    argv : list, optional
+        引数。省略時は sys.argv[1:]
+
+    Returns
+    -------
+    int
+        終了コード
+    """
+    args = build_parser().parse_args(argv)
+
+    try:
+        return args.func(args)
+    except Exception as e:
+        print(f"xml2liqmanifest {args.command}: {type(e).__name__}: {str(e)}", file=sys.stderr)
+        return 1
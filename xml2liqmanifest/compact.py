@@ -0,0 +1,343 @@
+from pathlib import Path
+import sys
+import numpy as np
+import pandas as pd
+
+# header values kept per borehole; lat / lon stay float64 so that coordinates keep their precision
+HEADER_COLUMNS = ["lat", "lon", "tip_elevation", "total_depth", "ground_water_level"]
+
+# storage types of the numeric columns
+DEPTH_DTYPE = np.float32
+HITS_DTYPE = np.int16
+CODE_DTYPE = np.int32
+
+
+class _Vocabulary:
+
+    # interned strings shared by every borehole: each distinct class name / code is stored once
+    __slots__ = ("values", "codes")
+
+    def __init__(self):
+
+        self.values = []
+        self.codes = {}
+
+    def encode(self, value):
+
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+
+        return code
+
+
+def _offsets(counts):
+
+    offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+
+    return offsets
+
+
+def _to_floats(values):
+
+    # float32 -> shortest decimal repr, so that depths read from XML (at most 7 significant digits) come back exactly
+    if values.dtype == np.float32:
+        return [None if text == "nan" else float(text) for text in values.astype(str)]
+
+    return [None if value != value else value for value in values.tolist()]
+
+
+class CompactBoreholes:
+
+    __slots__ = ("borehole_ids", "_index", "header", "start_date", "class_names", "class_codes",
+                 "layer_offsets", "layer_depth", "layer_class_name", "layer_class_code",
+                 "note_offsets", "note_upper_depth", "note_lower_depth", "note_text",
+                 "spt_offsets", "spt_depth", "spt_total_hits", "spt_total_penetration",
+                 "interval_offsets", "interval_hits", "interval_penetration")
+
+    def __init__(self, boreholes):
+        """
+        多数のボーリングデータを列ごとの NumPy 配列（struct-of-arrays）として保持する
+
+        土層・観察記事・SPT・打撃区間はそれぞれ全ボーリング分を連結した1本の配列に格納し、
+        ボーリングごとの範囲はオフセット配列で表す（SPT ごとの打撃区間も同様）。
+        深度は float32、打撃回数は int16、土質名・土質記号は全ボーリングで共有する語彙の int32 コードとする
+
+        Parameters
+        ----------
+        boreholes : dict or iterable
+            {borehole_id: LoadData.data} の辞書、または (borehole_id, LoadData.data) の反復可能オブジェクト
+        """
+        if isinstance(boreholes, dict):
+            boreholes = boreholes.items()
+
+        class_names = _Vocabulary()
+        class_codes = _Vocabulary()
+
+        borehole_ids = []
+        header = {column: [] for column in HEADER_COLUMNS}
+        start_date = []
+        counts = {"layer": [], "note": [], "spt": []}
+        layer_depth, layer_class_name, layer_class_code = [], [], []
+        note_upper_depth, note_lower_depth, note_text = [], [], []
+        spt_depth, spt_total_hits, spt_total_penetration, interval_counts = [], [], [], []
+        interval_hits, interval_penetration = [], []
+
+        # plain lists first, one conversion to arrays at the end
+        for borehole_id, data in boreholes:
+            borehole_ids.append(str(borehole_id))
+            for column in HEADER_COLUMNS:
+                header[column].append(np.nan if data.get(column) is None else data[column])
+            start_date.append(data.get("start_date"))
+
+            layers = data.get("soil_layers") or []
+            counts["layer"].append(len(layers))
+            for layer in layers:
+                layer_depth.append(layer["depth"])
+                layer_class_name.append(class_names.encode(layer["class_name"]))
+                layer_class_code.append(class_codes.encode(layer["class_code"]))
+
+            notes = data.get("observation_note") or []
+            counts["note"].append(len(notes))
+            for note in notes:
+                note_upper_depth.append(note["upper_depth"])
+                note_lower_depth.append(note["lower_depth"])
+                note_text.append(note["note"])
+
+            SPTs = data.get("SPT") or []
+            counts["spt"].append(len(SPTs))
+            for spt in SPTs:
+                spt_depth.append(spt["depth"])
+                spt_total_hits.append(spt["total_hits"])
+                spt_total_penetration.append(spt["total_penetration"])
+                interval_counts.append(len(spt["intervals"]))
+                for interval in spt["intervals"]:
+                    interval_hits.append(interval["hits"])
+                    interval_penetration.append(interval["penetration"])
+
+        self.borehole_ids = borehole_ids
+        self._index = {borehole_id: i for i, borehole_id in enumerate(borehole_ids)}
+        if len(self._index) != len(borehole_ids):
+            raise ValueError("Duplicate borehole_id.")
+
+        self.header = {column: np.array(values, dtype=float) for column, values in header.items()}
+        for column in ["tip_elevation", "total_depth", "ground_water_level"]:
+            self.header[column] = self.header[column].astype(DEPTH_DTYPE)
+        self.start_date = np.array(start_date, dtype=object)
+
+        self.class_names = class_names.values
+        self.class_codes = class_codes.values
+
+        self.layer_offsets = _offsets(counts["layer"])
+        self.layer_depth = np.array(layer_depth, dtype=DEPTH_DTYPE)
+        self.layer_class_name = np.array(layer_class_name, dtype=CODE_DTYPE)
+        self.layer_class_code = np.array(layer_class_code, dtype=CODE_DTYPE)
+
+        self.note_offsets = _offsets(counts["note"])
+        self.note_upper_depth = np.array(note_upper_depth, dtype=DEPTH_DTYPE)
+        self.note_lower_depth = np.array(note_lower_depth, dtype=DEPTH_DTYPE)
+        self.note_text = np.array(note_text, dtype=object)
+
+        self.spt_offsets = _offsets(counts["spt"])
+        self.spt_depth = np.array(spt_depth, dtype=DEPTH_DTYPE)
+        self.spt_total_hits = np.array(spt_total_hits, dtype=HITS_DTYPE)
+        self.spt_total_penetration = np.array(spt_total_penetration, dtype=DEPTH_DTYPE)
+
+        self.interval_offsets = _offsets(interval_counts)
+        self.interval_hits = np.array(interval_hits, dtype=HITS_DTYPE)
+        self.interval_penetration = np.array(interval_penetration, dtype=DEPTH_DTYPE)
+
+        return None
+
+    @classmethod
+    def from_files(cls, file_paths, **kwargs):
+        """
+        ファイルを1本ずつ読み込んで変換する。辞書形式のデータは同時に1本分しか保持しない
+
+        Parameters
+        ----------
+        file_paths : list
+            ボーリングデータのファイルパス。ファイル名の stem を borehole_id とする
+        **kwargs
+            LoadData に渡す引数
+        """
+        from .load import LoadData
+
+        return cls((Path(file_path).stem, LoadData(file_path, **kwargs).data) for file_path in file_paths)
+
+    def __len__(self):
+
+        return len(self.borehole_ids)
+
+    def __contains__(self, borehole_id):
+
+        return str(borehole_id) in self._index
+
+    def _position(self, borehole_id):
+
+        try:
+            return self._index[str(borehole_id)]
+        except KeyError:
+            raise KeyError(f"Borehole {borehole_id} is not found.") from None
+
+    def get_borehole(self, borehole_id):
+        """
+        1本のボーリングを LoadData.data と同じ形式の辞書に戻す
+
+        Parameters
+        ----------
+        borehole_id : str
+            ボーリングID
+
+        Returns
+        -------
+        dict
+            ボーリングデータ
+        """
+        i = self._position(borehole_id)
+        data = {column: _to_floats(self.header[column][i:i + 1])[0] for column in HEADER_COLUMNS}
+        data["start_date"] = self.start_date[i]
+
+        # LoadData omits total_depth when it is missing
+        if data["total_depth"] is None:
+            del data["total_depth"]
+
+        start, end = self.layer_offsets[i], self.layer_offsets[i + 1]
+        data["soil_layers"] = [
+            {"depth": depth, "class_name": self.class_names[name], "class_code": self.class_codes[code]}
+            for depth, name, code in zip(_to_floats(self.layer_depth[start:end]),
+                                         self.layer_class_name[start:end].tolist(),
+                                         self.layer_class_code[start:end].tolist())
+        ] or None
+
+        start, end = self.note_offsets[i], self.note_offsets[i + 1]
+        data["observation_note"] = [
+            {"upper_depth": upper_depth, "lower_depth": lower_depth, "note": note}
+            for upper_depth, lower_depth, note in zip(_to_floats(self.note_upper_depth[start:end]),
+                                                      _to_floats(self.note_lower_depth[start:end]),
+                                                      self.note_text[start:end])
+        ] or None
+
+        start, end = self.spt_offsets[i], self.spt_offsets[i + 1]
+        interval_bounds = self.interval_offsets[start:end + 1].tolist()
+        interval_start, interval_end = interval_bounds[0], interval_bounds[-1]
+        hits = self.interval_hits[interval_start:interval_end].tolist()
+        penetration = _to_floats(self.interval_penetration[interval_start:interval_end])
+        data["SPT"] = [
+            {
+                "depth": depth,
+                "total_hits": total_hits,
+                "total_penetration": total_penetration,
+                "intervals": [{"hits": hits[k], "penetration": penetration[k]}
+                              for k in range(lower - interval_start, upper - interval_start)],
+            }
+            for depth, total_hits, total_penetration, lower, upper
+            in zip(_to_floats(self.spt_depth[start:end]), self.spt_total_hits[start:end].tolist(),
+                   _to_floats(self.spt_total_penetration[start:end]), interval_bounds[:-1], interval_bounds[1:])
+        ] or None
+
+        return data
+
+    def to_dicts(self):
+        """
+        Returns
+        -------
+        dict
+            {borehole_id: LoadData.data と同じ形式の辞書}
+        """
+        return {borehole_id: self.get_borehole(borehole_id) for borehole_id in self.borehole_ids}
+
+    def get_SPT(self, borehole_id):
+        """
+        1本のボーリングの SPT を DataFrame として返す。列は連結配列のスライス（ビュー）から作る
+
+        Returns
+        -------
+        DataFrame
+            depth, total_hits, total_penetration の列を持つ表
+        """
+        i = self._position(borehole_id)
+        window = slice(self.spt_offsets[i], self.spt_offsets[i + 1])
+
+        return pd.DataFrame({
+            "depth": self.spt_depth[window],
+            "total_hits": self.spt_total_hits[window],
+            "total_penetration": self.spt_total_penetration[window],
+        }, copy=False)
+
+    def get_table(self, table):
+        """
+        全ボーリング分の表を返す。列名は BoreholeDataset（store.TABLE_SCHEMAS）と同じ
+
+        数値列は保持している配列をそのまま使い、borehole_id と行番号の列だけを新たに作る
+
+        Parameters
+        ----------
+        table : str
+            "header", "soil_layers", "observation_note", "SPT", "intervals" のいずれか
+
+        Returns
+        -------
+        DataFrame
+            表。soil_layers の class_name / class_code は category 型
+        """
+        if table == "header":
+            return pd.DataFrame({"borehole_id": self.borehole_ids, **self.header, "start_date": self.start_date},
+                                copy=False)
+
+        if table == "soil_layers":
+            offsets = self.layer_offsets
+            columns = {
+                "depth": self.layer_depth,
+                "class_name": pd.Categorical.from_codes(self.layer_class_name, categories=self.class_names, validate=False),
+                "class_code": pd.Categorical.from_codes(self.layer_class_code, categories=self.class_codes, validate=False),
+            }
+            index_name = "layer_index"
+        elif table == "observation_note":
+            offsets = self.note_offsets
+            columns = {"upper_depth": self.note_upper_depth, "lower_depth": self.note_lower_depth, "note": self.note_text}
+            index_name = "note_index"
+        elif table == "SPT":
+            offsets = self.spt_offsets
+            columns = {"depth": self.spt_depth, "total_hits": self.spt_total_hits,
+                       "total_penetration": self.spt_total_penetration}
+            index_name = "spt_index"
+        elif table == "intervals":
+            # intervals are keyed by the SPT they belong to, and SPT by borehole
+            spt_counts = np.diff(self.spt_offsets)
+            interval_counts = np.diff(self.interval_offsets)
+            spt_borehole = np.repeat(np.arange(len(self)), spt_counts)
+            spt_index = np.arange(len(self.spt_depth)) - np.repeat(self.spt_offsets[:-1], spt_counts)
+            return pd.DataFrame({
+                "borehole_id": np.asarray(self.borehole_ids, dtype=object)[np.repeat(spt_borehole, interval_counts)],
+                "spt_index": np.repeat(spt_index, interval_counts).astype(np.int32),
+                "interval_index": (np.arange(len(self.interval_hits))
+                                   - np.repeat(self.interval_offsets[:-1], interval_counts)).astype(np.int32),
+                "hits": self.interval_hits,
+                "penetration": self.interval_penetration,
+            }, copy=False)
+        else:
+            raise ValueError("Invalid table.")
+
+        counts = np.diff(offsets)
+        return pd.DataFrame({
+            "borehole_id": np.asarray(self.borehole_ids, dtype=object)[np.repeat(np.arange(len(self)), counts)],
+            index_name: (np.arange(offsets[-1]) - np.repeat(offsets[:-1], counts)).astype(np.int32),
+            **columns,
+        }, copy=False)
+
+    @property
+    def nbytes(self):
+        """
+        保持しているデータのおおよそのバイト数（配列と、文字列・ID のオブジェクトを含む）
+        """
+        arrays = [*self.header.values(), self.layer_offsets, self.layer_depth, self.layer_class_name,
+                  self.layer_class_code, self.note_offsets, self.note_upper_depth, self.note_lower_depth,
+                  self.spt_offsets, self.spt_depth, self.spt_total_hits, self.spt_total_penetration,
+                  self.interval_offsets, self.interval_hits, self.interval_penetration]
+        objects = [*self.borehole_ids, *self.class_names, *self.class_codes, *self.start_date, *self.note_text]
+
+        return (sum(array.nbytes for array in arrays) + self.start_date.nbytes + self.note_text.nbytes
+                + sum(sys.getsizeof(value) for value in objects if value is not None))
@@ -1,95 +1,436 @@
-from pathlib import Path
-from .load import LoadData, CheckMethodParam
-from .calc import CalculateFL
-from .merge import MergeSoilLayerIntoSPT
-import pandas as pd
-import pickle
-
-
-class LiquefactionManifest:
-    
-    def __init__(self, file_path, temp_dir=None, res_dir=None, force_read_file=False):
-        
-        if temp_dir is None:
-            self.temp_dir = Path(__file__).parent / "temp"
-            if not self.temp_dir.exists():
-                self.temp_dir.mkdir(exist_ok=True)
-        else:
-            self.temp_dir = Path(temp_dir).resolve()
-        
-        if res_dir is None:
-            self.res_dir = Path(__file__).parent / "res"
-            if not self.res_dir.exists():
-                self.res_dir.mkdir(exist_ok=True)
-        else:
-            self.res_dir = Path(res_dir).resolve()           
-        
-        
-        self.data = {
-            "temp_dir": self.temp_dir,
-            "res_dir": self.res_dir,
-            "file_path": file_path,
-            "file_type": Path(file_path).suffix.lower(),
-            "pickle_path": self.temp_dir / f"{Path(file_path).stem}.pkl",
-        }
-        
-        self._read_file(file_path, force_read_file, self.data["pickle_path"])
-        
-        # save class instance by pickle
-        self._save_pickle()
-        
-        return None
-
-    def _read_file(self, file_path, force_read_file, pickle_path):
-        
-        if force_read_file or not pickle_path.exists():
-            
-            print(f"Loading data from {file_path.name}... ", end="")
-            self.data["borehole_data"] = LoadData(file_path).data
-            print("Done.")
-            
-        else:
-            print(f"Loading data from {pickle_path.name}... ", end="")
-            with open(pickle_path, "rb") as f:
-                self.data = pickle.load(f).data
-            print("Done.")
-            
-
-    def _save_pickle(self):
-        
-        with open(self.data["pickle_path"], "wb") as f:
-            pickle.dump(self, f)
-        
-        return None
-    
-    # set which method to use for liquefaction manifestation
-    # JRA, AIJ, Idriss and Boulanger, etc. 
-    def set_method(self, **kwargs):
-        
-        self._read_file(self.data["file_path"], False, self.data["pickle_path"])
-        
-        self.data["method"] = kwargs["method"]
-        self.data["method_params"] = kwargs["params"]
-        
-        self.data["method_params"] = CheckMethodParam(self.data["method"], self.data["method_params"]).get_params()
-        
-        self._save_pickle()
-        
-        return None
-
-    def merge_soil_layer(self):
-        
-        self._read_file(self.data["file_path"], False, self.data["pickle_path"])
-
-        self.data = MergeSoilLayerIntoSPT(self.data).get_merged_data()
-        
-        self._save_pickle()
-
-    
-    def calculate_FL(self):
-
-        pass
-    
-    def export_result(self):
-            
-        return None
\ No newline at end of file
+from pathlib import Path
+from .load import LoadData, CheckMethodParam, LOADER_VERSION, expand_param_grid
+from .calc import CalculateFL, SweepFL, IncrementalFL, MultiMethodFL
+from .montecarlo import MonteCarloFL
+from .merge import MergeSoilLayerIntoSPT, MERGE_VERSION, SOIL_PROPERTY_COLUMNS
+from .classify import hash_soil_properties
+from .stress import StressProfile
+from .cache import ResultCache, hash_file
+from .indices import calculate_indices_array, is_liquefiable_soil
+from .export import ResultWriter
+from .profiling import stage
+import numpy as np
+import pandas as pd
+
+
+class LiquefactionManifest:
+
+    def __init__(self, file_path, temp_dir=None, res_dir=None, force_read_file=False, cache_max_bytes=1 << 30):
+
+        if temp_dir is None:
+            self.temp_dir = Path(__file__).parent / "temp"
+            if not self.temp_dir.exists():
+                self.temp_dir.mkdir(exist_ok=True)
+        else:
+            self.temp_dir = Path(temp_dir).resolve()
+
+        if res_dir is None:
+            self.res_dir = Path(__file__).parent / "res"
+            if not self.res_dir.exists():
+                self.res_dir.mkdir(exist_ok=True)
+        else:
+            self.res_dir = Path(res_dir).resolve()
+
+        self.cache = ResultCache(self.temp_dir, max_bytes=cache_max_bytes)
+
+        # FL state kept between calls, so that edits only recompute what they affect
+        self.incremental = None
+        self.pending_updates = []
+
+        self.data = {
+            "temp_dir": self.temp_dir,
+            "res_dir": self.res_dir,
+            "file_path": Path(file_path),
+            "file_type": Path(file_path).suffix.lower(),
+        }
+
+        self._read_file(self.data["file_path"], force_read_file)
+
+        return None
+
+    def _read_file(self, file_path, force_read_file):
+
+        stat = Path(file_path).stat()
+        file_stat = [stat.st_mtime_ns, stat.st_size]
+
+        # unchanged since the last check, so the contents are not hashed again
+        if not force_read_file and self.data.get("file_stat") == file_stat:
+            return None
+
+        with stage("hash_file"):
+            content_hash = hash_file(file_path)
+        borehole_key = self.cache.make_key("borehole", content_hash, loader_version=LOADER_VERSION)
+
+        # touched but with the same contents: the in-memory state is already current
+        if not force_read_file and self.data.get("borehole_key") == borehole_key:
+            self.data["file_stat"] = file_stat
+            return None
+
+        with stage("cache_get"):
+            borehole_data = None if force_read_file else self.cache.get(borehole_key)
+
+        if borehole_data is None:
+            print(f"Loading data from {file_path.name}... ", end="")
+            borehole_data = LoadData(file_path).data
+            self.cache.set(borehole_key, borehole_data)
+            print("Done.")
+        else:
+            print(f"Loading cached data for {file_path.name}... ", end="")
+            print("Done.")
+
+        self.data["file_stat"] = file_stat
+        self.data["content_hash"] = content_hash
+        self.data["borehole_key"] = borehole_key
+        self.data["borehole_data"] = borehole_data
+
+        # derived data and edits belong to the previous contents
+        for key in ["df_SPT", "df_FL", "FL_key", "df_scenarios", "sweep_FL", "method_FL", "FL_probability", "PL_summary",
+                    "indices", "edits"]:
+            self.data.pop(key, None)
+        self._reset_incremental()
+
+        return None
+
+    def _reload_if_changed(self):
+
+        # the file may have been edited since it was read; a changed file drops the derived data and edits
+        self._read_file(self.data["file_path"], force_read_file=False)
+
+    # set which method to use for liquefaction manifestation
+    # JRA, AIJ, Idriss and Boulanger, etc.
+    def set_method(self, **kwargs):
+
+        previous_method = self.data.get("method")
+        previous_year = self.data.get("method_params", {}).get("year")
+
+        self.data["method"] = kwargs["method"]
+        self.data["method_params"] = kwargs["params"]
+
+        self.data["method_params"] = CheckMethodParam(self.data["method"], self.data["method_params"]).get_params()
+
+        # within the same method and year only the seismic load terms change
+        if self.incremental is not None:
+            if (self.data["method"], self.data["method_params"]["year"]) == (previous_method, previous_year):
+                self.pending_updates.append({"method_params": self.data["method_params"]})
+            else:
+                self._reset_incremental()
+
+        return None
+
+    def merge_soil_layer(self):
+
+        self.data = MergeSoilLayerIntoSPT(self.data).get_merged_data()
+
+        # edits made with update_soil_layer / set_ground_water_level stay in effect
+        edits = self.data.get("edits", {})
+        for layer_index, properties in edits.get("soil_layers", {}).items():
+            self._apply_soil_layer_edit(layer_index, properties)
+        if "ground_water_level" in edits:
+            self.data["borehole_data"] = {**self.data["borehole_data"], "ground_water_level": edits["ground_water_level"]}
+
+        self._reset_incremental()
+
+    def _reset_incremental(self):
+
+        self.incremental = None
+        self.pending_updates = []
+
+    def _invalidate_FL(self):
+
+        for key in ["df_FL", "FL_key", "indices", "df_scenarios", "sweep_FL"]:
+            self.data.pop(key, None)
+
+    def _apply_soil_layer_edit(self, layer_index, properties):
+
+        soil_layers = list(self.data["borehole_data"]["soil_layers"])
+        soil_layers[layer_index] = {**soil_layers[layer_index], **properties}
+        self.data["borehole_data"] = {**self.data["borehole_data"], "soil_layers": soil_layers}
+
+        df_SPT = self.data["df_SPT"].copy()
+        df_SPT.loc[self._layer_rows(layer_index), list(properties)] = list(properties.values())
+        self.data["df_SPT"] = df_SPT
+
+    def _layer_rows(self, layer_index):
+
+        return (self.data["df_SPT"]["layer"] == layer_index).fillna(False).to_numpy(dtype=bool)
+
+    def update_soil_layer(self, layer_index, **properties):
+        """
+        土層の物性値を変更する。次の calculate_FL() では影響を受ける行・列だけを再計算する
+
+        単位体積重量の変更はその土層より深い行の応力以降を、Fc・D50 の変更はその土層の行の CFc 以降を再計算する
+
+        Parameters
+        ----------
+        layer_index : int
+            土層の番号（df_SPT の layer 列の値）
+        **properties
+            変更する物性値（gamma_wet, gamma_sat, Fc, D50, PI）
+        """
+        invalid = set(properties) - set(SOIL_PROPERTY_COLUMNS)
+        if invalid:
+            raise ValueError(f"Invalid soil properties: {sorted(invalid)}")
+
+        if "df_SPT" not in self.data:
+            self.merge_soil_layer()
+
+        soil_layers = self.data["borehole_data"]["soil_layers"]
+        if not 0 <= layer_index < len(soil_layers):
+            raise IndexError(f"Soil layer {layer_index} is out of range.")
+
+        layer_edits = self.data.setdefault("edits", {}).setdefault("soil_layers", {})
+        layer_edits[layer_index] = {**layer_edits.get(layer_index, {}), **properties}
+        self._apply_soil_layer_edit(layer_index, properties)
+
+        if self.incremental is not None:
+            inputs = {column: value for column, value in properties.items() if column in ["Fc", "D50"]}
+            if inputs:
+                self.pending_updates.append({"rows": self._layer_rows(layer_index), **inputs})
+            if {"gamma_wet", "gamma_sat"} & set(properties):
+                # stresses change from the top of the layer down
+                top = soil_layers[layer_index - 1]["depth"] if layer_index > 0 else -np.inf
+                self.pending_updates.append({"rows": self.data["df_SPT"]["depth"].to_numpy() > top, "stress_profile": True})
+
+        self._invalidate_FL()
+
+        return None
+
+    def set_ground_water_level(self, ground_water_level):
+        """
+        地下水位を変更する。次の calculate_FL() では浅い方の水位より深い行の応力以降だけを再計算する
+
+        Parameters
+        ----------
+        ground_water_level : float or None
+            地下水位 [m]
+        """
+        if "df_SPT" not in self.data:
+            self.merge_soil_layer()
+
+        previous = self.data["borehole_data"].get("ground_water_level")
+
+        self.data.setdefault("edits", {})["ground_water_level"] = ground_water_level
+        self.data["borehole_data"] = {**self.data["borehole_data"], "ground_water_level": ground_water_level}
+
+        if self.incremental is not None:
+            # StressProfile treats a missing level as the ground surface
+            shallower = min(previous or 0.0, ground_water_level or 0.0)
+            self.pending_updates.append({"rows": self.data["df_SPT"]["depth"].to_numpy() > shallower, "stress_profile": True})
+
+        self._invalidate_FL()
+
+        return None
+
+    def _make_FL_key(self):
+
+        return self.cache.make_key("FL", self.data["content_hash"], loader_version=LOADER_VERSION,
+                                   merge_version=MERGE_VERSION, soil_properties=hash_soil_properties(),
+                                   method=self.data["method"], params=self.data["method_params"],
+                                   edits=self.data.get("edits", {}))
+
+    def calculate_FL(self):
+
+        self._reload_if_changed()
+        FL_key = self._make_FL_key()
+
+        # the in-memory result is already current
+        if self.data.get("FL_key") == FL_key:
+            return None
+
+        if self.incremental is not None:
+            df_FL = self._update_incremental()
+            self.cache.set(FL_key, df_FL)
+        else:
+            with stage("cache_get"):
+                df_FL = self.cache.get(FL_key)
+
+            if df_FL is None:
+                if "df_SPT" not in self.data:
+                    self.merge_soil_layer()
+                if self.data["method"] == "JRA" and self.data["method_params"]["year"] in [2012, 2017]:
+                    self.incremental = IncrementalFL(self.data["df_SPT"], self.data)
+                    df_FL = self.incremental.get_FL()
+                else:
+                    df_FL = CalculateFL(self.data["df_SPT"].copy(), self.data).get_FL()
+                self.cache.set(FL_key, df_FL)
+
+        self.data["df_FL"] = df_FL
+        self.data["FL_key"] = FL_key
+        self.data.pop("indices", None)
+
+        return None
+
+    def _update_incremental(self):
+
+        # one stress profile for all pending updates, built from the current unit weights and water level
+        stress_profile = None
+
+        for update in self.pending_updates:
+            if update.get("stress_profile") is True:
+                if stress_profile is None:
+                    stress_profile = StressProfile.from_borehole_data(self.data["borehole_data"])
+                update = {**update, "stress_profile": stress_profile}
+            self.incremental.update(**update)
+
+        self.pending_updates = []
+
+        return self.incremental.get_FL(self.data["df_SPT"])
+
+    def sweep(self, method, param_grid):
+        """
+        複数のパラメータの組み合わせ（シナリオ）に対して FL を計算する
+
+        Parameters
+        ----------
+        method : str
+            液状化判定手法
+        param_grid : dict or list
+            {パラメータ名: 値のリスト} の辞書、またはその辞書のリスト
+            例：{"year": [2017], "EQ_level": [2], "EQ_type": [1, 2], "is_given_Khgl": [False],
+                 "regional_class": ["A1", "C"], "ground_type": [1, 2, 3]}
+
+        Returns
+        -------
+        tuple
+            (シナリオの DataFrame, (シナリオ数, 深度数) の FL 配列)
+        """
+        scenarios = expand_param_grid(method, param_grid)
+
+        self._reload_if_changed()
+        if "df_SPT" not in self.data:
+            self.merge_soil_layer()
+
+        sweep = SweepFL(self.data["df_SPT"], {**self.data, "method": method}, scenarios)
+
+        self.data["df_scenarios"] = sweep.get_scenarios()
+        self.data["sweep_FL"] = sweep.get_FL()
+
+        return self.data["df_scenarios"], self.data["sweep_FL"]
+
+    def compare_methods(self, methods):
+        """
+        複数の判定手法で FL を計算する。手法間で共通の中間量（上載圧など）は1回だけ計算する
+
+        Parameters
+        ----------
+        methods : dict
+            {手法: パラメータ}
+            例：{"JRA": {"year": 2017, ...}, "AIJ": {"year": 2001, "amax": 350, "M": 7.5},
+                 "Idriss and Boulanger": {"year": 2014, "amax": 350, "M": 7.5}}
+
+        Returns
+        -------
+        dict
+            {手法: FL の計算結果の DataFrame}
+        """
+        methods = {method: CheckMethodParam(method, {**params}).get_params() for method, params in methods.items()}
+
+        self._reload_if_changed()
+        if "df_SPT" not in self.data:
+            self.merge_soil_layer()
+
+        self.data["method_FL"] = MultiMethodFL(self.data["df_SPT"], self.data, methods).get_FL()
+
+        return self.data["method_FL"]
+
+    def simulate(self, n_samples=1000, uncertainty=None, seed=0, batch_size=1000):
+        """
+        set_method() の手法で、入力のばらつきを考慮した FL・PL の確率分布をモンテカルロ法で計算する
+
+        Parameters
+        ----------
+        n_samples : int, optional
+            サンプル数, by default 1000
+        uncertainty : dict, optional
+            montecarlo.DEFAULT_UNCERTAINTY のうち変更する値
+            例：{"N_cov": 0.3, "Fc_cov": 0.3, "D50_cov": 0.3, "ground_water_level_std": 0.5}
+        seed : int, optional
+            乱数の種, by default 0
+        batch_size : int, optional
+            一度に計算するサンプル数, by default 1000
+
+        Returns
+        -------
+        tuple
+            (深度ごとの FL < 1 となる確率の DataFrame, PL の平均・パーセンタイル・超過確率の辞書)
+        """
+        self._reload_if_changed()
+        if "df_SPT" not in self.data:
+            self.merge_soil_layer()
+
+        monte_carlo = MonteCarloFL(self.data["df_SPT"], self.data, n_samples, uncertainty, seed, batch_size)
+
+        self.data["FL_probability"] = monte_carlo.get_FL_probability()
+        self.data["PL_summary"] = monte_carlo.get_PL_summary()
+
+        return self.data["FL_probability"], self.data["PL_summary"]
+
+    def calculate_indices(self):
+        """
+        FL の深度分布から液状化指数 PL などを計算する。sweep() の結果があればシナリオごとにも計算する
+
+        Returns
+        -------
+        dict
+            PL, H_liq, FL_min
+        """
+        self._reload_if_changed()
+        if "df_FL" not in self.data:
+            self.calculate_FL()
+
+        # rows above the water level or of non-liquefiable soil are excluded (calculate_indices_array)
+        ground_water_level = self.data["borehole_data"].get("ground_water_level")
+
+        df_FL = self.data["df_FL"].sort_values("depth", kind="stable")
+        indices = calculate_indices_array([0], df_FL["depth"].to_numpy(dtype=float), df_FL["FL"].to_numpy(dtype=float),
+                                          ground_water_level=ground_water_level,
+                                          liquefiable=is_liquefiable_soil(df_FL["Fc"], df_FL["D50"], df_FL["PI"]))
+        self.data["indices"] = {name: float(values[0]) for name, values in indices.items()}
+
+        if "sweep_FL" in self.data:
+            df_SPT = self.data["df_SPT"].sort_values("depth", kind="stable")
+            order = self.data["df_SPT"]["depth"].argsort(kind="stable").to_numpy()
+            sweep_indices = calculate_indices_array([0], df_SPT["depth"].to_numpy(dtype=float),
+                                                    self.data["sweep_FL"][:, order],
+                                                    ground_water_level=ground_water_level,
+                                                    liquefiable=is_liquefiable_soil(df_SPT["Fc"], df_SPT["D50"],
+                                                                                    df_SPT["PI"]))
+            self.data["df_scenarios"] = self.data["df_scenarios"].assign(
+                **{name: values[:, 0] for name, values in sweep_indices.items()})
+
+        return self.data["indices"]
+
+    def export_result(self, path=None, format=None, compression=None):
+        """
+        FL の計算結果をファイルに書き出す
+
+        Parameters
+        ----------
+        path : str or Path, optional
+            出力先, by default res_dir / "<ファイル名>_FL.<拡張子>"
+        format : str, optional
+            "csv", "jsonl", "parquet"。None の場合は path の拡張子から決める（path も省略した場合は "csv"）
+        compression : str, optional
+            圧縮方式（ResultWriter を参照）
+
+        Returns
+        -------
+        Path
+            出力先
+        """
+        self._reload_if_changed()
+        if "df_FL" not in self.data:
+            self.calculate_FL()
+
+        if path is None:
+            format = format or "csv"
+            if format not in ["csv", "jsonl", "parquet"]:
+                raise ValueError("Invalid format.")
+            suffix = "." + format
+            suffix += ".gz" if compression == "gzip" and format != "parquet" else ""
+            path = self.res_dir / f"{self.data['file_path'].stem}_FL{suffix}"
+
+        with ResultWriter(path, format, compression, keep_progress=False) as writer:
+            writer.write(self.data["file_path"].stem, self.data["df_FL"])
+
+        return writer.path
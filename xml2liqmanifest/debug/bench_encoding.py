@@ -0,0 +1,62 @@
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from lxml import etree as ET
+from xml2liqmanifest.load import LoadData, PARSER_ENCODING
+
+
+def preprocess_legacy(path, xml_encoding="cp932"):
+    # the previous implementation: one full pass per replacement, then a cp932 -> str -> shift_jis round trip
+    replacements = {
+        '㎜': 'mm', '㎝': 'cm', '㎞': 'km', '髙': '高',
+        '﨑': '崎', '德': '徳', '濵': '浜', '瀨': '瀬',
+        '槗': '橋', '遠': '遠', '俣': '俣', '黑': '黒',
+        '戶': '戸', '邊': '辺', '沢': '澤', '～': '~',
+        '－': '-', '№': 'No', '㈱': '(株)', '㈲': '(有)',
+    }
+    with open(path, 'r', encoding=xml_encoding) as f:
+        content = f.read()
+    for old, new in replacements.items():
+        content = content.replace(old, new)
+    return content.encode("shift_jis", errors="replace")
+
+
+def preprocess_current(path, xml_encoding="cp932"):
+    loader = LoadData.__new__(LoadData)
+    loader.params = {"path": path}
+    loader.content = None
+    return loader._read_and_preprocess_file(xml_encoding)
+
+
+def parse_legacy(path):
+    parser = ET.XMLParser(encoding="shift_jis", huge_tree=True, recover=True)
+    return ET.fromstring(preprocess_legacy(path), parser=parser)
+
+
+def parse_current(path):
+    parser = ET.XMLParser(encoding=PARSER_ENCODING, huge_tree=True, recover=True)
+    return ET.fromstring(preprocess_current(path), parser=parser)
+
+
+def measure(func, path, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(path)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+# 使用例: python xml2liqmanifest/debug/bench_encoding.py ref/01_002611.XML [repeat]
+if __name__ == "__main__":
+    path = sys.argv[1]
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    size_mb = Path(path).stat().st_size / 1e6
+
+    for name, func in [("legacy preprocess", preprocess_legacy), ("current preprocess", preprocess_current),
+                       ("legacy preprocess + parse", parse_legacy), ("current preprocess + parse", parse_current)]:
+        elapsed = measure(func, path, repeat)
+        print(f"{name:28s} {elapsed * 1e3:9.2f} ms  {size_mb / elapsed:8.1f} MB/s")
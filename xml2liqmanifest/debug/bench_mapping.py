@@ -0,0 +1,46 @@
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from xml2liqmanifest.mapping import GridInterpolator, grid_coordinates, make_grid, read_grid
+
+BBOX = (34.0, 139.0, 36.0, 141.0)
+
+
+# 使用例: python xml2liqmanifest/debug/bench_mapping.py 20000 0.001
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    resolution = float(sys.argv[2]) if len(sys.argv) > 2 else 0.001
+
+    # synthetic boreholes with a smooth PL field
+    rng = np.random.default_rng(0)
+    lat, lon = rng.uniform(BBOX[0], BBOX[2], n), rng.uniform(BBOX[1], BBOX[3], n)
+    PL = 15 + 10 * np.sin(lat * 3) * np.cos(lon * 2) + rng.normal(0, 2, n)
+
+    grid = make_grid(BBOX, resolution)
+    print(f"{n} boreholes, grid {grid['shape'][0]} x {grid['shape'][1]}")
+
+    for method in ["nearest", "idw"]:
+        interpolator = GridInterpolator(lat, lon, PL, method=method)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            for max_workers in sorted({1, os.cpu_count()}):
+                start = time.perf_counter()
+                interpolator.to_grid(BBOX, resolution, path=Path(tmp) / "PL.npy", max_workers=max_workers)
+                elapsed = time.perf_counter() - start
+                cells = grid["shape"][0] * grid["shape"][1]
+                print(f"{method:8s} workers={max_workers:<3d} {elapsed:7.2f} s  {cells / elapsed / 1e6:6.2f} M cells/s")
+
+            # the tiled result equals interpolating one block at once
+            values, _ = read_grid(Path(tmp) / "PL.npy")
+            rows, cols = slice(100, 700), slice(300, 900)
+            block_lat, block_lon = grid_coordinates(grid, rows, cols)
+            expected = interpolator.interpolate(block_lat[:, None], block_lon[None, :]).astype(values.dtype)
+            print(f"{method:8s} tiles match: {np.array_equal(values[rows, cols], expected, equal_nan=True)}")
+            del values
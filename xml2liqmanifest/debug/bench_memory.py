@@ -0,0 +1,54 @@
+import glob
+import sys
+import tempfile
+import tracemalloc
+import warnings
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+from xml2liqmanifest.load import LoadData
+from xml2liqmanifest.compact import CompactBoreholes
+
+
+def measure_allocated(build):
+    # bytes still allocated after build() returns, i.e. the size of what it keeps alive
+    tracemalloc.start()
+    result = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current
+
+
+# 使用例: python xml2liqmanifest/debug/bench_memory.py "ref/**/*.XML"
+# 引数を省略した場合は benchmarks/generate.py の合成ボーリングで計測する
+if __name__ == "__main__":
+    warnings.simplefilter("ignore")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        if len(sys.argv) > 1:
+            paths = sorted(glob.glob(sys.argv[1], recursive=True))
+        else:
+            from generate import generate_dataset
+            paths = generate_dataset(Path(temp_dir), n_files=200, n_layers=15, n_spt=30)
+
+        # both sides are measured from the same already-loaded dicts, so that parser garbage is not counted
+        contents = [(Path(path).stem, path) for path in paths]
+        loaded = [(borehole_id, LoadData(path).data) for borehole_id, path in contents]
+
+        dicts, dict_bytes = measure_allocated(lambda: {borehole_id: LoadData(path).data
+                                                       for borehole_id, path in contents})
+    del dicts
+    compact, compact_bytes = measure_allocated(lambda: CompactBoreholes(loaded))
+
+    n = len(paths)
+    n_SPT = len(compact.spt_depth)
+    print(f"{n} boreholes, {n_SPT} SPT")
+    print(f"{'dict (LoadData.data)':24s} {dict_bytes / n:10.0f} bytes/borehole")
+    print(f"{'CompactBoreholes':24s} {compact_bytes / n:10.0f} bytes/borehole  (nbytes: {compact.nbytes / n:.0f})")
+    print(f"ratio {dict_bytes / compact_bytes:.1f}x")
+
+    mismatched = [borehole_id for borehole_id, data in loaded if compact.get_borehole(borehole_id) != data]
+    print(f"round trip: {n - len(mismatched)} / {n} boreholes identical")
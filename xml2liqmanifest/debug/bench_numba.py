@@ -0,0 +1,72 @@
+import sys
+import time
+import warnings
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from xml2liqmanifest import jit
+from xml2liqmanifest.calc import CalculateFL, JRA_COLUMNS
+from xml2liqmanifest.stress import StressProfile
+
+
+def make_inputs(n, rng):
+    # one long synthetic profile with NaN properties mixed in, so that every branch of the kernels is taken
+    import pandas as pd
+
+    depth = np.sort(rng.uniform(0.5, 60, n))
+    df_SPT = pd.DataFrame({
+        "depth": depth,
+        "N": rng.integers(0, 60, n),
+        "D50": np.where(rng.random(n) < 0.05, np.nan, rng.lognormal(-1.5, 1.2, n)),
+        "Fc": np.where(rng.random(n) < 0.05, np.nan, rng.uniform(0, 100, n)),
+    })
+    stress_profile = StressProfile([20.0, 40.0, 70.0], [17.0, 18.0, 19.0], [18.0, 19.0, 20.0], ground_water_level=1.5)
+
+    return df_SPT, stress_profile
+
+
+def calculate(df_SPT, stress_profile, engine, kernels=None):
+
+    params = {"method": "JRA", "method_params": {"year": 2017, "EQ_level": 2, "EQ_type": 2, "Khgl": 0.6}}
+    calc = CalculateFL.__new__(CalculateFL)
+    # kernels given here stand in for the compiled ones, e.g. the loops run as Python
+    calc.kernels = kernels
+
+    start = time.perf_counter()
+    calc.__init__(df_SPT.copy(), params, engine=engine, stress_profile=stress_profile)
+    df_FL = calc.get_FL()
+
+    return df_FL, time.perf_counter() - start
+
+
+# 使用例: python xml2liqmanifest/debug/bench_numba.py 1000000
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    df_SPT, stress_profile = make_inputs(n, np.random.default_rng(0))
+
+    df_vectorized, t_vectorized = calculate(df_SPT, stress_profile, "vectorized")
+    print(f"{'vectorized':12s} {t_vectorized * 1e3:8.1f} ms")
+
+    kernels = jit.get_kernels()
+    if kernels is None:
+        print("numba is not installed: checking the fallback and the kernels run as Python")
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            df_numba, t_numba = calculate(df_SPT, stress_profile, "numba")
+        print(f"{'fallback':12s} {t_numba * 1e3:8.1f} ms  warning: {caught[0].message if caught else None}")
+        python_kernels = {"JRA_resistance": jit._JRA_resistance_kernel, "JRA_Cw_R": jit._JRA_Cw_R_kernel}
+        df_kernels, _ = calculate(df_SPT.iloc[:20000].reset_index(drop=True), stress_profile, "vectorized", python_kernels)
+        df_vectorized = df_vectorized.iloc[:20000]
+    else:
+        calculate(df_SPT.iloc[:100], stress_profile, "numba")  # compile
+        df_kernels, t_numba = calculate(df_SPT, stress_profile, "numba")
+        print(f"{'numba':12s} {t_numba * 1e3:8.1f} ms")
+
+    for column in JRA_COLUMNS:
+        expected, actual = df_vectorized[column].to_numpy(), df_kernels[column].to_numpy()
+        identical = np.array_equal(expected, actual, equal_nan=True)
+        close = np.allclose(expected, actual, rtol=1e-12, atol=0, equal_nan=True)
+        print(f"{column:10s} identical: {identical}  within 1e-12: {close}")
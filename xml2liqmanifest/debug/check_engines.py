@@ -0,0 +1,73 @@
+import copy
+import glob
+import sys
+import tempfile
+import warnings
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+from xml2liqmanifest.load import LoadData, CheckMethodParam
+from xml2liqmanifest.merge import MergeSoilLayerIntoSPT
+from xml2liqmanifest.calc import CalculateFL, JRA_COLUMNS
+
+RTOL = 1e-12
+
+# JRA 2012 / 2017 scenarios covering both earthquake types (Cw branches) and a given Khgl
+PARAM_SETS = [
+    {"year": 2012, "EQ_level": 2, "EQ_type": 1, "is_given_Khgl": False, "regional_class": "A1", "ground_type": 1},
+    {"year": 2017, "EQ_level": 2, "EQ_type": 2, "is_given_Khgl": False, "regional_class": "B2", "ground_type": 3},
+    {"year": 2017, "EQ_level": 1, "EQ_type": 1, "is_given_Khgl": True, "Khgl": 0.3},
+]
+
+
+def compare_engines(path, params):
+    """
+    vectorized エンジンと loop エンジン（行ごとの参照実装）の結果を比較する
+
+    Returns
+    -------
+    list
+        RTOL を超えて一致しない列
+    """
+    method_params = CheckMethodParam("JRA", copy.deepcopy(params)).get_params()
+    data = MergeSoilLayerIntoSPT({"borehole_data": LoadData(path).data, "method": "JRA",
+                                  "method_params": method_params}).get_merged_data()
+
+    df_vectorized = CalculateFL(data["df_SPT"].copy(), data, engine="vectorized").get_FL()
+    df_loop = CalculateFL(data["df_SPT"].copy(), data, engine="loop").get_FL()
+
+    return [column for column in JRA_COLUMNS
+            if not np.allclose(df_vectorized[column].to_numpy(dtype=float), df_loop[column].to_numpy(dtype=float),
+                               rtol=RTOL, atol=0, equal_nan=True)]
+
+
+# 使用例: python xml2liqmanifest/debug/check_engines.py "ref/*.XML"
+# 引数を省略した場合は benchmarks/generate.py の合成ボーリングで比較する。一致しない場合は終了コード 1
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as temp_dir, warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+
+        if len(sys.argv) > 1:
+            paths = sorted(glob.glob(sys.argv[1], recursive=True))
+        else:
+            from generate import generate_dataset
+            paths = generate_dataset(Path(temp_dir), n_files=20, n_layers=15, n_spt=30)
+
+        mismatches = []
+        for path in paths:
+            for params in PARAM_SETS:
+                columns = compare_engines(path, params)
+                if columns:
+                    mismatches.append((path, params["year"], columns))
+
+    print(f"{len(paths)} files x {len(PARAM_SETS)} parameter sets, rtol={RTOL:g}")
+    for path, year, columns in mismatches:
+        print(f"mismatch: {path} (JRA {year}): {', '.join(columns)}")
+    print("engines agree" if not mismatches else f"{len(mismatches)} mismatches")
+
+    sys.exit(1 if mismatches else 0)
@@ -0,0 +1,82 @@
+import sys
+import tempfile
+import tracemalloc
+import warnings
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+from xml2liqmanifest import LiquefactionManifest
+from xml2liqmanifest.batch import LiquefactionManifestBatch
+from xml2liqmanifest.export import read_result
+
+PARAMS = {"year": 2017, "EQ_level": 2, "EQ_type": 1, "is_given_Khgl": False, "regional_class": "A1", "ground_type": 1}
+
+# export_result() is given only the path; the format comes from its suffix
+OUTPUTS = ["FL.parquet", "FL.jsonl.gz", "FL.csv"]
+
+# LiquefactionManifestBatch.export() is measured on these numbers of files; its peak memory must not grow with them
+MEMORY_FILE_COUNTS = [50, 200]
+MEMORY_GROWTH_LIMIT = 1.5
+
+
+def measure_export_peak(xml_dir, path, max_workers=2, chunk_rows=1000):
+    """
+    LiquefactionManifestBatch.export() の実行中の（親プロセスの）ピークメモリ [MB] を返す
+    """
+    batch = LiquefactionManifestBatch(xml_dir, method="JRA", params=PARAMS, max_workers=max_workers)
+
+    tracemalloc.start()
+    batch.export(path, chunk_rows=chunk_rows)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return peak / 1e6
+
+
+# 使用例: python xml2liqmanifest/debug/check_export.py ref/01_002611.XML
+# export_result() に拡張子だけで形式を決めるパスを渡して書き出し、read_result() で読み戻した FL が一致することを確認する。
+# また、LiquefactionManifestBatch.export() のピークメモリがファイル数によらずほぼ一定であることを確認する。
+# 引数を省略した場合は benchmarks/generate.py の合成ボーリングを使う。一致しない場合は終了コード 1
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as temp_dir, warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        temp_dir = Path(temp_dir)
+
+        if len(sys.argv) > 1:
+            path = sys.argv[1]
+        else:
+            from generate import generate_dataset
+            path = generate_dataset(temp_dir / "xml", n_files=1, n_layers=15, n_spt=30)[0]
+
+        liq = LiquefactionManifest(path, temp_dir=temp_dir / "cache", res_dir=temp_dir / "res")
+        liq.set_method(method="JRA", params=PARAMS)
+        liq.calculate_FL()
+        df_FL = liq.data["df_FL"]
+
+        failed = False
+        for name in OUTPUTS:
+            written = liq.export_result(temp_dir / "res" / name)
+            df_read = read_result(written)
+            matches = len(df_read) == len(df_FL) and np.allclose(df_read["FL"].to_numpy(dtype=float),
+                                                                 df_FL["FL"].to_numpy(dtype=float), equal_nan=True)
+            failed |= not matches
+            print(f"{name:14s} -> {written.name:14s} {len(df_read)} rows, FL {'matches' if matches else 'differs'}")
+
+        from generate import generate_dataset
+        peaks = []
+        for n_files in MEMORY_FILE_COUNTS:
+            xml_dir = temp_dir / f"xml_{n_files}"
+            generate_dataset(xml_dir, n_files=n_files, n_layers=15, n_spt=30)
+            peaks.append(measure_export_peak(xml_dir, temp_dir / "res" / f"batch_{n_files}.csv"))
+            print(f"export {n_files:4d} files  peak {peaks[-1]:7.2f} MB")
+
+        flat = peaks[-1] < MEMORY_GROWTH_LIMIT * peaks[0]
+        failed |= not flat
+        print(f"export peak memory {'stays flat' if flat else 'grows with the number of files'}")
+
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,61 @@
+import copy
+import sys
+import tempfile
+import warnings
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+from xml2liqmanifest.load import LoadData, CheckMethodParam
+from xml2liqmanifest.merge import MergeSoilLayerIntoSPT
+from xml2liqmanifest.calc import CalculateFL, IB_MAX_N1_60CS
+
+METHOD = "Idriss and Boulanger"
+PARAM_SETS = [{"year": 2008, "amax": 300, "M": 7.5}, {"year": 2014, "amax": 300, "M": 7.5}]
+
+# upper bound of CRR; the curve gives about 1.99 at its upper limit (N1)60cs = IB_MAX_N1_60CS
+CRR_MAX = 2.0
+
+
+def calculate_shallow_dense(borehole_data, params, hits=50):
+    """
+    最も浅い標準貫入試験を高い N 値に置き換えて計算する（浅く締まった層では (N1)60cs が 37.5 を超える）
+    """
+    borehole_data = copy.deepcopy(borehole_data)
+    borehole_data["SPT"][0].update({"total_hits": hits, "total_penetration": 300.0})
+
+    method_params = CheckMethodParam(METHOD, copy.deepcopy(params)).get_params()
+    data = MergeSoilLayerIntoSPT({"borehole_data": borehole_data, "method": METHOD,
+                                  "method_params": method_params}).get_merged_data()
+
+    return CalculateFL(data["df_SPT"].copy(), data).get_FL()
+
+
+# 使用例: python xml2liqmanifest/debug/check_idriss_boulanger.py ref/01_002611.XML
+# (N1)60cs が 37.5 を超える浅い行で、CRR が 2.0 を超えないことを確認する。
+# 引数を省略した場合は benchmarks/generate.py の合成ボーリングを使う。上限を超える場合は終了コード 1
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as temp_dir, warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+
+        if len(sys.argv) > 1:
+            path = sys.argv[1]
+        else:
+            from generate import generate_dataset
+            path = generate_dataset(Path(temp_dir), n_files=1, n_layers=15, n_spt=30)[0]
+
+        borehole_data = LoadData(path).data
+        failed = False
+        for params in PARAM_SETS:
+            df_FL = calculate_shallow_dense(borehole_data, params)
+            top = df_FL.iloc[0]
+            exceeded = bool(np.nanmax(df_FL["CRR"]) > CRR_MAX)
+            failed |= exceeded or not top["N1_60cs"] > IB_MAX_N1_60CS
+            print(f"{params['year']}: depth {top['depth']} m, (N1)60cs {top['N1_60cs']:.1f}, CRR {top['CRR']:.3f}, "
+                  f"FL {top['FL']:.3f} (CRR max {CRR_MAX:.3f}){' exceeded' if exceeded else ''}")
+
+    sys.exit(1 if failed else 0)
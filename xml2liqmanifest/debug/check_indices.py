@@ -0,0 +1,54 @@
+import sys
+import tempfile
+import warnings
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+from xml2liqmanifest.batch import LiquefactionManifestBatch
+from xml2liqmanifest.load import LoadData
+from xml2liqmanifest.indices import calculate_indices, calculate_PL, is_liquefiable_soil
+
+PARAMS = {"year": 2017, "EQ_level": 2, "EQ_type": 1, "is_given_Khgl": False, "regional_class": "A1", "ground_type": 1}
+
+
+# 使用例: python xml2liqmanifest/debug/check_indices.py ref
+# LiquefactionManifestBatch.run() の結果から calculate_indices() で file_path ごとの PL を計算し、
+# ファイルごとに地下水位と判定対象の土質を与えて calculate_PL() で計算した値と比較する。引数を省略した場合は benchmarks/generate.py の合成ボーリングを使う
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as temp_dir, warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+
+        if len(sys.argv) > 1:
+            path = sys.argv[1]
+        else:
+            from generate import generate_dataset
+            generate_dataset(Path(temp_dir), n_files=20, n_layers=15, n_spt=30)
+            path = temp_dir
+
+        df_result = LiquefactionManifestBatch(path, method="JRA", params=PARAMS, max_workers=1).run()
+        df_indices = calculate_indices(df_result)
+
+        # calculate_indices() finds the water level from the stress columns; here it is taken from the file
+        expected = {}
+        for file_path, df_file in df_result.groupby("file_path", sort=False):
+            df_file = df_file.sort_values("depth", kind="stable")
+            expected[file_path] = calculate_PL(df_file["depth"].to_numpy(dtype=float),
+                                               df_file["FL"].to_numpy(dtype=float),
+                                               ground_water_level=LoadData(file_path).data["ground_water_level"],
+                                               liquefiable=is_liquefiable_soil(df_file["Fc"], df_file["D50"],
+                                                                               df_file["PI"]))
+    PL = dict(zip(df_indices["file_path"], df_indices["PL"]))
+
+    mismatches = [file_path for file_path in expected if not np.isclose(PL.get(file_path, np.nan), expected[file_path])]
+
+    print(f"{len(expected)} files, {len(df_indices)} rows grouped by file_path")
+    for file_path in mismatches:
+        print(f"mismatch: {file_path}: {PL.get(file_path)} != {expected[file_path]}")
+    print("indices agree" if not mismatches and len(df_indices) == len(expected) else "indices differ")
+
+    sys.exit(1 if mismatches or len(df_indices) != len(expected) else 0)
@@ -1,6 +1,9 @@
-from bs4 import BeautifulSoup
+import sys
+
 
 def read_and_print_xml(file_path):
+    from bs4 import BeautifulSoup
+
     try:
         with open(file_path, 'rb') as file:
             content = file.read().decode("cp932")
@@ -11,5 +14,6 @@ def read_and_print_xml(file_path):
     except Exception as e:
         print(f"Error: {str(e)}")
 
-# 使用例
-read_and_print_xml('ref/01_002611.XML')
+# 使用例: python xml2liqmanifest/debug/xml_analyzer.py ref/01_002611.XML
+if __name__ == "__main__":
+    read_and_print_xml(sys.argv[1] if len(sys.argv) > 1 else 'ref/01_002611.XML')
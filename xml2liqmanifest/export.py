@@ -0,0 +1,316 @@
+from pathlib import Path
+import gzip
+import json
+import os
+import pandas as pd
+
+# output formats by file suffix; a ".gz" suffix after csv / jsonl selects gzip compression
+EXPORT_FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl", ".parquet": "parquet"}
+
+
+def _import_pyarrow():
+
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("pyarrow is required for Parquet export. Install it with `pip install pyarrow`.") from e
+
+    return pa, pq
+
+
+def _infer_format(path):
+
+    suffixes = [suffix.lower() for suffix in Path(path).suffixes]
+    compression = "gzip" if suffixes[-1:] == [".gz"] else None
+    if compression:
+        suffixes = suffixes[:-1]
+
+    if not suffixes or suffixes[-1] not in EXPORT_FORMATS:
+        raise ValueError(f"Cannot infer the export format of {path}.")
+
+    return EXPORT_FORMATS[suffixes[-1]], compression
+
+
+class ResultWriter:
+
+    def __init__(self, path, format=None, compression=None, chunk_rows=100_000, resume=False, keep_progress=True):
+        """
+        計算結果の表をボーリングごとに受け取り、chunk_rows 行ごとに CSV・JSON Lines・Parquet へ追記する
+
+        書き出したボーリングは進捗ファイル（<path>.progress）に記録するため、resume=True で開くと
+        中断した出力の続きから書き出せる。進捗に記録されていない書きかけの部分は再開時に取り除く
+
+        Parameters
+        ----------
+        path : str or Path
+            出力先。CSV・JSON Lines はファイル、Parquet はチャンクごとのファイルを置くディレクトリ
+        format : str, optional
+            "csv", "jsonl", "parquet"。None の場合は拡張子から決める
+        compression : str, optional
+            CSV・JSON Lines は "gzip"（チャンクごとの gzip メンバーを連結する）、Parquet は pyarrow の圧縮方式
+            （None の場合は "zstd"）。format が None の場合は拡張子 .gz でも gzip になる
+        chunk_rows : int, optional
+            この行数が溜まるごとに書き出す, by default 100_000
+        resume : bool, optional
+            True の場合、進捗ファイルがあれば続きから書き出す。False の場合は既存の出力を上書きする
+        keep_progress : bool, optional
+            False の場合、正常に閉じた後に進捗ファイルを削除する
+
+        使用例:
+            with ResultWriter("result.csv.gz", resume=True) as writer:
+                for borehole_id, df_FL in results:
+                    if borehole_id not in writer.completed:
+                        writer.write(borehole_id, df_FL)
+        """
+        self.path = Path(path)
+
+        if format is None:
+            format, inferred_compression = _infer_format(self.path)
+            compression = compression or inferred_compression
+        if format not in ["csv", "jsonl", "parquet"]:
+            raise ValueError("Invalid format.")
+        if format != "parquet" and compression not in [None, "gzip"]:
+            raise ValueError("Invalid compression.")
+
+        self.params = {
+            "format": format,
+            "compression": "zstd" if format == "parquet" and compression is None else compression,
+            "chunk_rows": chunk_rows,
+            "keep_progress": keep_progress,
+        }
+        self.progress_path = self.path.with_name(self.path.name + ".progress")
+
+        # borehole ids already in the output; callers skip these when resuming
+        self.completed = set()
+        self.columns = None
+        self.schema = None
+        self.offset = 0
+        self.n_parts = 0
+
+        self._buffer = []
+        self._buffer_ids = []
+        self._buffer_rows = 0
+
+        if resume and self.progress_path.exists():
+            self._resume()
+        else:
+            self._start()
+
+        return None
+
+    def _start(self):
+
+        self._remove_output()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.params["format"] == "parquet":
+            self.path.mkdir()
+        else:
+            self.path.touch()
+
+        self._append_progress({"format": self.params["format"], "compression": self.params["compression"]})
+
+    def _remove_output(self):
+
+        if self.path.is_dir():
+            for part in self._part_files():
+                part.unlink()
+            self.path.rmdir()
+        elif self.path.exists():
+            self.path.unlink()
+
+        if self.progress_path.exists():
+            self.progress_path.unlink()
+
+    def _part_files(self):
+
+        # complete parts and temporary ones left by a crash (hidden from pyarrow by the leading dot)
+        return [*self.path.glob("part-*.parquet"), *self.path.glob(".part-*.parquet.tmp")]
+
+    def _resume(self):
+
+        with open(self.progress_path, encoding="utf-8") as f:
+            records = []
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # a record cut off by the crash; its chunk is dropped below
+                    break
+
+        if not records:
+            return self._start()
+
+        header, chunks = records[0], records[1:]
+        if (header["format"], header["compression"]) != (self.params["format"], self.params["compression"]):
+            raise ValueError(f"{self.path} was written as {header['format']} ({header['compression']}).")
+
+        for chunk in chunks:
+            self.completed.update(chunk["boreholes"])
+            self.columns = chunk["columns"]
+        self.offset = chunks[-1]["offset"] if chunks else 0
+        self.n_parts = len(chunks)
+
+        # drop what was written after the last recorded chunk
+        if self.params["format"] == "parquet":
+            recorded = {chunk["part"] for chunk in chunks}
+            for part in self._part_files():
+                if part.name not in recorded:
+                    part.unlink()
+            if self.n_parts:
+                self.schema = _import_pyarrow()[1].read_schema(self.path / chunks[-1]["part"])
+        else:
+            with open(self.path, "r+b") as f:
+                f.truncate(self.offset)
+
+        # rewrite the progress file without a partial last line
+        with open(self.progress_path, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(record, ensure_ascii=False) + "\n" for record in [header] + chunks)
+
+    def _append_progress(self, record):
+
+        with open(self.progress_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def write(self, borehole_id, df):
+        """
+        1本分の計算結果を追加する。chunk_rows 行以上溜まった時点で書き出す
+
+        Parameters
+        ----------
+        borehole_id : str
+            ボーリングの識別子（進捗ファイルに記録される）
+        df : DataFrame
+            計算結果
+        """
+        self._buffer.append(df)
+        self._buffer_ids.append(str(borehole_id))
+        self._buffer_rows += len(df)
+
+        if self._buffer_rows >= self.params["chunk_rows"]:
+            self.flush()
+
+    def flush(self):
+        """
+        溜まっている結果を1チャンクとして書き出し、進捗ファイルに記録する
+        """
+        if not self._buffer_ids:
+            return None
+
+        df_chunk = pd.concat(self._buffer, ignore_index=True)
+        # every chunk keeps the columns of the first one
+        if self.columns is None:
+            self.columns = [str(column) for column in df_chunk.columns]
+        df_chunk = df_chunk.reindex(columns=self.columns)
+
+        record = {"boreholes": self._buffer_ids, "rows": len(df_chunk), "columns": self.columns}
+
+        if self.params["format"] == "parquet":
+            record["part"] = self._write_parquet(df_chunk)
+        else:
+            self._write_text(df_chunk)
+        record["offset"] = self.offset
+
+        # the chunk counts as written only once it is recorded, after its data is on disk
+        self._append_progress(record)
+
+        self.completed.update(self._buffer_ids)
+        self._buffer, self._buffer_ids, self._buffer_rows = [], [], 0
+
+        return None
+
+    def _write_text(self, df_chunk):
+
+        if self.params["format"] == "csv":
+            text = df_chunk.to_csv(index=False, header=self.offset == 0, lineterminator="\n")
+        else:
+            text = df_chunk.to_json(orient="records", lines=True, force_ascii=False, date_format="iso", double_precision=15)
+            text = text if text.endswith("\n") else text + "\n"
+
+        data = text.encode("utf-8")
+        if self.params["compression"] == "gzip":
+            # concatenated gzip members read as one stream, and the file can be cut back at any member boundary
+            data = gzip.compress(data)
+
+        with open(self.path, "r+b") as f:
+            f.seek(self.offset)
+            f.write(data)
+            f.truncate()
+            f.flush()
+            os.fsync(f.fileno())
+
+        self.offset += len(data)
+
+    def _write_parquet(self, df_chunk):
+
+        pa, pq = _import_pyarrow()
+
+        table = pa.Table.from_pandas(df_chunk, preserve_index=False)
+        if self.schema is None:
+            # columns that are all missing in the first chunk would otherwise be typed null
+            self.schema = pa.schema([field.with_type(pa.string()) if pa.types.is_null(field.type) else field
+                                     for field in table.schema]).remove_metadata()
+        table = table.cast(self.schema)
+
+        # written under a temporary name, so that a part file is either complete or absent
+        name = f"part-{self.n_parts:05d}.parquet"
+        temp_path = self.path / f".{name}.tmp"
+        pq.write_table(table, temp_path, compression=self.params["compression"])
+        os.replace(temp_path, self.path / name)
+
+        self.n_parts += 1
+
+        return name
+
+    def close(self):
+
+        self.flush()
+
+        if not self.params["keep_progress"] and self.progress_path.exists():
+            self.progress_path.unlink()
+
+        return None
+
+    def __enter__(self):
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+
+        # boreholes received before an error are complete, so they are written as well
+        if exc_type is None:
+            self.close()
+        else:
+            self.flush()
+
+        return False
+
+
+def read_result(path, format=None):
+    """
+    ResultWriter で書き出した結果を読み込む
+
+    Parameters
+    ----------
+    path : str or Path
+        出力先
+    format : str, optional
+        "csv", "jsonl", "parquet"。None の場合は拡張子から決める
+
+    Returns
+    -------
+    DataFrame
+        書き出した結果
+    """
+    if format is None:
+        format, _ = _infer_format(path)
+
+    if format == "parquet":
+        _, pq = _import_pyarrow()
+        return pq.read_table(path).to_pandas()
+    elif format == "jsonl":
+        return pd.read_json(path, lines=True)
+
+    return pd.read_csv(path, float_precision="round_trip")
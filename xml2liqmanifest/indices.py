@@ -0,0 +1,218 @@
+import numpy as np
+import pandas as pd
+from .stress import GAMMA_W
+
+# PL integrates down to this depth [m]
+PL_MAX_DEPTH = 20.0
+
+# soils subject to the liquefaction assessment (JRA 2017): Fc <= 35 % or PI <= 15, and D50 <= 10 mm
+LIQUEFIABLE_MAX_FC = 35.0
+LIQUEFIABLE_MAX_PI = 15.0
+LIQUEFIABLE_MAX_D50 = 10.0
+
+# columns identifying a borehole in the combined results, tried in this order when group_column is omitted
+GROUP_COLUMNS = ["borehole_id", "file_path"]
+
+
+def _representative_intervals(group_start, depth, max_depth):
+
+    # each SPT depth represents the interval between the midpoints to its neighbours in the same borehole;
+    # the first one reaches up to the ground surface and the last one extends symmetrically below
+    n = len(depth)
+    is_first = np.zeros(n, dtype=bool)
+    is_first[group_start] = True
+    is_last = np.roll(is_first, -1)
+    is_last[-1] = True
+
+    midpoint = (depth[:-1] + depth[1:]) / 2
+
+    top = np.empty(n)
+    top[0] = 0.0
+    top[1:] = midpoint
+    top[is_first] = 0.0
+
+    bottom = np.empty(n)
+    bottom[:-1] = midpoint
+    bottom[is_last] = 2 * depth[is_last] - top[is_last]
+
+    return np.clip(top, 0, max_depth), np.clip(bottom, 0, max_depth)
+
+
+def is_liquefiable_soil(Fc, D50, PI):
+    """
+    液状化の判定対象となる土質かどうか（道路橋示方書 2017 に準ずる）
+
+    細粒分含有率 Fc が 35% 以下、または塑性指数 PI が 15 以下で、平均粒径 D50 が 10 mm 以下の土を対象とする。
+    Fc・D50 がない行は対象とし、Fc が 35% を超える行は PI が 15 以下と分かっている場合だけ対象とする
+
+    Parameters
+    ----------
+    Fc, D50, PI : array_like
+        細粒分含有率 [%], 平均粒径 [mm], 塑性指数（同じ形状、またはブロードキャストできる形状）
+
+    Returns
+    -------
+    ndarray
+        判定対象の行が True の配列
+    """
+    Fc, D50, PI = [np.asarray(values, dtype=float) for values in (Fc, D50, PI)]
+
+    return (~(Fc > LIQUEFIABLE_MAX_FC) | (PI <= LIQUEFIABLE_MAX_PI)) & ~(D50 > LIQUEFIABLE_MAX_D50)
+
+
+def get_liquefiable_rows(df_FL):
+    """
+    FL の計算結果の表のうち、液状化の判定対象とする行
+
+    地下水位より深く（間隙水圧 σv - σ'v が正）、is_liquefiable_soil() を満たす行を対象とする。
+    sigma_v, sigma_p_v の列がない場合は地下水位を考慮しない
+
+    Returns
+    -------
+    ndarray
+        判定対象の行が True の配列
+    """
+    def column(name):
+        return df_FL[name].to_numpy(dtype=float) if name in df_FL.columns else np.full(len(df_FL), np.nan)
+
+    is_liquefiable = is_liquefiable_soil(column("Fc"), column("D50"), column("PI"))
+    if {"sigma_v", "sigma_p_v"} <= set(df_FL.columns):
+        is_liquefiable &= column("sigma_v") - column("sigma_p_v") > 0
+
+    return is_liquefiable
+
+
+def calculate_indices_array(group_start, depth, FL, max_depth=PL_MAX_DEPTH, ground_water_level=None, liquefiable=None):
+    """
+    複数ボーリングを連結した FL 分布から、ボーリングごとの液状化指数をまとめて計算する
+
+    判定対象外の行（liquefiable が False の行、地下水位以浅の行）は FL を NaN とみなし、PL・H_liq・FL_min に含めない。
+    地下水位を与えた場合、各行の代表区間は地下水位より上を除く
+
+    Parameters
+    ----------
+    group_start : array_like
+        各ボーリングの先頭行の位置（昇順）。行はボーリングごとに連続し、深度の昇順であること
+    depth : array_like
+        (行数,) の SPT 深度 [m]
+    FL : array_like
+        (..., 行数) の FL。先頭の次元はシナリオやサンプルなど任意
+    max_depth : float, optional
+        積分する深さの下限 [m], by default 20.0
+    ground_water_level : float or array_like, optional
+        地下水位 [m]。スカラーまたは (..., ボーリング数) の配列。None の場合は地表面とみなす
+    liquefiable : array_like, optional
+        (..., 行数) の判定対象の土質の行（is_liquefiable_soil() の結果など）。None の場合は全行
+
+    Returns
+    -------
+    dict
+        "PL"（液状化指数）, "H_liq"（FL <= 1 の層厚の合計 [m]）, "FL_min"（最小 FL）。
+        いずれも (..., ボーリング数) の配列
+    """
+    group_start = np.asarray(group_start, dtype=np.int64)
+    depth = np.asarray(depth, dtype=float)
+    FL = np.asarray(FL, dtype=float)
+
+    top, bottom = _representative_intervals(group_start, depth, max_depth)
+
+    if liquefiable is not None:
+        FL = np.where(liquefiable, FL, np.nan)
+
+    if ground_water_level is not None:
+        # only saturated soil liquefies: intervals start at the water level and rows at or above it are excluded
+        level = np.asarray(ground_water_level, dtype=float)
+        if level.ndim == 0:
+            level = np.full(len(group_start), float(level))
+        level = np.repeat(level, np.diff(np.append(group_start, len(depth))), axis=-1)
+        top = np.maximum(top, np.minimum(level, max_depth))
+        bottom = np.maximum(bottom, top)
+        FL = np.where(depth > level, FL, np.nan)
+
+    # exact integral of the weight w(z) = 10 - 0.5 z over each representative interval
+    weight = 10 * (bottom - top) - 0.25 * (bottom ** 2 - top ** 2)
+    thickness = bottom - top
+
+    # excluded rows (FL is NaN) contribute nothing
+    F = np.where(FL < 1, 1 - FL, 0.0)
+    is_liquefied = FL <= 1
+
+    return {
+        "PL": np.add.reduceat(F * weight, group_start, axis=-1),
+        "H_liq": np.add.reduceat(np.where(is_liquefied, thickness, 0.0), group_start, axis=-1),
+        "FL_min": np.fmin.reduceat(np.where(depth <= max_depth, FL, np.nan), group_start, axis=-1),
+    }
+
+
+def calculate_PL(depth, FL, max_depth=PL_MAX_DEPTH, ground_water_level=None, liquefiable=None):
+    """
+    ボーリング1本の液状化指数 PL を計算する
+
+    Parameters
+    ----------
+    depth : array_like
+        (深度数,) の SPT 深度 [m]（昇順）
+    FL : array_like
+        (..., 深度数) の FL
+    ground_water_level, liquefiable : optional
+        calculate_indices_array() を参照
+
+    Returns
+    -------
+    float or ndarray
+        PL。FL が2次元以上の場合は先頭の次元ごとの配列
+    """
+    PL = calculate_indices_array([0], depth, FL, max_depth, ground_water_level, liquefiable)["PL"][..., 0]
+
+    return PL if PL.ndim else float(PL)
+
+
+def calculate_indices(df_FL, group_column=None, FL_column="FL", max_depth=PL_MAX_DEPTH):
+    """
+    複数ボーリングの計算結果の表から、ボーリングごとの液状化指数を計算する
+
+    判定対象は get_liquefiable_rows() の行に限る。地下水位はボーリングごとに間隙水圧 σv - σ'v から求める
+    （sigma_v, sigma_p_v の列がない場合は地表面とみなす）
+
+    Parameters
+    ----------
+    df_FL : DataFrame
+        group_column, depth, FL_column の列を持つ表
+        （BoreholeCollection.calculate_FL() や LiquefactionManifestBatch.run() の結果など）
+    group_column : str, optional
+        ボーリングを識別する列。省略時は GROUP_COLUMNS のうち df_FL にある最初の列
+        （BoreholeCollection の結果は borehole_id, LiquefactionManifestBatch の結果は file_path）
+    FL_column : str, optional
+        FL の列, by default "FL"
+
+    Returns
+    -------
+    DataFrame
+        ボーリングごとの PL, H_liq, FL_min
+    """
+    if group_column is None:
+        group_column = next((column for column in GROUP_COLUMNS if column in df_FL.columns), None)
+        if group_column is None:
+            raise KeyError(f"df_FL has none of the columns {GROUP_COLUMNS}; specify group_column.")
+
+    df_sorted = df_FL.sort_values([group_column, "depth"], kind="stable")
+
+    groups = df_sorted[group_column].to_numpy()
+    group_start = np.flatnonzero(np.concatenate([[True], groups[1:] != groups[:-1]])) if len(groups) else []
+
+    if len(group_start) == 0:
+        return pd.DataFrame(columns=[group_column, "PL", "H_liq", "FL_min"])
+
+    depth = df_sorted["depth"].to_numpy(dtype=float)
+
+    ground_water_level = None
+    if {"sigma_v", "sigma_p_v"} <= set(df_sorted.columns):
+        # below the water level sigma_v - sigma'v = GAMMA_W * (depth - level); a borehole dry to its bottom gets inf
+        pore_pressure = df_sorted["sigma_v"].to_numpy(dtype=float) - df_sorted["sigma_p_v"].to_numpy(dtype=float)
+        ground_water_level = np.fmin.reduceat(np.where(pore_pressure > 0, depth - pore_pressure / GAMMA_W, np.inf),
+                                              group_start)
+
+    indices = calculate_indices_array(group_start, depth, df_sorted[FL_column].to_numpy(dtype=float), max_depth,
+                                      ground_water_level, get_liquefiable_rows(df_sorted))
+
+    return pd.DataFrame({group_column: groups[group_start], **indices})
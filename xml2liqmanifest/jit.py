@@ -0,0 +1,144 @@
+import functools
+import numpy as np
+
+# replaced by numba.prange when the kernels are compiled; plain range keeps the kernels runnable as Python
+prange = range
+
+
+def _import_numba():
+
+    try:
+        import numba
+    except ImportError:
+        return None
+
+    return numba
+
+
+# JRA 2012: CFc, Na and RL in one pass over the rows, same branches as CalculateFL._JRA_2012_2017_columns
+def _JRA_resistance_kernel(D50, Fc, N1, CFc, Na, RL):
+
+    for i in prange(len(N1)):
+
+        if D50[i] >= 2:
+            CFc_i = 1.0
+            Na_i = (1 - 0.36 * np.log10(D50[i] / 2)) * N1[i]
+        else:
+            if Fc[i] < 10:
+                CFc_i = 1.0
+            elif Fc[i] < 60:
+                CFc_i = (Fc[i] + 40) / 50
+            else:
+                CFc_i = Fc[i] / 20 - 1
+            Na_i = CFc_i * (N1[i] + 2.47) - 2.47
+
+        if N1[i] < 14:
+            RL_i = 0.0882 * ((0.85 * Na_i + 2.1) / 1.7) ** 0.5
+        else:
+            RL_i = 0.0882 * (Na_i / 1.7) ** 0.5 + 1.6 * 10 ** -6 * (N1[i] - 14) ** 4.5
+
+        CFc[i] = CFc_i
+        Na[i] = Na_i
+        RL[i] = RL_i
+
+
+# JRA 2012: Cw and R = RL * Cw in one pass over the rows
+def _JRA_Cw_R_kernel(RL, is_type_II, Cw, R):
+
+    for i in prange(len(RL)):
+
+        if not is_type_II or RL[i] <= 0.1:
+            Cw_i = 1.0
+        elif RL[i] <= 0.4:
+            Cw_i = 3.3 * RL[i] + 0.67
+        else:
+            Cw_i = 2.0
+
+        Cw[i] = Cw_i
+        R[i] = RL[i] * Cw_i
+
+
+@functools.lru_cache(maxsize=None)
+def get_kernels():
+    """
+    Numba でコンパイルしたカーネルを返す（プロセスごとに1回だけ作成する）
+
+    Returns
+    -------
+    dict or None
+        {カーネル名: 関数}。Numba がインストールされていない場合は None
+    """
+    numba = _import_numba()
+
+    if numba is None:
+        return None
+
+    # the kernels look up prange when they are compiled, i.e. on their first call
+    global prange
+    prange = numba.prange
+
+    jit = numba.njit(parallel=True, cache=True)
+
+    return {
+        "JRA_resistance": jit(_JRA_resistance_kernel),
+        "JRA_Cw_R": jit(_JRA_Cw_R_kernel),
+    }
+
+
+def _as_float64(*arrays):
+
+    # the compiled loops take contiguous float64 arrays of one signature
+    return [np.ascontiguousarray(array, dtype=np.float64) for array in arrays]
+
+
+def JRA_resistance(D50, Fc, N1, kernels=None):
+    """
+    JRA 2012 の CFc, Na, RL を計算する
+
+    Parameters
+    ----------
+    D50, Fc, N1 : array_like
+        同じ長さの1次元配列
+    kernels : dict, optional
+        get_kernels() の結果。None の場合は同じループを Python で実行する（検証用）
+
+    Returns
+    -------
+    tuple
+        (CFc, Na, RL)
+    """
+    D50, Fc, N1 = _as_float64(D50, Fc, N1)
+    CFc, Na, RL = np.empty_like(N1), np.empty_like(N1), np.empty_like(N1)
+
+    kernel = _JRA_resistance_kernel if kernels is None else kernels["JRA_resistance"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        kernel(D50, Fc, N1, CFc, Na, RL)
+
+    return CFc, Na, RL
+
+
+def JRA_Cw_R(RL, is_type_II, kernels=None):
+    """
+    JRA 2012 の Cw, R を計算する
+
+    Parameters
+    ----------
+    RL : array_like
+        1次元配列
+    is_type_II : bool
+        レベル2地震動タイプII かどうか
+    kernels : dict, optional
+        get_kernels() の結果。None の場合は同じループを Python で実行する（検証用）
+
+    Returns
+    -------
+    tuple
+        (Cw, R)
+    """
+    (RL,) = _as_float64(RL)
+    Cw, R = np.empty_like(RL), np.empty_like(RL)
+
+    kernel = _JRA_Cw_R_kernel if kernels is None else kernels["JRA_Cw_R"]
+    kernel(RL, bool(is_type_II), Cw, R)
+
+    return Cw, R
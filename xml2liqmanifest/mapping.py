@@ -0,0 +1,328 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import json
+import math
+import numpy as np
+from .spatial import _import_cKDTree, _to_unit_vectors, _km_to_chord, _chord_to_km
+
+
+def _import_rasterio():
+
+    try:
+        import rasterio
+    except ImportError as e:
+        raise ImportError("rasterio is required for GeoTIFF output. Install it with `pip install rasterio`.") from e
+
+    return rasterio
+
+
+def make_grid(bbox, resolution):
+    """
+    緯度経度の矩形を等間隔のセルに分割した格子を定義する
+
+    Parameters
+    ----------
+    bbox : tuple
+        (lat_min, lon_min, lat_max, lon_max)
+    resolution : float or tuple
+        セルの大きさ [deg]。(dlat, dlon) で緯度・経度方向を別に指定できる
+
+    Returns
+    -------
+    dict
+        shape（行数, 列数）, bbox（セルの外周）, resolution, transform（GDAL の geotransform）, crs。
+        1行目が北端で、セル (i, j) の中心は (lat_max - (i + 0.5) * dlat, lon_min + (j + 0.5) * dlon)
+    """
+    lat_min, lon_min, lat_max, lon_max = bbox
+    dlat, dlon = resolution if isinstance(resolution, (list, tuple)) else (resolution, resolution)
+
+    if not (lat_min < lat_max and lon_min < lon_max):
+        raise ValueError("Invalid bbox.")
+    if not (dlat > 0 and dlon > 0):
+        raise ValueError("Invalid resolution.")
+
+    # cells cover the bbox; the last row and column may extend past lat_min / lon_max
+    n_rows = math.ceil(round((lat_max - lat_min) / dlat, 9))
+    n_cols = math.ceil(round((lon_max - lon_min) / dlon, 9))
+
+    return {
+        "shape": [n_rows, n_cols],
+        "bbox": [lat_max - n_rows * dlat, lon_min, lat_max, lon_min + n_cols * dlon],
+        "resolution": [dlat, dlon],
+        "transform": [lon_min, dlon, 0.0, lat_max, 0.0, -dlat],
+        "crs": "EPSG:4326",
+    }
+
+
+def grid_coordinates(grid, rows=None, cols=None):
+    """
+    格子のセル中心の緯度・経度を返す
+
+    Parameters
+    ----------
+    grid : dict
+        make_grid() の結果
+    rows, cols : slice, optional
+        対象とする行・列の範囲。省略時は全て
+
+    Returns
+    -------
+    (ndarray, ndarray)
+        行ごとの緯度と列ごとの経度
+    """
+    n_rows, n_cols = grid["shape"]
+    lon_min, dlon, _, lat_max, _, dlat = grid["transform"]
+
+    rows = range(n_rows)[rows or slice(None)]
+    cols = range(n_cols)[cols or slice(None)]
+
+    lat = lat_max + (np.arange(rows.start, rows.stop) + 0.5) * dlat
+    lon = lon_min + (np.arange(cols.start, cols.stop) + 0.5) * dlon
+
+    return lat, lon
+
+
+class GridInterpolator:
+
+    def __init__(self, lat, lon, values, method="idw", k=8, power=2.0, max_distance_km=None):
+        """
+        ボーリングごとの値（PL など）を任意の地点に内挿する
+
+        ボーリング位置を単位球上の点として cKDTree に登録し、近い k 本の大円距離による逆距離加重（idw）
+        または最近傍（nearest）で内挿する。緯度経度・値が NaN のボーリングは使わない
+
+        Parameters
+        ----------
+        lat, lon : array_like
+            ボーリングの緯度経度 [deg]
+        values : array_like
+            ボーリングごとの値
+        method : str, optional
+            "idw" または "nearest", by default "idw"
+        k : int, optional
+            idw で使う近傍のボーリング数, by default 8
+        power : float, optional
+            idw の距離の指数, by default 2.0
+        max_distance_km : float, optional
+            これより遠いボーリングは使わない。範囲内にボーリングがない地点は NaN
+        """
+        if method not in ["idw", "nearest"]:
+            raise ValueError("Invalid method.")
+
+        self.params = {
+            "method": method,
+            "k": 1 if method == "nearest" else k,
+            "power": power,
+            "max_distance_km": max_distance_km,
+        }
+
+        lat, lon, values = [np.asarray(array, dtype=float).ravel() for array in (lat, lon, values)]
+        valid = ~(np.isnan(lat) | np.isnan(lon) | np.isnan(values))
+        # a NaN sentinel at the end stands for the missing neighbours cKDTree reports as index n
+        self.values = np.append(values[valid], np.nan)
+
+        cKDTree = _import_cKDTree()
+        self._tree = cKDTree(_to_unit_vectors(lat[valid], lon[valid]))
+
+        return None
+
+    @classmethod
+    def from_collection(cls, collection, values, column="PL", **kwargs):
+        """
+        BoreholeCollection の緯度経度と、ボーリングごとの値から作成する
+
+        Parameters
+        ----------
+        collection : BoreholeCollection
+            ボーリングの集合
+        values : DataFrame or dict or Series
+            borehole_id 列と column 列を持つ表（calculate_indices() の結果など）、または {borehole_id: 値}
+        column : str, optional
+            values が表の場合に使う列, by default "PL"
+        **kwargs
+            GridInterpolator の引数（method, k, power, max_distance_km）
+        """
+        if hasattr(values, "columns"):
+            values = dict(zip(values["borehole_id"].astype(str), values[column]))
+        else:
+            values = {str(borehole_id): value for borehole_id, value in dict(values).items()}
+
+        df_coordinates = collection.get_coordinates()
+        borehole_values = [values.get(borehole_id, np.nan) for borehole_id in df_coordinates["borehole_id"]]
+
+        return cls(df_coordinates["lat"], df_coordinates["lon"], borehole_values, **kwargs)
+
+    def __len__(self):
+
+        return len(self.values) - 1
+
+    def interpolate(self, lat, lon, workers=1):
+        """
+        地点の値を内挿する
+
+        Parameters
+        ----------
+        lat, lon : array_like
+            地点の緯度経度 [deg]（同じ形状、またはブロードキャストできる形状）
+        workers : int, optional
+            cKDTree.query のスレッド数, by default 1
+
+        Returns
+        -------
+        ndarray
+            内挿した値（lat, lon をブロードキャストした形状）
+        """
+        lat, lon = np.broadcast_arrays(np.asarray(lat, dtype=float), np.asarray(lon, dtype=float))
+        shape = lat.shape
+
+        k = min(self.params["k"], len(self))
+        if k == 0:
+            return np.full(shape, np.nan)
+
+        max_distance_km = self.params["max_distance_km"]
+        upper_bound = np.inf if max_distance_km is None else float(_km_to_chord(max_distance_km))
+
+        chord, hits = self._tree.query(_to_unit_vectors(lat.ravel(), lon.ravel()), k=k,
+                                       distance_upper_bound=upper_bound, workers=workers)
+        chord, hits = chord.reshape(-1, k), hits.reshape(-1, k)
+        neighbour_values = self.values[hits]
+
+        if k == 1:
+            return neighbour_values[:, 0].reshape(shape)
+
+        found = hits < len(self)
+        distance = np.where(found, _chord_to_km(np.where(found, chord, 0)), np.inf)
+
+        # a point on a borehole takes its value; elsewhere the weights are 1 / distance ** power
+        exact = found & (distance == 0)
+        with np.errstate(divide="ignore"):
+            weight = np.where(found & ~exact, distance ** -self.params["power"], 0.0)
+        weighted = np.sum(weight * np.where(found, neighbour_values, 0.0), axis=1)
+        total = np.sum(weight, axis=1)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            result = np.where(total > 0, weighted / total, np.nan)
+
+        on_borehole = exact.any(axis=1)
+        result[on_borehole] = neighbour_values[on_borehole, exact[on_borehole].argmax(axis=1)]
+
+        return result.reshape(shape)
+
+    def to_grid(self, bbox, resolution, path=None, tile_size=512, max_workers=None, dtype="float32"):
+        """
+        格子の全セルの値を内挿する
+
+        格子を tile_size 四方のタイルに分けてスレッドプールで並列に計算し、結果を出力配列に直接書き込む。
+        path を指定した場合の出力は NumPy のメモリマップ（.npy）のため、メモリに載らない大きさの格子も作成できる
+
+        Parameters
+        ----------
+        bbox : tuple
+            (lat_min, lon_min, lat_max, lon_max)
+        resolution : float or tuple
+            セルの大きさ [deg]。(dlat, dlon) で別に指定できる
+        path : str or Path, optional
+            出力先の .npy ファイル。格子の定義は <path>.json に保存する。省略時はメモリ上の配列を返す
+        tile_size : int, optional
+            タイルの1辺のセル数, by default 512
+        max_workers : int, optional
+            スレッド数, by default os.cpu_count()
+        dtype : str, optional
+            出力の型, by default "float32"
+
+        Returns
+        -------
+        ndarray or memmap
+            (行数, 列数) の配列。1行目が北端、値のないセルは NaN
+
+        使用例:
+            grid_PL = interpolator.to_grid((24.0, 122.0, 46.0, 146.0), 0.001, path="PL.npy")
+            grid_PL, grid = read_grid("PL.npy")
+        """
+        grid = make_grid(bbox, resolution)
+        n_rows, n_cols = grid["shape"]
+
+        if path is None:
+            out = np.empty((n_rows, n_cols), dtype=dtype)
+        else:
+            path = Path(path)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            out = np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=(n_rows, n_cols))
+
+        def fill(tile):
+            rows, cols = tile
+            lat, lon = grid_coordinates(grid, rows, cols)
+            # cKDTree.query releases the GIL, so the tiles run in parallel on threads sharing the output
+            out[rows, cols] = self.interpolate(lat[:, None], lon[None, :])
+
+        tiles = [(slice(row, min(row + tile_size, n_rows)), slice(col, min(col + tile_size, n_cols)))
+                 for row in range(0, n_rows, tile_size) for col in range(0, n_cols, tile_size)]
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # list() re-raises the first error of a tile
+            list(executor.map(fill, tiles))
+
+        if path is not None:
+            out.flush()
+            grid.update({"dtype": np.dtype(dtype).name, "nodata": "nan", **self.params})
+            with open(path.with_name(path.name + ".json"), "w", encoding="utf-8") as f:
+                json.dump(grid, f, ensure_ascii=False, indent=2)
+
+        return out
+
+
+def read_grid(path):
+    """
+    to_grid() で書き出した格子をメモリマップで開く
+
+    Returns
+    -------
+    (memmap, dict)
+        値の配列と格子の定義
+    """
+    path = Path(path)
+    with open(path.with_name(path.name + ".json"), encoding="utf-8") as f:
+        grid = json.load(f)
+
+    return np.load(path, mmap_mode="r"), grid
+
+
+def write_geotiff(values, grid, path, compress="deflate"):
+    """
+    格子を GeoTIFF に書き出す（rasterio が必要）
+
+    Parameters
+    ----------
+    values : ndarray
+        to_grid() の結果
+    grid : dict
+        make_grid() または read_grid() の格子の定義
+    path : str or Path
+        出力先
+    compress : str, optional
+        圧縮方式, by default "deflate"
+    """
+    rasterio = _import_rasterio()
+    from rasterio.transform import Affine
+
+    n_rows, n_cols = grid["shape"]
+    profile = {
+        "driver": "GTiff",
+        "height": n_rows,
+        "width": n_cols,
+        "count": 1,
+        "dtype": np.dtype(values.dtype).name,
+        "crs": grid["crs"],
+        "transform": Affine.from_gdal(*grid["transform"]),
+        "nodata": np.nan,
+        "compress": compress,
+        "tiled": True,
+    }
+
+    with rasterio.open(path, "w", **profile) as dst:
+        # written in blocks of rows, so that a memory-mapped grid is never loaded at once
+        for row in range(0, n_rows, 1024):
+            block = np.asarray(values[row:row + 1024])
+            dst.write(block, 1, window=rasterio.windows.Window(0, row, n_cols, len(block)))
+
+    return None
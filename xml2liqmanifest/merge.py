@@ -1,12 +1,125 @@
+import warnings
+import numpy as np
 import pandas as pd
+from .classify import SoilClassifier, get_default_classifier, load_soil_properties, SOIL_PROPERTY_COLUMNS
+from .profiling import stage
+
+# bump when the merge or soil classification logic changes, so that cached FL results are invalidated
+MERGE_VERSION = 1
+
+# observation notes overlapping the same SPT are joined with this separator
+NOTE_SEPARATOR = " / "
+
 
 class MergeSoilLayerIntoSPT:
 
-    def __init__(self, data):
-        
-        self.data = data
-        self.spt_data = data["borehole_data"]["SPT"]
-        
-    
+    def __init__(self, data, soil_properties=None):
+        """
+        SPT データに土層・物性値・観察記事を付与する
+
+        物性値は SoilClassifier で土質名ごとに解決する（表にない土質名は分類の代表値を使う）
+
+        土層の下端深度と観察記事の深度範囲を二分探索で SPT 深度に対応付けるため、
+        計算量は (SPT 数 + 土層数) × log(土層数) で済む
+
+        Parameters
+        ----------
+        data : dict
+            borehole_data を含む辞書（LiquefactionManifest.data など）
+        soil_properties : DataFrame, optional
+            classify.load_soil_properties() と同じ形式の物性値の表, by default soil_properties.csv
+        """
+        with stage("merge") as merge_stage:
+            self.data = data
+            self.spt_data = data["borehole_data"]["SPT"]
+            self.classifier = get_default_classifier() if soil_properties is None else SoilClassifier(soil_properties)
+
+            if not self.spt_data:
+                raise ValueError("標準貫入試験データがありません。")
+            if not data["borehole_data"]["soil_layers"]:
+                raise ValueError("土質区分情報がありません。")
+
+            soil_layers = self._merge_properties_into_soil_layers(data["borehole_data"]["soil_layers"])
+            df_SPT = self._make_df_SPT(self.spt_data, soil_layers, data["borehole_data"]["observation_note"])
+
+            # soil layers carry the unit weights so that StressProfile can be built from borehole_data
+            self.data["borehole_data"] = {**data["borehole_data"], "soil_layers": soil_layers}
+            self.data["df_SPT"] = df_SPT
+
+            merge_stage.set_records(len(df_SPT))
+
     def get_merged_data(self):
-        return self.data
\ No newline at end of file
+        return self.data
+
+    def _merge_properties_into_soil_layers(self, soil_layers):
+
+        missing = (np.nan,) * len(SOIL_PROPERTY_COLUMNS)
+        properties = [self.classifier.classify(layer["class_name"]).properties for layer in soil_layers]
+
+        unknown = sorted({str(layer["class_name"]) for layer, values in zip(soil_layers, properties) if values is None})
+        if unknown:
+            warnings.warn(f"物性値を決められない土質名があります: {', '.join(unknown)}")
+
+        # new dicts, so that cached borehole data stays untouched
+        return [{**layer, **dict(zip(SOIL_PROPERTY_COLUMNS, values or missing))}
+                for layer, values in zip(soil_layers, properties)]
+
+    def _make_df_SPT(self, spt_data, soil_layers, observation_notes):
+
+        depth = np.array([spt["depth"] for spt in spt_data], dtype=float)
+        total_penetration = np.array([spt["total_penetration"] for spt in spt_data], dtype=float)
+
+        lower_depth = np.array([layer["depth"] for layer in soil_layers], dtype=float)
+        if np.any(np.diff(lower_depth) < 0):
+            raise ValueError("土質区分の下端深度が深さ順に並んでいません。")
+
+        # layer j holds the depths in (lower_depth[j-1], lower_depth[j]], same as calculateSPTChartValues
+        layer = np.searchsorted(lower_depth, depth, side="left")
+        is_matched = layer < len(soil_layers)
+        if not is_matched.all():
+            warnings.warn(f"最下層の下端深度（{lower_depth[-1]}m）より深い標準貫入試験が{(~is_matched).sum()}件あります。")
+
+        # per-layer columns with one trailing sentinel of missing values for depths below the deepest layer
+        def layer_column(key, dtype):
+            return np.array([soil_layer[key] for soil_layer in soil_layers] + [None], dtype=dtype)[layer]
+
+        columns = {
+            "depth": depth,
+            "N": np.array([spt["total_hits"] for spt in spt_data], dtype=np.int64),
+            "total_penetration": total_penetration,
+            "layer": pd.array(np.where(is_matched, layer, 0), dtype="Int64"),
+            "class_name": layer_column("class_name", object),
+            "class_code": layer_column("class_code", object),
+            **{column: layer_column(column, float) for column in SOIL_PROPERTY_COLUMNS},
+            "notes": self._join_observation_notes(depth, total_penetration, observation_notes),
+        }
+        columns["layer"][~is_matched] = pd.NA
+
+        return pd.DataFrame(columns)
+
+    def _join_observation_notes(self, depth, total_penetration, observation_notes):
+
+        if not observation_notes:
+            return np.full(len(depth), None, dtype=object)
+
+        notes = sorted(observation_notes, key=lambda note: note["upper_depth"])
+        upper = np.array([note["upper_depth"] for note in notes], dtype=float)
+        lower = np.array([note["lower_depth"] for note in notes], dtype=float)
+
+        # each SPT covers [depth, depth + penetration]
+        top = depth
+        bottom = top + np.nan_to_num(total_penetration) / 1000
+
+        # notes before `start` end above the SPT (their running maximum of lower_depth does), notes from `end` start below it;
+        # only the few in between need checking, even when notes overlap each other
+        start = np.searchsorted(np.maximum.accumulate(lower), top, side="right")
+        # a zero-length SPT is a point and also matches the notes starting exactly at it
+        end = np.where(bottom > top, np.searchsorted(upper, bottom, side="left"), np.searchsorted(upper, top, side="right"))
+
+        joined = np.empty(len(depth), dtype=object)
+        joined[:] = [
+            NOTE_SEPARATOR.join(notes[k]["note"] or "" for k in range(i, j) if lower[k] > t) or None
+            for i, j, t in zip(start, end, top)
+        ]
+
+        return joined
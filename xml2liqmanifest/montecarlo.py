@@ -0,0 +1,193 @@
+import hashlib
+import numpy as np
+import pandas as pd
+from .calc import CalculateFL, METHOD_COLUMNS, METHOD_INPUT_COLUMNS
+from .indices import calculate_indices_array, is_liquefiable_soil
+from .stress import StressProfile, GAMMA_W
+from .profiling import stage
+
+# scatter of the uncertain inputs: coefficients of variation of lognormal factors with mean 1
+# (N per row, Fc and D50 per soil layer) and the standard deviation of the ground water level [m]
+DEFAULT_UNCERTAINTY = {
+    "N_cov": 0.3,
+    "Fc_cov": 0.3,
+    "D50_cov": 0.3,
+    "ground_water_level_std": 0.5,
+}
+
+# PL thresholds of the liquefaction risk classes (Iwasaki et al.)
+PL_THRESHOLDS = [5, 15]
+
+
+def make_seed_sequence(seed, key):
+    """
+    seed とボーリングの識別子から乱数列の種を作る。処理の順番やプロセスの割り当てによらず同じ乱数列になる
+
+    Parameters
+    ----------
+    seed : int
+        全体の乱数の種
+    key : str
+        ボーリングの識別子（ファイルパスなど）
+
+    Returns
+    -------
+    SeedSequence
+        乱数列の種
+    """
+    digest = hashlib.sha256(str(key).encode("utf-8")).digest()
+
+    return np.random.SeedSequence([seed, int.from_bytes(digest[:8], "little")])
+
+
+def _lognormal_factor(rng, cov, size):
+
+    # lognormal with mean 1 and the given coefficient of variation
+    sigma = np.sqrt(np.log1p(cov ** 2))
+
+    return rng.lognormal(-sigma ** 2 / 2, sigma, size) if cov > 0 else np.ones(size)
+
+
+class MonteCarloFL(CalculateFL):
+
+    def __init__(self, df_SPT, params, n_samples=1000, uncertainty=None, seed=0, batch_size=1000, key=None):
+        """
+        入力のばらつきを考慮した FL・PL の確率分布をモンテカルロ法で計算する
+
+        N・Fc・D50・地下水位の実現値を (サンプル数, 深度数) の配列として batch_size 件ずつ生成し、
+        全サンプルの FL と PL を配列演算でまとめて計算する。Fc・D50 は土層ごとに同じ係数をかける
+
+        乱数列は seed とボーリングの識別子 key から作り、変数ごとに独立した列を使うため、
+        batch_size や処理するプロセスによらず同じ結果になる
+
+        Parameters
+        ----------
+        df_SPT : DataFrame
+            土層情報をマージ済みの SPT データ
+        params : dict
+            LiquefactionManifest.data に相当する辞書（method, method_params, borehole_data を含む）
+        n_samples : int, optional
+            サンプル数, by default 1000
+        uncertainty : dict, optional
+            DEFAULT_UNCERTAINTY のうち変更する値
+        seed : int, optional
+            乱数の種, by default 0
+        batch_size : int, optional
+            一度に計算するサンプル数, by default 1000
+        key : str, optional
+            ボーリングの識別子, by default params["file_path"]
+        """
+        self.df_SPT = df_SPT
+        self.params = params
+        self.engine = "vectorized"
+        self.stress_profile = None
+
+        self.uncertainty = {**DEFAULT_UNCERTAINTY, **(uncertainty or {})}
+        self.sampling = {
+            "n_samples": n_samples,
+            "seed": seed,
+            "batch_size": batch_size,
+            "key": str(params.get("file_path", "")) if key is None else str(key),
+        }
+
+        method = self.params["method"]
+        if method not in METHOD_COLUMNS:
+            raise ValueError("Invalid method.")
+        if method == "JRA" and self.params["method_params"]["year"] not in [2012, 2017]:
+            raise NotImplementedError("Monte Carlo simulation is only implemented for JRA 2012 / 2017.")
+
+        with stage("monte_carlo_FL", records=n_samples * len(self.df_SPT)):
+            self._simulate()
+
+        return None
+
+    def _simulate(self):
+
+        method = self.params["method"]
+        n_samples, batch_size = self.sampling["n_samples"], self.sampling["batch_size"]
+
+        inputs = {column: self.df_SPT[column].to_numpy(dtype=float) for column in METHOD_INPUT_COLUMNS[method]}
+        depth = inputs["depth"]
+        layer = self.df_SPT["layer"].to_numpy(dtype=float, na_value=np.nan)
+        has_layer = ~np.isnan(layer)
+        layer = np.where(has_layer, layer, 0).astype(np.int64)
+        n_layers = len(self.params["borehole_data"]["soil_layers"])
+
+        # stress for any water level from two profiles: all layers above water and all below
+        soil_layers = self.params["borehole_data"]["soil_layers"]
+        profile_args = ([l["depth"] for l in soil_layers], [l["gamma_wet"] for l in soil_layers],
+                        [l["gamma_sat"] for l in soil_layers])
+        wet_profile = StressProfile(*profile_args, ground_water_level=np.inf)
+        saturated_profile = StressProfile(*profile_args, ground_water_level=0.0)
+        ground_water_level = self.params["borehole_data"].get("ground_water_level") or 0.0
+
+        # one stream per variable, so that the samples do not depend on batch_size
+        streams = [np.random.default_rng(child) for child in
+                   make_seed_sequence(self.sampling["seed"], self.sampling["key"]).spawn(4)]
+        rng_N, rng_Fc, rng_D50, rng_water = streams
+
+        # FL columns except the stress, which is sampled here
+        columns = [column for column in METHOD_COLUMNS[method] if column not in ["sigma_v", "sigma_p_v"]]
+        order = np.argsort(depth, kind="stable")
+
+        # the soil type decides whether a row is assessed, so the unsampled properties are used
+        is_liquefiable = is_liquefiable_soil(*[self.df_SPT[column].to_numpy(dtype=float) if column in self.df_SPT.columns
+                                               else np.nan for column in ["Fc", "D50", "PI"]])
+        n_liquefied = np.zeros(len(depth))
+        PL = []
+
+        for start in range(0, n_samples, batch_size):
+            size = min(batch_size, n_samples - start)
+
+            values = dict(inputs)
+            values["N"] = inputs["N"] * _lognormal_factor(rng_N, self.uncertainty["N_cov"], (size, len(depth)))
+            for column, rng in [("Fc", rng_Fc), ("D50", rng_D50)]:
+                factor = _lognormal_factor(rng, self.uncertainty[f"{column}_cov"], (size, n_layers))
+                if column in values:
+                    values[column] = inputs[column] * np.where(has_layer, factor[:, layer], 1.0)
+            if "Fc" in values:
+                values["Fc"] = np.minimum(values["Fc"], 100)
+
+            water_level = np.maximum(ground_water_level + self.uncertainty["ground_water_level_std"]
+                                     * rng_water.standard_normal((size, 1)), 0)
+            above_water = np.minimum(depth, water_level)
+            values["sigma_v"] = (wet_profile.sigma_v(above_water) + saturated_profile.sigma_v(depth)
+                                 - saturated_profile.sigma_v(above_water))
+            values["sigma_p_v"] = values["sigma_v"] - GAMMA_W * (depth - above_water)
+
+            FL = self._method_columns(method, values, columns)["FL"]
+
+            # rows above the sampled water level or of non-liquefiable soil are excluded, as in calculate_indices_array
+            FL = np.where(is_liquefiable & (depth > water_level), FL, np.nan)
+            n_liquefied += np.sum(FL < 1, axis=0)
+            PL.append(calculate_indices_array([0], depth[order], FL[:, order], ground_water_level=water_level)["PL"][:, 0])
+
+        self.P_liquefaction = n_liquefied / n_samples
+        self.PL = np.concatenate(PL) if PL else np.empty(0)
+
+    def get_FL_probability(self):
+        """
+        Returns
+        -------
+        DataFrame
+            深度ごとの FL < 1 となる確率（P_liquefaction 列）
+        """
+        return pd.DataFrame({"depth": self.df_SPT["depth"].to_numpy(), "P_liquefaction": self.P_liquefaction})
+
+    def get_PL_summary(self, percentiles=(5, 50, 95)):
+        """
+        Parameters
+        ----------
+        percentiles : tuple, optional
+            求める PL のパーセンタイル, by default (5, 50, 95)
+
+        Returns
+        -------
+        dict
+            PL の平均・パーセンタイル（PL_p<パーセンタイル>）と、PL が PL_THRESHOLDS を超える確率
+        """
+        summary = {"n_samples": len(self.PL), "PL_mean": float(np.mean(self.PL))}
+        summary.update({f"PL_p{p:g}": float(v) for p, v in zip(percentiles, np.percentile(self.PL, percentiles))})
+        summary.update({f"P_PL_gt_{threshold:g}": float(np.mean(self.PL > threshold)) for threshold in PL_THRESHOLDS})
+
+        return summary
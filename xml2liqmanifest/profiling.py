@@ -0,0 +1,192 @@
+import contextvars
+import sys
+import time
+
+# the profiler collecting events in the current context; None means instrumentation is disabled
+_active_profiler = contextvars.ContextVar("xml2liqmanifest_profiler", default=None)
+
+EVENT_COLUMNS = ["stage", "path", "depth", "wall_time", "cpu_time", "allocated_blocks", "records", "failed"]
+
+
+class _NullStage:
+
+    # shared no-op returned by stage() while no profiler is active
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        return False
+
+    def set_records(self, records):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+
+    __slots__ = ("profiler", "name", "records", "path", "wall_start", "cpu_start", "blocks_start")
+
+    def __init__(self, profiler, name, records):
+
+        self.profiler = profiler
+        self.name = name
+        self.records = records
+
+    def __enter__(self):
+
+        stack = self.profiler._stack
+        self.path = f"{stack[-1]}/{self.name}" if stack else self.name
+        stack.append(self.path)
+
+        self.blocks_start = sys.getallocatedblocks()
+        self.cpu_start = time.process_time()
+        self.wall_start = time.perf_counter()
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+
+        wall_time = time.perf_counter() - self.wall_start
+        cpu_time = time.process_time() - self.cpu_start
+        allocated_blocks = sys.getallocatedblocks() - self.blocks_start
+
+        stack = self.profiler._stack
+        stack.pop()
+
+        self.profiler.events.append({
+            **self.profiler.labels,
+            "stage": self.name,
+            "path": self.path,
+            "depth": len(stack),
+            "wall_time": wall_time,
+            "cpu_time": cpu_time,
+            "allocated_blocks": allocated_blocks,
+            "records": self.records,
+            "failed": exc_type is not None,
+        })
+
+        return False
+
+    def set_records(self, records):
+
+        self.records = records
+
+
+def stage(name, records=None):
+    """
+    処理段階の計測区間を返す。Profiler が有効でない場合は何もしない共有オブジェクトを返す
+
+    Parameters
+    ----------
+    name : str
+        段階名
+    records : int, optional
+        処理した件数。区間の中で set_records() でも設定できる
+
+    使用例:
+        with stage("parse") as s:
+            ...
+            s.set_records(len(SPTs))
+    """
+    profiler = _active_profiler.get()
+
+    if profiler is None:
+        return _NULL_STAGE
+
+    return _Stage(profiler, name, records)
+
+
+class Profiler:
+
+    def __init__(self, **labels):
+        """
+        with ブロック内で実行された各段階（ファイル読み込み、文字置換、XML パース、抽出、マージ、FL 計算）の
+        経過時間・CPU 時間・確保ブロック数の増減・処理件数を記録する
+
+        Parameters
+        ----------
+        **labels
+            全イベントに付加する値（file_path など）
+
+        使用例:
+            with Profiler(file_path=path) as profiler:
+                liq = LiquefactionManifest(path)
+                ...
+            profiler.summary()
+        """
+        self.labels = labels
+        self.events = []
+        self._stack = []
+        self._token = None
+
+        return None
+
+    def __enter__(self):
+
+        self._token = _active_profiler.set(self)
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+
+        _active_profiler.reset(self._token)
+        self._token = None
+
+        return False
+
+    def get_events(self):
+        """
+        Returns
+        -------
+        DataFrame
+            1段階1行のイベント。path は入れ子になった段階を "/" でつないだもの
+        """
+        import pandas as pd
+
+        return pd.DataFrame(self.events, columns=[*self.labels, *EVENT_COLUMNS])
+
+    def summary(self):
+
+        return summarize_events(self.events)
+
+
+def summarize_events(events):
+    """
+    イベントを段階（path）ごとに集計する。複数ファイルのイベントをまとめて渡してもよい
+
+    Parameters
+    ----------
+    events : list or DataFrame
+        Profiler.events、またはそれらを結合したもの
+
+    Returns
+    -------
+    DataFrame
+        path ごとの回数、経過時間・CPU 時間の合計と平均、確保ブロック数の合計、処理件数の合計、失敗数
+    """
+    # pandas is needed only for the summaries; stage() itself runs without it
+    import pandas as pd
+
+    df_events = events if isinstance(events, pd.DataFrame) else pd.DataFrame(list(events), columns=EVENT_COLUMNS)
+
+    if df_events.empty:
+        return pd.DataFrame(columns=["path", "count", "wall_time", "wall_time_mean", "cpu_time", "cpu_time_mean",
+                                     "allocated_blocks", "records", "failed"])
+
+    df_summary = df_events.groupby("path", sort=False).agg(
+        count=("wall_time", "size"),
+        wall_time=("wall_time", "sum"),
+        wall_time_mean=("wall_time", "mean"),
+        cpu_time=("cpu_time", "sum"),
+        cpu_time_mean=("cpu_time", "mean"),
+        allocated_blocks=("allocated_blocks", "sum"),
+        records=("records", "sum"),
+        failed=("failed", "sum"),
+    ).reset_index()
+
+    # sorting by path puts every nested stage right below its parent
+    return df_summary.sort_values("path").reset_index(drop=True)
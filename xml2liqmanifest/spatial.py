@@ -0,0 +1,268 @@
+import copy
+import warnings
+import numpy as np
+import pandas as pd
+from .load import LoadData, CheckMethodParam
+from .batch import calculate_borehole
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def _import_cKDTree():
+
+    try:
+        from scipy.spatial import cKDTree
+    except ImportError as e:
+        raise ImportError("scipy is required for BoreholeCollection. Install it with `pip install scipy`.") from e
+
+    return cKDTree
+
+
+def _to_unit_vectors(lat, lon):
+
+    # points on the unit sphere, so that chord length is monotonic in great-circle distance
+    lat = np.radians(np.asarray(lat, dtype=float))
+    lon = np.radians(np.asarray(lon, dtype=float))
+
+    return np.stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)], axis=-1)
+
+
+def _km_to_chord(distance_km):
+
+    return 2 * np.sin(np.minimum(np.asarray(distance_km, dtype=float) / EARTH_RADIUS_KM, np.pi) / 2)
+
+
+def _chord_to_km(chord):
+
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(np.asarray(chord, dtype=float) / 2, 0, 1))
+
+
+class BoreholeCollection:
+
+    def __init__(self, boreholes, source=None):
+        """
+        緯度経度で検索できるボーリングの集合
+
+        Parameters
+        ----------
+        boreholes : dict
+            {borehole_id: LoadData.data} の辞書。source を指定する場合は {borehole_id: (lat, lon)} でもよい
+        source : BoreholeDataset, optional
+            ボーリングデータを必要になった時点で読み込むデータセット
+        """
+        self.params = {
+            "source": source,
+        }
+
+        self.borehole_ids = np.array([str(borehole_id) for borehole_id in boreholes], dtype=object)
+        self.boreholes = {}
+
+        lat = np.full(len(self.borehole_ids), np.nan)
+        lon = np.full(len(self.borehole_ids), np.nan)
+        for i, (borehole_id, value) in enumerate(boreholes.items()):
+            if isinstance(value, dict):
+                self.boreholes[str(borehole_id)] = value
+                value = (value.get("lat"), value.get("lon"))
+            lat[i], lon[i] = [np.nan if v is None else v for v in value]
+
+        self.lat = lat
+        self.lon = lon
+
+        self._build_index()
+
+        if len(self._indexed) < len(self.borehole_ids):
+            warnings.warn(f"{len(self.borehole_ids) - len(self._indexed)} 本のボーリングに緯度経度がないため、空間検索の対象外です。")
+
+    def _build_index(self):
+
+        # boreholes without coordinates stay in the collection but are never returned by spatial queries
+        self._indexed = np.flatnonzero(~(np.isnan(self.lat) | np.isnan(self.lon)))
+
+        # the tree and the latitude order are built on the first query of this collection,
+        # so that the subsets returned by queries cost only O(k) unless they are queried themselves
+        self._kd_tree = None
+        self._lat_order = None
+
+        return None
+
+    @property
+    def _tree(self):
+
+        if self._kd_tree is None:
+            cKDTree = _import_cKDTree()
+            self._kd_tree = cKDTree(_to_unit_vectors(self.lat[self._indexed], self.lon[self._indexed]))
+
+        return self._kd_tree
+
+    def _get_lat_order(self):
+
+        # latitude-sorted order for bounding box queries
+        if self._lat_order is None:
+            self._lat_order = self._indexed[np.argsort(self.lat[self._indexed], kind="stable")]
+            self._sorted_lat = self.lat[self._lat_order]
+
+        return self._lat_order, self._sorted_lat
+
+    @classmethod
+    def from_files(cls, file_paths):
+        """
+        XML ファイルを読み込んでコレクションを作成する。ボーリングIDはファイルパス
+        """
+        return cls({str(file_path): LoadData(file_path).data for file_path in file_paths})
+
+    @classmethod
+    def from_dataset(cls, dataset):
+        """
+        BoreholeDataset のヘッダだけを読み込んでコレクションを作成する。ボーリングデータは必要になった時点で読み込む
+        """
+        df_header = dataset.read_table("header", columns=["borehole_id", "lat", "lon"])
+        coordinates = {borehole_id: (lat, lon) for borehole_id, lat, lon
+                       in zip(df_header["borehole_id"], df_header["lat"], df_header["lon"])}
+
+        return cls(coordinates, source=dataset)
+
+    def __len__(self):
+
+        return len(self.borehole_ids)
+
+    def __iter__(self):
+
+        return iter(self.borehole_ids.tolist())
+
+    def __getitem__(self, borehole_id):
+
+        return self.get_boreholes([borehole_id])[borehole_id]
+
+    def get_boreholes(self, borehole_ids=None):
+        """
+        ボーリングデータを取得する。データセットから未読み込みのものはまとめて読み込む
+
+        Parameters
+        ----------
+        borehole_ids : list, optional
+            ボーリングIDのリスト。省略時は全て
+
+        Returns
+        -------
+        dict
+            {borehole_id: LoadData.data}
+        """
+        borehole_ids = self.borehole_ids.tolist() if borehole_ids is None else [str(i) for i in borehole_ids]
+
+        missing = [borehole_id for borehole_id in borehole_ids if borehole_id not in self.boreholes]
+        if missing:
+            if self.params["source"] is None:
+                raise KeyError(f"Borehole {missing} is not found.")
+            self.boreholes.update(self.params["source"].get_boreholes(missing))
+
+        return {borehole_id: self.boreholes[borehole_id] for borehole_id in borehole_ids}
+
+    def _subset(self, positions):
+
+        subset = BoreholeCollection.__new__(BoreholeCollection)
+        subset.params = dict(self.params)
+        subset.borehole_ids = self.borehole_ids[positions]
+        subset.boreholes = {borehole_id: self.boreholes[borehole_id]
+                            for borehole_id in subset.borehole_ids if borehole_id in self.boreholes}
+        subset.lat = self.lat[positions]
+        subset.lon = self.lon[positions]
+        subset._build_index()
+
+        return subset
+
+    def query_radius(self, lat, lon, radius_km, return_distance=False):
+        """
+        点から radius_km 以内のボーリングを近い順に返す
+
+        Parameters
+        ----------
+        lat, lon : float
+            中心の緯度経度 [deg]
+        radius_km : float
+            半径 [km]（大円距離）
+        return_distance : bool, optional
+            True の場合、距離 [km] の配列も返す
+
+        Returns
+        -------
+        BoreholeCollection or (BoreholeCollection, ndarray)
+        """
+        center = _to_unit_vectors(lat, lon)
+        hits = np.asarray(self._tree.query_ball_point(center, _km_to_chord(radius_km)), dtype=np.int64)
+
+        chord = np.linalg.norm(self._tree.data[hits] - center, axis=1)
+        order = np.argsort(chord, kind="stable")
+        subset = self._subset(self._indexed[hits[order]])
+
+        return (subset, _chord_to_km(chord[order])) if return_distance else subset
+
+    def query_nearest(self, lat, lon, k=1, return_distance=False):
+        """
+        点に近い k 本のボーリングを近い順に返す
+        """
+        k = min(k, len(self._indexed))
+        if k == 0:
+            subset = self._subset(np.array([], dtype=np.int64))
+            return (subset, np.array([])) if return_distance else subset
+
+        chord, hits = self._tree.query(_to_unit_vectors(lat, lon), k=k)
+        chord, hits = np.atleast_1d(chord), np.atleast_1d(hits)
+        subset = self._subset(self._indexed[hits])
+
+        return (subset, _chord_to_km(chord)) if return_distance else subset
+
+    def query_bbox(self, lat_min, lon_min, lat_max, lon_max):
+        """
+        緯度経度の矩形に含まれるボーリングを返す。lon_min > lon_max の場合は日付変更線をまたぐ矩形とみなす
+        """
+        lat_order, sorted_lat = self._get_lat_order()
+        start = np.searchsorted(sorted_lat, lat_min, side="left")
+        end = np.searchsorted(sorted_lat, lat_max, side="right")
+        candidates = lat_order[start:end]
+
+        lon = self.lon[candidates]
+        if lon_min <= lon_max:
+            inside = (lon >= lon_min) & (lon <= lon_max)
+        else:
+            inside = (lon >= lon_min) | (lon <= lon_max)
+
+        return self._subset(np.sort(candidates[inside]))
+
+    def get_coordinates(self):
+
+        return pd.DataFrame({"borehole_id": self.borehole_ids, "lat": self.lat, "lon": self.lon})
+
+    def calculate_FL(self, method, params, engine="vectorized"):
+        """
+        コレクション内の全ボーリングの FL を計算する
+
+        Parameters
+        ----------
+        method : str
+            液状化判定手法
+        params : dict
+            手法のパラメータ
+        engine : str, optional
+            CalculateFL の計算エンジン
+
+        Returns
+        -------
+        (DataFrame, DataFrame)
+            borehole_id 列を付加した計算結果と、失敗したボーリングの一覧
+        """
+        method_params = CheckMethodParam(method, copy.deepcopy(params)).get_params()
+
+        results = []
+        failures = []
+        for borehole_id, borehole_data in self.get_boreholes().items():
+            try:
+                df_result = calculate_borehole(borehole_data, method, method_params, engine)
+            except Exception as e:
+                failures.append({"borehole_id": borehole_id, "error": f"{type(e).__name__}: {str(e)}"})
+                continue
+            df_result.insert(0, "borehole_id", borehole_id)
+            results.append(df_result)
+
+        df_results = pd.concat(results, ignore_index=True) if results else pd.DataFrame()
+
+        return df_results, pd.DataFrame(failures, columns=["borehole_id", "error"])
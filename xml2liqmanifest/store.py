@@ -0,0 +1,291 @@
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+# column layout of each table; every table is keyed by borehole_id
+TABLE_SCHEMAS = {
+    "header": [("borehole_id", "string"), ("lat", "float64"), ("lon", "float64"), ("start_date", "string"),
+               ("tip_elevation", "float64"), ("total_depth", "float64"), ("ground_water_level", "float64")],
+    "soil_layers": [("borehole_id", "string"), ("layer_index", "int32"), ("depth", "float64"),
+                    ("class_name", "string"), ("class_code", "string")],
+    "observation_note": [("borehole_id", "string"), ("note_index", "int32"), ("upper_depth", "float64"),
+                         ("lower_depth", "float64"), ("note", "string")],
+    "SPT": [("borehole_id", "string"), ("spt_index", "int32"), ("depth", "float64"),
+            ("total_hits", "int64"), ("total_penetration", "float64")],
+    "intervals": [("borehole_id", "string"), ("spt_index", "int32"), ("interval_index", "int32"),
+                  ("hits", "int64"), ("penetration", "float64")],
+}
+
+
+def _import_pyarrow():
+
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("pyarrow is required for BoreholeDataset. Install it with `pip install pyarrow`.") from e
+
+    return pa, pq
+
+
+def _to_rows(borehole_id, data):
+
+    rows = {table: [] for table in TABLE_SCHEMAS}
+
+    rows["header"].append({
+        "borehole_id": borehole_id,
+        "lat": data.get("lat"),
+        "lon": data.get("lon"),
+        "start_date": data.get("start_date"),
+        "tip_elevation": data.get("tip_elevation"),
+        "total_depth": data.get("total_depth"),
+        "ground_water_level": data.get("ground_water_level"),
+    })
+
+    for i, layer in enumerate(data.get("soil_layers") or []):
+        rows["soil_layers"].append({"borehole_id": borehole_id, "layer_index": i, **layer})
+
+    for i, note in enumerate(data.get("observation_note") or []):
+        rows["observation_note"].append({"borehole_id": borehole_id, "note_index": i, **note})
+
+    for i, spt in enumerate(data.get("SPT") or []):
+        rows["SPT"].append({
+            "borehole_id": borehole_id,
+            "spt_index": i,
+            "depth": spt["depth"],
+            "total_hits": spt["total_hits"],
+            "total_penetration": spt["total_penetration"],
+        })
+        for j, interval in enumerate(spt["intervals"]):
+            rows["intervals"].append({"borehole_id": borehole_id, "spt_index": i, "interval_index": j, **interval})
+
+    return rows
+
+
+class BoreholeDataset:
+
+    def __init__(self, path):
+
+        self.params = {
+            "path": Path(path),
+        }
+
+        missing = [table for table in TABLE_SCHEMAS if not self._table_path(table).exists()]
+        if missing:
+            raise FileNotFoundError(f"Tables {missing} are not found in {self.params['path']}.")
+
+    def _table_path(self, table):
+
+        return self.params["path"] / f"{table}.parquet"
+
+    @classmethod
+    def write(cls, boreholes, path, row_group_size=100_000, compression="zstd"):
+        """
+        ボーリングデータを表ごとの Parquet ファイルに書き出す
+
+        Parameters
+        ----------
+        boreholes : dict or iterable
+            {borehole_id: LoadData.data} の辞書、または (borehole_id, LoadData.data) の反復可能オブジェクト
+        path : str or Path
+            出力先ディレクトリ
+        row_group_size : int, optional
+            1つの row group に含める行数。行がこの数だけ溜まるごとに書き出す
+        compression : str, optional
+            Parquet の圧縮方式, by default "zstd"
+
+        Returns
+        -------
+        BoreholeDataset
+            書き出したデータセット
+        """
+        pa, pq = _import_pyarrow()
+
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+
+        if isinstance(boreholes, dict):
+            boreholes = boreholes.items()
+
+        schemas = {table: pa.schema([(name, pa.type_for_alias(dtype)) for name, dtype in columns])
+                   for table, columns in TABLE_SCHEMAS.items()}
+        writers = {table: pq.ParquetWriter(path / f"{table}.parquet", schemas[table], compression=compression)
+                   for table in TABLE_SCHEMAS}
+        buffers = {table: [] for table in TABLE_SCHEMAS}
+
+        def flush(table):
+            if buffers[table]:
+                writers[table].write_table(pa.Table.from_pylist(buffers[table], schema=schemas[table]),
+                                           row_group_size=row_group_size)
+                buffers[table] = []
+
+        try:
+            # rows are buffered so that memory stays bounded by row_group_size per table
+            for borehole_id, data in boreholes:
+                for table, rows in _to_rows(str(borehole_id), data).items():
+                    buffers[table].extend(rows)
+                    if len(buffers[table]) >= row_group_size:
+                        flush(table)
+
+            for table in TABLE_SCHEMAS:
+                flush(table)
+        finally:
+            for writer in writers.values():
+                writer.close()
+
+        return cls(path)
+
+    def read_table(self, table, columns=None, filters=None):
+        """
+        表を読み込む。ファイルはメモリマップで開き、列の射影と述語のプッシュダウンを行う
+
+        Parameters
+        ----------
+        table : str
+            "header", "soil_layers", "observation_note", "SPT", "intervals" のいずれか
+        columns : list, optional
+            読み込む列
+        filters : list or pyarrow.compute.Expression, optional
+            pyarrow.parquet.read_table の filters（例：[("lat", ">=", 35.0), ("lat", "<", 36.0)]）
+
+        Returns
+        -------
+        DataFrame
+            読み込んだ表
+        """
+        _, pq = _import_pyarrow()
+
+        if table not in TABLE_SCHEMAS:
+            raise ValueError("Invalid table.")
+
+        return pq.read_table(self._table_path(table), columns=columns, filters=filters,
+                             memory_map=True).to_pandas()
+
+    def select_borehole_ids(self, bbox=None, depth_range=None):
+        """
+        範囲内のボーリングIDを取得する
+
+        Parameters
+        ----------
+        bbox : tuple, optional
+            (lat_min, lon_min, lat_max, lon_max)
+        depth_range : tuple, optional
+            (min, max)。この範囲に SPT 深度を1つ以上持つボーリングを選ぶ
+
+        Returns
+        -------
+        list
+            ボーリングIDのリスト
+        """
+        filters = []
+        if bbox is not None:
+            lat_min, lon_min, lat_max, lon_max = bbox
+            filters += [("lat", ">=", lat_min), ("lat", "<=", lat_max), ("lon", ">=", lon_min), ("lon", "<=", lon_max)]
+
+        borehole_ids = self.read_table("header", columns=["borehole_id"], filters=filters or None)["borehole_id"]
+
+        if depth_range is not None:
+            df_SPT = self.read_table("SPT", columns=["borehole_id"],
+                                     filters=[("depth", ">=", depth_range[0]), ("depth", "<=", depth_range[1])])
+            borehole_ids = borehole_ids[borehole_ids.isin(df_SPT["borehole_id"])]
+
+        return borehole_ids.tolist()
+
+    def get_borehole(self, borehole_id):
+        """
+        1本のボーリングを LoadData.data と同じ形式の辞書として取得する
+
+        Parameters
+        ----------
+        borehole_id : str
+            ボーリングID
+
+        Returns
+        -------
+        dict
+            ボーリングデータ
+        """
+        return self.get_boreholes([borehole_id])[borehole_id]
+
+    def get_boreholes(self, borehole_ids):
+        """
+        複数のボーリングを LoadData.data と同じ形式の辞書として取得する
+
+        Parameters
+        ----------
+        borehole_ids : list
+            ボーリングIDのリスト
+
+        Returns
+        -------
+        dict
+            {borehole_id: ボーリングデータ}
+        """
+        borehole_ids = [str(borehole_id) for borehole_id in borehole_ids]
+        filters = [("borehole_id", "in", borehole_ids)]
+
+        tables = {table: self.read_table(table, filters=filters) for table in TABLE_SCHEMAS}
+
+        missing = set(borehole_ids) - set(tables["header"]["borehole_id"])
+        if missing:
+            raise KeyError(f"Borehole {sorted(missing)} is not found.")
+
+        # sort once and turn every column into a plain list; each borehole is then a pair of slice bounds
+        sort_keys = {"header": [], "soil_layers": ["layer_index"], "observation_note": ["note_index"],
+                     "SPT": ["spt_index"], "intervals": ["spt_index", "interval_index"]}
+        columns = {}
+        bounds = {}
+        for table, df in tables.items():
+            df = df.sort_values(["borehole_id", *sort_keys[table]], kind="stable")
+            columns[table] = {column: df[column].tolist() for column in df.columns}
+            ids = df["borehole_id"].to_numpy(dtype=object)
+            bounds[table] = (np.searchsorted(ids, borehole_ids, side="left"),
+                             np.searchsorted(ids, borehole_ids, side="right"))
+
+        boreholes = {}
+        for k, borehole_id in enumerate(borehole_ids):
+            parts = {table: {column: values[bounds[table][0][k]:bounds[table][1][k]]
+                             for column, values in columns[table].items()}
+                     for table in TABLE_SCHEMAS}
+            boreholes[borehole_id] = self._to_data(parts)
+
+        return boreholes
+
+    def _to_data(self, parts):
+
+        header = parts["header"]
+        data = {key: (None if pd.isna(header[key][0]) else header[key][0])
+                for key in ["lat", "lon", "start_date", "tip_elevation", "total_depth", "ground_water_level"]}
+
+        # LoadData omits total_depth when it is missing
+        if data["total_depth"] is None:
+            del data["total_depth"]
+
+        layers = parts["soil_layers"]
+        data["soil_layers"] = [{"depth": depth, "class_name": class_name, "class_code": class_code}
+                               for depth, class_name, class_code
+                               in zip(layers["depth"], layers["class_name"], layers["class_code"])] or None
+
+        notes = parts["observation_note"]
+        data["observation_note"] = [{"upper_depth": upper_depth, "lower_depth": lower_depth, "note": note}
+                                    for upper_depth, lower_depth, note
+                                    in zip(notes["upper_depth"], notes["lower_depth"], notes["note"])] or None
+
+        intervals = parts["intervals"]
+        interval_spt_index = np.asarray(intervals["spt_index"], dtype=np.int64)
+
+        SPT = parts["SPT"]
+        spt_index = np.asarray(SPT["spt_index"], dtype=np.int64)
+        starts = np.searchsorted(interval_spt_index, spt_index, side="left").tolist()
+        ends = np.searchsorted(interval_spt_index, spt_index, side="right").tolist()
+
+        data["SPT"] = [{
+            "depth": depth,
+            "total_hits": int(total_hits),
+            "total_penetration": total_penetration,
+            "intervals": [{"hits": int(hits), "penetration": penetration}
+                          for hits, penetration in zip(intervals["hits"][start:end], intervals["penetration"][start:end])],
+        } for depth, total_hits, total_penetration, start, end
+            in zip(SPT["depth"], SPT["total_hits"], SPT["total_penetration"], starts, ends)] or None
+
+        return data
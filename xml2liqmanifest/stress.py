@@ -0,0 +1,96 @@
+import numpy as np
+
+GAMMA_W = 9.81
+
+
+class StressProfile:
+
+    def __init__(self, lower_depth, gamma_wet, gamma_sat, ground_water_level=None):
+        """
+        土層ごとの単位体積重量と地下水位から、全上載圧・有効上載圧の深度分布を作成する
+
+        層境界と地下水位で区切った各区間では応力が深度に対して線形なので、
+        区切り位置での累積値と区間の勾配を前計算しておけば、任意深度の応力は
+        二分探索1回と線形補間1回で求まる
+
+        Parameters
+        ----------
+        lower_depth : array_like
+            各層の下端深度 [m]（昇順）
+        gamma_wet : array_like
+            各層の湿潤単位体積重量 [kN/m3]
+        gamma_sat : array_like
+            各層の飽和単位体積重量 [kN/m3]
+        ground_water_level : float, optional
+            地下水位 [m]。None の場合は地表面（全層飽和）とみなす
+        """
+        lower_depth = np.asarray(lower_depth, dtype=float)
+        gamma_wet = np.asarray(gamma_wet, dtype=float)
+        gamma_sat = np.asarray(gamma_sat, dtype=float)
+
+        if lower_depth.ndim != 1 or len(lower_depth) == 0:
+            raise ValueError("At least one soil layer is required.")
+        if np.any(np.diff(lower_depth) < 0):
+            raise ValueError("Lower depths of soil layers must be in ascending order.")
+
+        self.ground_water_level = 0.0 if ground_water_level is None else float(ground_water_level)
+
+        # split the layer at the water level so that every segment has a single unit weight
+        upper_depth = np.concatenate([[0.0], lower_depth[:-1]])
+        is_split = (upper_depth < self.ground_water_level) & (self.ground_water_level < lower_depth)
+        layer_index = np.repeat(np.arange(len(lower_depth)), np.where(is_split, 2, 1))
+        bottom = lower_depth[layer_index].copy()
+        bottom[np.flatnonzero(is_split[layer_index][:-1] & (np.diff(layer_index) == 0))] = self.ground_water_level
+
+        top = np.concatenate([[0.0], bottom[:-1]])
+        is_saturated = top >= self.ground_water_level
+
+        unit_weight = np.where(is_saturated, gamma_sat[layer_index], gamma_wet[layer_index])
+        effective_unit_weight = np.where(is_saturated, gamma_sat[layer_index] - GAMMA_W, gamma_wet[layer_index])
+
+        thickness = bottom - top
+
+        self.depth = np.concatenate([[0.0], bottom])
+        self.layer_index = layer_index
+        self.unit_weight = unit_weight
+        self.effective_unit_weight = effective_unit_weight
+        self.cumulative_sigma_v = np.concatenate([[0.0], np.cumsum(unit_weight * thickness)])
+        self.cumulative_sigma_p_v = np.concatenate([[0.0], np.cumsum(effective_unit_weight * thickness)])
+
+    @classmethod
+    def from_borehole_data(cls, borehole_data):
+        """
+        LoadData.data から作成する。土層には gamma_wet, gamma_sat が付与されていること
+        """
+        soil_layers = borehole_data["soil_layers"]
+
+        return cls(
+            [layer["depth"] for layer in soil_layers],
+            [layer["gamma_wet"] for layer in soil_layers],
+            [layer["gamma_sat"] for layer in soil_layers],
+            borehole_data.get("ground_water_level"),
+        )
+
+    def _segment(self, depth):
+
+        # segment containing each depth; depths below the last boundary use the deepest segment
+        depth = np.asarray(depth, dtype=float)
+        segment = np.clip(np.searchsorted(self.depth, depth, side="right") - 1, 0, len(self.unit_weight) - 1)
+
+        return depth, segment
+
+    def sigma_v(self, depth):
+        """
+        全上載圧 [kN/m2]。depth はスカラーでも配列でもよい
+        """
+        depth, segment = self._segment(depth)
+
+        return self.cumulative_sigma_v[segment] + self.unit_weight[segment] * (depth - self.depth[segment])
+
+    def sigma_p_v(self, depth):
+        """
+        有効上載圧 [kN/m2]。depth はスカラーでも配列でもよい
+        """
+        depth, segment = self._segment(depth)
+
+        return self.cumulative_sigma_p_v[segment] + self.effective_unit_weight[segment] * (depth - self.depth[segment])
@@ -0,0 +1,171 @@
+import math
+
+# issue codes found in the parsed borehole data, and what they mean
+ISSUE_CODES = {
+    "NO_SPT": "標準貫入試験データがありません",
+    "NO_SOIL_LAYERS": "土質区分情報がありません",
+    "LAYER_DEPTH_NOT_MONOTONIC": "土質区分の下端深度が深さ順に並んでいません",
+    "SPT_BEYOND_TOTAL_DEPTH": "総掘進長より深い標準貫入試験があります",
+    "ZERO_PENETRATION": "貫入量が 0 以下の標準貫入試験があります",
+    "NEGATIVE_HITS": "打撃回数が負の標準貫入試験があります",
+    "MISSING_GROUND_WATER_LEVEL": "孔内水位がありません",
+}
+
+# what "repair" does for each code; the other codes cannot be repaired and are skipped
+REPAIRS = {
+    "LAYER_DEPTH_NOT_MONOTONIC": "土層を下端深度の順に並べ替える",
+    "SPT_BEYOND_TOTAL_DEPTH": "その標準貫入試験を除く",
+    "ZERO_PENETRATION": "その標準貫入試験を除く",
+    "NEGATIVE_HITS": "その標準貫入試験を除く",
+    "MISSING_GROUND_WATER_LEVEL": "default_ground_water_level を使う",
+}
+
+ACTIONS = ["repair", "skip", "ignore"]
+
+
+class BoreholeValidationError(ValueError):
+
+    def __init__(self, issues):
+
+        self.issues = issues
+        codes = sorted({issue["code"] for issue in issues if issue["action"] == "skip"})
+        super().__init__(f"検証で除外されました: {', '.join(codes)}")
+
+
+def _is_missing(value):
+
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+class BoreholeValidator:
+
+    def __init__(self, on_issue="repair", actions=None, default_ground_water_level=0.0, depth_tolerance=0.0):
+        """
+        読み込んだボーリングデータを、マージ・計算の前に検証する
+
+        問題ごとにエラーコード（ISSUE_CODES）を付け、コードごとの対応（修復・除外・無視）に従って処理する。
+        修復できないコード（NO_SPT, NO_SOIL_LAYERS）は常に除外する
+
+        Parameters
+        ----------
+        on_issue : str, optional
+            既定の対応。"repair"（REPAIRS に従って修復）, "skip"（ボーリングを除外）, "ignore"（記録のみ）, by default "repair"
+        actions : dict, optional
+            コードごとの対応（例：{"MISSING_GROUND_WATER_LEVEL": "skip"}）
+        default_ground_water_level : float, optional
+            孔内水位がない場合に使う値 [m], by default 0.0（StressProfile と同じ）
+        depth_tolerance : float, optional
+            総掘進長より深い標準貫入試験とみなすまでの余裕 [m], by default 0.0
+        """
+        actions = actions or {}
+        for action in [on_issue, *actions.values()]:
+            if action not in ACTIONS:
+                raise ValueError("Input action", action, "is not valid.")
+        invalid_codes = [code for code in actions if code not in ISSUE_CODES]
+        if invalid_codes:
+            raise ValueError("Input issue code", invalid_codes, "is not valid.")
+
+        self.params = {
+            "on_issue": on_issue,
+            "actions": dict(actions),
+            "default_ground_water_level": default_ground_water_level,
+            "depth_tolerance": depth_tolerance,
+        }
+
+        return None
+
+    def get_action(self, code):
+
+        action = self.params["actions"].get(code, self.params["on_issue"])
+
+        return "skip" if action == "repair" and code not in REPAIRS else action
+
+    def _issue(self, code, index=None, detail=None):
+
+        message = ISSUE_CODES[code] + (f"（{detail}）" if detail else "")
+
+        return {"code": code, "index": index, "message": message, "action": self.get_action(code)}
+
+    def find_issues(self, borehole_data):
+        """
+        問題を列挙する（データは変更しない）
+
+        Parameters
+        ----------
+        borehole_data : dict
+            LoadData.data と同じ形式のボーリングデータ
+
+        Returns
+        -------
+        list
+            {"code", "index"（土層・標準貫入試験の番号、または None）, "message", "action"} のリスト
+        """
+        issues = []
+        soil_layers = borehole_data.get("soil_layers") or []
+        SPTs = borehole_data.get("SPT") or []
+
+        if not SPTs:
+            issues.append(self._issue("NO_SPT"))
+        if not soil_layers:
+            issues.append(self._issue("NO_SOIL_LAYERS"))
+
+        for i in range(1, len(soil_layers)):
+            if soil_layers[i]["depth"] < soil_layers[i - 1]["depth"]:
+                issues.append(self._issue("LAYER_DEPTH_NOT_MONOTONIC", i,
+                                          f"{soil_layers[i - 1]['depth']}m の次が {soil_layers[i]['depth']}m"))
+
+        total_depth = borehole_data.get("total_depth")
+        for i, spt in enumerate(SPTs):
+            if not _is_missing(total_depth) and spt["depth"] > total_depth + self.params["depth_tolerance"]:
+                issues.append(self._issue("SPT_BEYOND_TOTAL_DEPTH", i, f"{spt['depth']}m > {total_depth}m"))
+            if not spt["total_penetration"] > 0:
+                issues.append(self._issue("ZERO_PENETRATION", i, f"{spt['depth']}m"))
+            if spt["total_hits"] < 0 or any(interval["hits"] < 0 for interval in spt.get("intervals") or []):
+                issues.append(self._issue("NEGATIVE_HITS", i, f"{spt['depth']}m"))
+
+        if _is_missing(borehole_data.get("ground_water_level")):
+            issues.append(self._issue("MISSING_GROUND_WATER_LEVEL"))
+
+        return issues
+
+    def validate(self, borehole_data):
+        """
+        問題を列挙し、対応が "repair" の問題を修復する
+
+        Parameters
+        ----------
+        borehole_data : dict
+            LoadData.data と同じ形式のボーリングデータ（変更しない）
+
+        Returns
+        -------
+        tuple
+            (修復したボーリングデータ、除外する場合は None, 問題のリスト)
+        """
+        issues = self.find_issues(borehole_data)
+
+        if any(issue["action"] == "skip" for issue in issues):
+            return None, issues
+
+        repairs = {issue["code"] for issue in issues if issue["action"] == "repair"}
+        if not repairs:
+            return borehole_data, issues
+
+        # a new dict, so that cached borehole data stays untouched
+        data = dict(borehole_data)
+
+        if "LAYER_DEPTH_NOT_MONOTONIC" in repairs:
+            data["soil_layers"] = sorted(data["soil_layers"], key=lambda layer: layer["depth"])
+
+        dropped = {issue["index"] for issue in issues if issue["action"] == "repair"
+                   and issue["code"] in ["SPT_BEYOND_TOTAL_DEPTH", "ZERO_PENETRATION", "NEGATIVE_HITS"]}
+        if dropped:
+            data["SPT"] = [spt for i, spt in enumerate(data["SPT"]) if i not in dropped]
+            if not data["SPT"]:
+                issues.append({**self._issue("NO_SPT", detail="修復後"), "action": "skip"})
+                return None, issues
+
+        if "MISSING_GROUND_WATER_LEVEL" in repairs:
+            data["ground_water_level"] = self.params["default_ground_water_level"]
+
+        return data, issues